@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for ExpLog and ExpManager on synthetic logs. Runs offline and
+writes the results as JSON, so that they can be compared between versions:
+
+    python benchmarks/bench_explog.py --confs 200 --keys 4 --rows 1000 \
+        --output bench.json
+
+Passing a previous report as --compare prints the ratio of the new and old
+minimum times of every benchmark. The storage backends are compared by
+running the benchmarks with --backend directory against a report of
+the default HDF5 backend.
+"""
+import argparse
+import collections
+import json
+import platform
+import sys
+import time
+import numpy as np
+import pandas as pd
+import tables
+import pyexplog
+from pyexplog.manager import repeated_experiment
+from synthetic import make_conf, make_results, make_explog, \
+                      make_synthetic_log
+
+BENCHMARKS = collections.OrderedDict()
+
+def benchmark(func):
+    """
+    Registers a benchmark. The benchmark is called with the parsed arguments
+    and returns a (setup, run) pair: setup() is called before every timed
+    repeat and its return value is passed to run(), which is timed.
+    """
+    BENCHMARKS[func.__name__[len('bench_'):]] = func
+    return func
+
+def time_benchmark(setup, run, repeat):
+    times = []
+
+    for r in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+def confs(args):
+    return [make_conf(iconf, args.params) for iconf in range(args.confs)]
+
+@benchmark
+def bench_add_results(args):
+    results = make_results(args.keys, args.rows)
+
+    def run(explog):
+        for conf in confs(args):
+            explog.add_results("Bench", conf, results)
+
+    return lambda: make_explog(backend=args.backend), run
+
+@benchmark
+def bench_select_results(args):
+    explog = make_synthetic_log(args.confs, args.keys, args.rows, args.params,
+                                backend=args.backend)
+
+    def run(state):
+        for conf in confs(args):
+            explog.select_results("Bench", conf)
+
+    return lambda: None, run
+
+@benchmark
+def bench_conf2idx(args):
+    explog = make_synthetic_log(args.confs, args.keys, args.rows, args.params,
+                                backend=args.backend)
+
+    def run(state):
+        for conf in confs(args):
+            explog.conf2idx("Bench", conf)
+
+    return lambda: None, run
+
+@benchmark
+def bench_result_keys(args):
+    explog = make_synthetic_log(args.confs, args.keys, args.rows, args.params,
+                                backend=args.backend)
+
+    def run(state):
+        for conf in confs(args):
+            explog.result_keys("Bench", conf)
+
+    return lambda: None, run
+
+@benchmark
+def bench_remove_results(args):
+    def setup():
+        return make_synthetic_log(args.confs, args.keys, args.rows,
+                                  args.params, backend=args.backend)
+
+    def run(explog):
+        for conf in confs(args):
+            explog.remove_results("Bench", conf)
+
+    return setup, run
+
+class SyntheticExperiment:
+    def __init__(self, num_keys, num_rows):
+        self.num_keys = num_keys
+        self.num_rows = num_rows
+
+    def __call__(self, configuration):
+        return make_results(self.num_keys, self.num_rows)
+
+@benchmark
+def bench_repeated_experiment(args):
+    experiment = SyntheticExperiment(args.keys, args.rows)
+
+    def run(state):
+        repeated_experiment(experiment, make_conf(0, args.params),
+                            args.num_repeats, n_jobs=args.n_jobs)
+
+    return lambda: None, run
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*',
+                        help="the benchmarks to run (default: all of them): "
+                             + ", ".join(BENCHMARKS))
+    parser.add_argument('--confs', type=int, default=100,
+                        help="number of configurations in the log")
+    parser.add_argument('--keys', type=int, default=2,
+                        help="number of result keys per configuration")
+    parser.add_argument('--rows', type=int, default=100,
+                        help="number of rows per result table")
+    parser.add_argument('--params', type=int, default=3,
+                        help="number of parameters per configuration")
+    parser.add_argument('--num-repeats', type=int, default=8,
+                        help="number of repeats for repeated_experiment")
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help="number of jobs for repeated_experiment")
+    parser.add_argument('--backend', default='hdf',
+                        choices=['hdf', 'directory'],
+                        help="the storage backend of the logs")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="number of timed repeats of every benchmark")
+    parser.add_argument('--output', default=None,
+                        help="file to write the JSON results to "
+                             "(default: stdout)")
+    parser.add_argument('--compare', default=None,
+                        help="a previous JSON report to compare against")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = args.benchmarks if len(args.benchmarks) else list(BENCHMARKS)
+
+    for name in names:
+        if not name in BENCHMARKS:
+            raise KeyError("Unknown benchmark '{}'.".format(name))
+
+    report = {
+        'meta': {
+            'pyexplog': pyexplog.VERSION,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'tables': tables.__version__,
+            'platform': platform.platform(),
+            'params': {k: v for k, v in vars(args).items()
+                       if not k in ('benchmarks', 'output', 'compare')}
+        },
+        'results': []
+    }
+
+    if args.compare is None:
+        baseline = {}
+    else:
+        with open(args.compare) as file:
+            baseline = {r['name']: r for r in json.load(file)['results']}
+
+    for name in names:
+        setup, run = BENCHMARKS[name](args)
+        times = time_benchmark(setup, run, args.repeat)
+        report['results'].append({
+            'name': name,
+            'min': min(times),
+            'median': float(np.median(times)),
+            'mean': float(np.mean(times)),
+            'times': times
+        })
+
+        if name in baseline:
+            print("{:<24} {:10.4f} s {:8.2f}x".format(name, min(times),
+                  min(times) / baseline[name]['min']), file=sys.stderr)
+        else:
+            print("{:<24} {:10.4f} s".format(name, min(times)),
+                  file=sys.stderr)
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import itertools
+import tempfile
+from pyexplog.log import ExpLog
+from pyexplog.backend import DirectoryBackend
+
+log_counter = itertools.count()
+
+def make_conf(iconf, num_params):
+    """
+    Returns the iconf-th synthetic configuration: num_params integer
+    parameters named param0, param1, ...
+    """
+    return {'param{}'.format(p): iconf * num_params + p
+            for p in range(num_params)}
+
+def make_results(num_keys, num_rows, num_cols=4, seed=0):
+    """
+    Returns a synthetic results dictionary with num_keys result tables,
+    each of which has num_rows rows and num_cols float columns.
+    """
+    rng = np.random.RandomState(seed)
+    return {'result{}'.format(k): pd.DataFrame(
+                rng.rand(num_rows, num_cols),
+                columns=['col{}'.format(c) for c in range(num_cols)])
+            for k in range(num_keys)}
+
+def make_explog(log_file=None, backend='hdf'):
+    """
+    Creates an empty log. For the 'hdf' backend, if log_file is None, the
+    log is kept in memory. For the 'directory' backend, log_file is
+    the directory of the log; if None, a temporary directory is used.
+    """
+    if backend == 'directory':
+        if log_file is None:
+            log_file = tempfile.mkdtemp(prefix='bench')
+        return ExpLog(backend=DirectoryBackend(log_file))
+    elif backend != 'hdf':
+        raise ValueError("Unknown backend '{}'.".format(backend))
+
+    if log_file is None:
+        return ExpLog('bench{}.h5'.format(next(log_counter)), in_memory=True)
+    return ExpLog(log_file)
+
+def make_synthetic_log(num_confs, num_keys, num_rows, num_params=3,
+                       logFolder="Bench", log_file=None, backend='hdf'):
+    """
+    Creates a log with num_confs configurations in logFolder, each with
+    num_keys result tables of num_rows rows.
+    """
+    explog = make_explog(log_file, backend)
+    results = make_results(num_keys, num_rows)
+
+    for iconf in range(num_confs):
+        explog.add_results(logFolder, make_conf(iconf, num_params), results)
+
+    return explog
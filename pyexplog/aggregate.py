@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import collections
+import math
+
+class TDigest:
+    """
+    A mergeable sketch of a distribution, which estimates its quantiles
+    (the merging t-digest of Dunning and Ertl). The centroids are kept
+    smaller towards the tails, where the relative accuracy matters most.
+    Up to compression values, the quantiles are exact.
+    """
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, values):
+        """
+        Adds values (an array-like) into the sketch; NaNs are ignored.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        if len(values):
+            self._add(values, np.ones(len(values)))
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+
+    def merge(self, other):
+        """
+        Adds the values summarized by another TDigest into this one.
+        """
+        other._compress()
+
+        if len(other.means):
+            self._add(other.means, other.weights)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+
+    def _add(self, means, weights):
+        self._buffer.append((means, weights))
+        self._buffered += len(means)
+
+        if self._buffered > 10 * self.compression:
+            self._compress()
+
+    def _compress(self):
+        if not len(self._buffer):
+            return
+
+        means = np.concatenate([self.means] + [m for m, w in self._buffer])
+        weights = np.concatenate([self.weights] + [w for m, w in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+
+        if len(means) <= self.compression:
+            self.means, self.weights = means, weights
+            return
+
+        # map the centers of the centroids onto the k-scale (which is
+        # steep at the tails) and merge the centroids that fall into the same
+        # unit interval of it; this keeps about compression / 2 centroids
+        total = weights.sum()
+        centers = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * centers - 1)
+        bucket = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate([[1], np.diff(bucket)]))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def count(self):
+        self._compress()
+        return self.weights.sum()
+
+    def quantile(self, q):
+        """
+        Returns the estimate of the q-th quantile (0 <= q <= 1), or NaN if
+        the sketch is empty.
+        """
+        self._compress()
+
+        if not len(self.means):
+            return np.nan
+        elif np.all(self.weights == 1):
+            return np.percentile(self.means, 100 * q)
+
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(q * total, np.concatenate([[0], centers, [total]]),
+                         np.concatenate([[self.min], self.means, [self.max]]))
+
+def parse_agg(agg):
+    """
+    Parses a list of aggregate names into (name, quantile) pairs; the
+    quantile is None for the moment-based aggregates. Supported are 'count',
+    'sum', 'mean', 'var', 'std', 'min', 'max', 'median' and 'pNN' for the
+    NN-th percentile (e.g. 'p90' or 'p99.9').
+    """
+    if isinstance(agg, str):
+        agg = [agg]
+
+    parsed = []
+
+    for name in agg:
+        if name in Aggregator.moments:
+            parsed.append((name, None))
+        elif name == 'median':
+            parsed.append((name, 0.5))
+        elif name.startswith('p'):
+            try:
+                q = float(name[1:]) / 100
+            except ValueError:
+                q = -1
+            if not 0 <= q <= 1:
+                raise ValueError("Percentile '{}' not understood.".format(name))
+            parsed.append((name, q))
+        else:
+            raise ValueError("Unknown aggregate '{}'.".format(name))
+
+    return parsed
+
+class Aggregator:
+    """
+    Aggregates the columns of DataFrames that arrive in chunks, grouped by
+    the by columns, in bounded memory: the moments (count, mean and
+    the sum of squared deviations) are merged using the parallel form of
+    Welford's algorithm and the quantiles are estimated using TDigests.
+    Aggregators themselves can be merged too, e.g. when the chunks are
+    processed in several processes.
+    """
+    moments = ['count', 'sum', 'mean', 'var', 'std', 'min', 'max']
+
+    def __init__(self, by=None, columns=None, agg=('mean', 'std'),
+                 compression=100, max_parts=100000):
+        """
+        Arguments:
+            by: list of str or None
+                The columns to group by. If None, everything is aggregated
+                into a single row.
+            columns: list of str or None
+                The columns to aggregate. If None, all the numeric columns
+                of the first chunk that are not in by are used.
+            agg: list of str
+                The aggregates to compute (see parse_agg).
+            compression: int
+                The compression of the TDigests used for the quantiles.
+            max_parts: int
+                The number of partial results kept before they are reduced.
+        """
+        self.by = [] if by is None else list(by)
+        self.columns = None if columns is None else list(columns)
+        self.agg = parse_agg(agg)
+        self.compression = compression
+        self.max_parts = max_parts
+        self.parts = []
+        self.digests = {}
+        self._num_parts = 0
+
+    def _quantiles(self):
+        return [q for name, q in self.agg if not q is None]
+
+    def _groups(self, chunk):
+        if len(self.by):
+            return chunk.groupby(self.by)
+        return chunk.groupby(np.zeros(len(chunk), dtype=int))
+
+    def update(self, chunk):
+        """
+        Adds a chunk (a DataFrame) into the aggregates.
+        """
+        if self.columns is None:
+            self.columns = [c for c in chunk.columns if not c in self.by
+                            and np.issubdtype(chunk[c].dtype, np.number)]
+
+        groups = self._groups(chunk)[self.columns]
+        count = groups.count()
+        mean = groups.mean()
+        part = pd.concat({
+            'count': count,
+            'mean': mean,
+            'm2': (groups.var(ddof=0) * count).fillna(0),
+            'min': groups.min(),
+            'max': groups.max()
+        }, axis=1)
+        self._add_part(part)
+
+        if len(self._quantiles()):
+            for key, group in self._groups(chunk):
+                digests = self.digests.setdefault(key, {})
+                for c in self.columns:
+                    if not c in digests:
+                        digests[c] = TDigest(self.compression)
+                    digests[c].update(group[c].values)
+
+    def _add_part(self, part):
+        self.parts.append(part)
+        self._num_parts += len(part)
+
+        if self._num_parts > self.max_parts:
+            self.parts = [self._reduce()]
+            self._num_parts = len(self.parts[0])
+
+    def _reduce(self):
+        """
+        Merges the partial moments into a single row per group.
+        """
+        parts = pd.concat(self.parts)
+        level = list(range(parts.index.nlevels))
+
+        count = parts['count']
+        total = count.groupby(level=level).sum()
+        weighted = (count * parts['mean'].fillna(0)).groupby(level=level).sum()
+        mean = weighted / total
+
+        # the parallel form of Welford's algorithm: the sum of squared
+        # deviations plus the spread of the partial means
+        spread = (count * (parts['mean'] - mean.reindex(parts.index))**2)
+        m2 = parts['m2'].groupby(level=level).sum() + \
+             spread.fillna(0).groupby(level=level).sum()
+
+        return pd.concat({
+            'count': total,
+            'mean': mean,
+            'm2': m2,
+            'min': parts['min'].groupby(level=level).min(),
+            'max': parts['max'].groupby(level=level).max()
+        }, axis=1)
+
+    def merge(self, other):
+        """
+        Adds the aggregates of another Aggregator into this one.
+        """
+        if self.columns is None:
+            self.columns = other.columns
+
+        for part in other.parts:
+            self._add_part(part)
+
+        for key, digests in other.digests.items():
+            mine = self.digests.setdefault(key, {})
+            for c, digest in digests.items():
+                if not c in mine:
+                    mine[c] = TDigest(self.compression)
+                mine[c].merge(digest)
+
+    def result(self):
+        """
+        Returns the aggregates as a DataFrame indexed by the by columns, with
+        the (column, aggregate) pairs as its columns.
+        """
+        if not len(self.parts):
+            return pd.DataFrame()
+
+        m = self._reduce()
+        res = collections.OrderedDict()
+
+        for c in self.columns:
+            count = m['count'][c]
+
+            for name, q in self.agg:
+                if name == 'count':
+                    res[(c, name)] = count
+                elif name == 'sum':
+                    res[(c, name)] = m['mean'][c] * count
+                elif name == 'mean':
+                    res[(c, name)] = m['mean'][c]
+                elif name == 'var':
+                    res[(c, name)] = m['m2'][c] / (count - 1)
+                elif name == 'std':
+                    res[(c, name)] = np.sqrt(m['m2'][c] / (count - 1))
+                elif name in ('min', 'max'):
+                    res[(c, name)] = m[name][c]
+                else:
+                    res[(c, name)] = pd.Series(
+                        [self.digests[key][c].quantile(q) for key in m.index],
+                        index=m.index)
+
+        res = pd.DataFrame(res, index=m.index)
+        res.columns = pd.MultiIndex.from_tuples(list(res.columns))
+
+        if len(self.by):
+            res.index.names = self.by
+        else:
+            res.index = [0]
+
+        return res
@@ -0,0 +1,747 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import json
+import os
+import re
+import shutil
+import threading
+import tables
+from tables.exceptions import NoSuchNodeError
+from .profiling import ProfiledStore
+
+class Backend:
+    """
+    The storage that an ExpLog keeps its tables in. Nodes are addressed by
+    absolute paths (such as "/Exp/conf_0/metrics"); a node is either
+    a folder or a table, and tables can have child nodes as well (a conf
+    table holds the folders with the results of its confs).
+
+    Where clauses are strings in the syntax of pandas.HDFStore (see
+    ExpLog.conf2where); where can also be an array of row coordinates.
+    """
+    # whether the backend maintains indexes of the columns of tables
+    indexes = False
+
+    def keys(self):
+        """
+        Returns the paths of all the tables.
+        """
+        raise NotImplementedError()
+
+    def exists(self, path):
+        raise NotImplementedError()
+
+    def children(self, path=""):
+        """
+        Returns a dictionary that maps the names of the children of the node
+        at path to the nodes (of a backend-specific type), or None if there
+        is no node at path.
+        """
+        raise NotImplementedError()
+
+    def add_group(self, path, name):
+        raise NotImplementedError()
+
+    def coldtypes(self, path):
+        """
+        Returns a dictionary that maps the names of the columns of the table
+        at path to their dtypes, or None if there is no table at path.
+        """
+        raise NotImplementedError()
+
+    def num_rows(self, path):
+        """
+        Returns the number of rows of the table at path. Raises
+        a NoSuchNodeError if there is no node at path and a TypeError if
+        the node is not a table.
+        """
+        raise NotImplementedError()
+
+    def read_column(self, path, column, start=None, stop=None):
+        """
+        Returns the values of a column of the table at path as a numpy array.
+        """
+        raise NotImplementedError()
+
+    def select(self, path, where=None, start=None, stop=None, columns=None,
+               chunksize=None):
+        """
+        Returns the matching rows of the table at path as a DataFrame, or
+        an iterator over DataFrames of chunksize rows if chunksize is not
+        None. Raises a KeyError if there is no node at path and a TypeError
+        if the node is not a table.
+        """
+        raise NotImplementedError()
+
+    def select_as_coordinates(self, path, where=None, start=None, stop=None):
+        raise NotImplementedError()
+
+    def append(self, path, data, index=True, min_itemsize=None):
+        """
+        Appends data to the table at path, which is created if it does not
+        exist. If the columns of data do not match those of the table,
+        a ValueError is raised. If index is False, the columns are not
+        indexed (see create_index).
+        """
+        raise NotImplementedError()
+
+    def put(self, path, data, index=True, min_itemsize=None):
+        """
+        Stores data as the table at path, replacing the node at path
+        (including its children) if there is one.
+        """
+        raise NotImplementedError()
+
+    def remove(self, path, where=None, start=None, stop=None):
+        """
+        Removes the node at path or, if where, start or stop is given,
+        the matching rows of the table at path.
+        """
+        raise NotImplementedError()
+
+    def create_index(self, path, columns, optlevel=6, kind='medium'):
+        pass
+
+    def indexed_columns(self, path):
+        return set()
+
+    def reindex_dirty(self, path):
+        pass
+
+    def copy_from(self, other, src_path, dst_path, chunksize=100000):
+        """
+        Copies the node at src_path of backend other (with all its children)
+        to dst_path in this backend, which must not exist yet. The tables are
+        copied in chunks of chunksize rows.
+        """
+        is_table = not other.coldtypes(src_path) is None
+
+        if is_table:
+            for chunk in other.select(src_path, chunksize=chunksize):
+                self.append(dst_path, chunk)
+        else:
+            parent, name = dst_path.rsplit("/", 1)
+            self.add_group(parent or "/", name)
+
+        for name in other.children(src_path) or {}:
+            # the node that stores the rows of a table is not a child
+            if not (is_table and name == 'table'):
+                self.copy_from(other, src_path + "/" + name,
+                               dst_path + "/" + name, chunksize)
+
+    def enable_profiling(self, profiler):
+        pass
+
+    def disable_profiling(self):
+        pass
+
+    def file_image(self):
+        raise NotImplementedError("The backend has no file image.")
+
+    def flush(self, fsync=False):
+        pass
+
+    def close(self):
+        pass
+
+    is_open = True
+
+class SharedStore:
+    """
+    An HDFStore shared by all the HDFBackends in the process that have
+    the same file open (see HandleRegistry), with the number of them.
+    """
+    def __init__(self, path, store):
+        self.path = path
+        self.store = store
+        self.refs = 0
+
+    @property
+    def writable(self):
+        return self.store._mode != 'r'
+
+class HandleRegistry:
+    """
+    Keeps one HDF5 handle (a pandas.HDFStore) per file open in the process,
+    so that the logs opened on the same file share it instead of opening
+    the file again (which costs the reading of its metadata, and which
+    PyTables refuses if the modes are incompatible). The handles are
+    reference counted: a handle is closed when the last backend that
+    acquired it releases it.
+
+    If a file is open read-only and it is acquired for writing, the handle
+    is reopened read-write, for all the backends that share it (iterators
+    over the old handle are invalidated). A file that is open cannot be
+    acquired with mode 'w', since it cannot be truncated. A forked child
+    does not share the handles of its parent.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stores = {}
+        self._pid = os.getpid()
+
+    def _key(self, log_file):
+        if self._pid != os.getpid():
+            self._stores = {}
+            self._pid = os.getpid()
+
+        return os.path.realpath(log_file)
+
+    def acquire(self, log_file, mode='a'):
+        """
+        Returns the SharedStore of log_file, opened in mode (see
+        pandas.HDFStore), and adds a reference to it.
+        """
+        with self._lock:
+            key = self._key(log_file)
+            shared = self._stores.get(key)
+
+            if shared is None:
+                shared = SharedStore(key, pd.HDFStore(log_file, mode=mode))
+                self._stores[key] = shared
+            elif mode == 'w':
+                raise ValueError("The file '{}' is open and cannot be "
+                                 "truncated.".format(log_file))
+            elif mode != 'r' and not shared.writable:
+                shared.store.close()
+                shared.store = pd.HDFStore(log_file, mode='a')
+
+            shared.refs += 1
+            return shared
+
+    def release(self, shared):
+        """
+        Removes a reference to the SharedStore; the file is closed when
+        the last reference is removed.
+        """
+        with self._lock:
+            shared.refs -= 1
+
+            if shared.refs <= 0:
+                if self._stores.get(shared.path) is shared:
+                    del self._stores[shared.path]
+                shared.store.close()
+
+    def refs(self, log_file):
+        """
+        Returns the number of references to the handle of log_file (0 if
+        the file is not open).
+        """
+        with self._lock:
+            shared = self._stores.get(self._key(log_file))
+            return 0 if shared is None else shared.refs
+
+# the registry of the handles shared within the process
+handle_registry = HandleRegistry()
+
+class HDFBackend(Backend):
+    """
+    Stores the log in an HDF5 file through pandas.HDFStore (kept as
+    the store attribute); this is the default backend. Tables are stored
+    in the table format with all the columns as data columns.
+
+    The handles of files are shared with the other HDFBackends of
+    the process (see HandleRegistry), unless share is False. A backend opened
+    with mode 'r' refuses to write, even if the shared handle is writable.
+    In-memory logs are never shared.
+    """
+    indexes = True
+
+    def __init__(self, log_file, mode='a', in_memory=False, image=None,
+                 share=True):
+        self.mode = 'a' if in_memory else mode
+        self.profiler = None
+        self._profiled = None
+        self._shared = None
+        self._closed = False
+
+        if in_memory:
+            self._store = pd.HDFStore(log_file, mode='a', image=image,
+                    driver='H5FD_CORE', driver_core_backing_store=0)
+        elif share:
+            self._shared = handle_registry.acquire(log_file, mode)
+        else:
+            self._store = pd.HDFStore(log_file, mode=mode)
+
+    @property
+    def store(self):
+        """
+        The pandas.HDFStore; if profiling is enabled, it is wrapped in
+        a ProfiledStore.
+        """
+        store = self._store if self._shared is None else self._shared.store
+
+        if self.profiler is None:
+            return store
+        elif self._profiled is None or not self._profiled.store is store:
+            # the shared handle may have been reopened
+            self._profiled = ProfiledStore(store, self.profiler)
+
+        return self._profiled
+
+    def _check_writable(self):
+        if self.mode == 'r':
+            raise ValueError("The log is opened read-only.")
+
+    def keys(self):
+        return self.store.keys()
+
+    def exists(self, path):
+        return not self.store.get_node(path) is None
+
+    def children(self, path=""):
+        if not len(path):
+            n = self.store.root
+        else:
+            n = self.store.get_node(path)
+
+        if n is None: return None
+
+        try:
+            return n._v_children
+        except AttributeError:
+            return {}
+
+    def add_group(self, path, name):
+        self._check_writable()
+        return self.store._handle.create_group(path, name)
+
+    def table(self, path):
+        """
+        Returns the PyTables table that stores the pandas table at path, or
+        None if there is no such table.
+        """
+        table = getattr(self.store.get_node(path), 'table', None)
+        return table if isinstance(table, tables.Table) else None
+
+    def coldtypes(self, path):
+        table = self.table(path)
+        if table is None:
+            return None
+
+        return {c: table.coldtypes[c] for c in table.colnames if c != 'index'}
+
+    def num_rows(self, path):
+        storer = self.store.get_storer(path)
+        if storer is None:
+            raise NoSuchNodeError("There is no node at '{}'.".format(path))
+        return storer.nrows
+
+    def read_column(self, path, column, start=None, stop=None):
+        return self.table(path).read(start, stop, field=column)
+
+    def select(self, path, where=None, start=None, stop=None, columns=None,
+               chunksize=None):
+        return self.store.select(path, where=where, start=start, stop=stop,
+                                 columns=columns, chunksize=chunksize)
+
+    def select_as_coordinates(self, path, where=None, start=None, stop=None):
+        return self.store.select_as_coordinates(path, where=where,
+                                                start=start, stop=stop)
+
+    def append(self, path, data, index=True, min_itemsize=None):
+        self._check_writable()
+        self.store.append(path, data, format='table', data_columns=True,
+                          min_itemsize=min_itemsize, index=index)
+
+    def put(self, path, data, index=True, min_itemsize=None):
+        self._check_writable()
+        self.store.put(path, data, format='table', data_columns=True,
+                       min_itemsize=min_itemsize, index=index)
+
+    def remove(self, path, where=None, start=None, stop=None):
+        self._check_writable()
+        self.store.remove(path, where, start=start, stop=stop)
+
+    def create_index(self, path, columns, optlevel=6, kind='medium'):
+        self._check_writable()
+        self.store.create_table_index(path, columns=columns,
+                                      optlevel=optlevel, kind=kind)
+
+    def indexed_columns(self, path):
+        table = self.table(path)
+        return {c for c, indexed in table.colindexed.items() if indexed}
+
+    def reindex_dirty(self, path):
+        self._check_writable()
+        self.table(path).reindex_dirty()
+
+    def copy_from(self, other, src_path, dst_path, chunksize=100000):
+        self._check_writable()
+        
+        # between HDF5 files, the nodes are copied at the HDF5 level
+        if not isinstance(other, HDFBackend):
+            return super().copy_from(other, src_path, dst_path, chunksize)
+
+        parent, name = dst_path.rsplit("/", 1)
+        other.store.get_node(src_path)._f_copy(
+            newparent=self.store.get_node(parent or "/"), newname=name,
+            recursive=True)
+
+    def enable_profiling(self, profiler):
+        self.profiler = profiler
+        self._profiled = None
+
+    def disable_profiling(self):
+        self.profiler = None
+        self._profiled = None
+
+    def file_image(self):
+        return self.store._handle.get_file_image()
+
+    @property
+    def is_open(self):
+        if self._shared is None:
+            return self._store.is_open
+        return not self._closed and self._shared.store.is_open
+
+    def flush(self, fsync=False):
+        self.store.flush(fsync=fsync)
+
+    def close(self):
+        if self._shared is None:
+            self._store.close()
+        elif not self._closed:
+            self._closed = True
+            handle_registry.release(self._shared)
+
+    def __del__(self):
+        if not getattr(self, '_shared', None) is None:
+            self.close()
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("The directory backend requires pyarrow.")
+
+    return pyarrow
+
+# the tokens of where clauses: string literals and comparison operators
+_WHERE_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*"|' r"'(?:[^'\\]|\\.)*'|"
+                           r'[<>!=]=|=')
+
+def _where_expr(where):
+    """
+    Converts a where clause in the syntax of pandas.HDFStore into an
+    expression for DataFrame.query: the only difference is that
+    the equality may be written as '='.
+    """
+    def convert(match):
+        return '==' if match.group(0) == '=' else match.group(0)
+
+    return _WHERE_TOKENS.sub(convert, where)
+
+def query_frame(frame, where):
+    """
+    Returns the rows of frame that match the where clause. Like
+    pandas.HDFStore, raises a ValueError if the clause refers to columns
+    that are not in frame or cannot be parsed.
+    """
+    try:
+        return frame.query(_where_expr(where), engine='python')
+    except (NameError, SyntaxError) as e:
+        raise ValueError("The where clause '{}' is not valid: {}".format(
+            where, e))
+
+class DirectoryBackend(Backend):
+    """
+    Stores the log in a directory tree: every node is a directory and
+    a table is a node with a 'table' subdirectory, which holds the table as
+    a sequence of Arrow IPC files (Feather version 2), one per append, and
+    a JSON file that lists them. Requires pyarrow.
+
+    Since the tables do not share any file, different tables can be
+    appended to in parallel, from threads or processes (but not the same
+    table). The files are read through memory maps, so columns are not
+    copied until they are converted into pandas. Where clauses are evaluated
+    by DataFrame.query; there are no indexes, the tables are scanned.
+    """
+    table_dir = "table"
+    meta_file = "_meta.json"
+
+    def __init__(self, root, mode='a'):
+        """
+        Arguments:
+            root: str
+                The directory of the log; it is created if it does not exist
+                (unless mode is 'r').
+            mode: str
+                'a' to read and write, 'r' to only read.
+        """
+        self.pa = _import_pyarrow()
+        self.root = root
+        self.mode = mode
+
+        if mode != 'r':
+            os.makedirs(root, exist_ok=True)
+        elif not os.path.isdir(root):
+            raise FileNotFoundError("No log directory at '{}'.".format(root))
+
+    def _dir(self, path):
+        parts = [p for p in path.split("/") if len(p)]
+        return os.path.join(self.root, *parts)
+
+    def _meta_path(self, path):
+        return os.path.join(self._dir(path), self.table_dir, self.meta_file)
+
+    def _meta(self, path):
+        try:
+            with open(self._meta_path(path)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, path, meta):
+        # replaced atomically, so that readers see either the old or the new
+        # list of files
+        meta_path = self._meta_path(path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _check_writable(self):
+        if self.mode == 'r':
+            raise ValueError("The log at '{}' is opened read-only.".format(
+                self.root))
+
+    def _table_meta(self, path):
+        meta = self._meta(path)
+
+        if meta is None:
+            if not self.exists(path):
+                raise KeyError("No object named '{}' in the file.".format(path))
+            raise TypeError("The node at '{}' is not a table.".format(path))
+
+        return meta
+
+    def keys(self):
+        keys = []
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if os.path.basename(dirpath) == self.table_dir and \
+               self.meta_file in filenames:
+                rel = os.path.relpath(os.path.dirname(dirpath), self.root)
+                keys.append("/" + rel.replace(os.sep, "/"))
+
+        return sorted(keys)
+
+    def exists(self, path):
+        return os.path.isdir(self._dir(path))
+
+    def children(self, path=""):
+        directory = self._dir(path)
+        if not os.path.isdir(directory):
+            return None
+
+        return {name: (path.rstrip("/") + "/" + name)
+                for name in sorted(os.listdir(directory))
+                if os.path.isdir(os.path.join(directory, name))}
+
+    def add_group(self, path, name):
+        self._check_writable()
+        if not self.exists(path):
+            raise NoSuchNodeError("There is no node at '{}'.".format(path))
+
+        child = path.rstrip("/") + "/" + name
+        os.mkdir(self._dir(child))
+        return child
+
+    def coldtypes(self, path):
+        meta = self._meta(path)
+        if meta is None:
+            return None
+
+        return {c: np.dtype(meta['dtypes'][c]) for c in meta['columns']}
+
+    def num_rows(self, path):
+        meta = self._meta(path)
+
+        if meta is None:
+            if not self.exists(path):
+                raise NoSuchNodeError("There is no node at '{}'.".format(path))
+            raise TypeError("The node at '{}' is not a table.".format(path))
+
+        return sum(nrows for name, nrows in meta['parts'])
+
+    def _read(self, path, meta, columns=None):
+        """
+        Returns the table at path as a pyarrow Table (memory-mapped).
+        """
+        directory = os.path.join(self._dir(path), self.table_dir)
+        parts = []
+
+        for name, nrows in meta['parts']:
+            source = self.pa.memory_map(os.path.join(directory, name), 'r')
+            parts.append(self.pa.ipc.open_file(source).read_all())
+
+        table = self.pa.concat_tables(parts)
+
+        if not columns is None:
+            table = self.pa.Table.from_arrays(
+                [table.column(c) for c in columns], names=columns)
+
+        return table
+
+    def _to_frame(self, table, meta, columns):
+        frame = table.to_pandas()
+        index = pd.Index(frame['index'].values)
+        frame = frame[columns]
+        frame.index = index
+
+        # the conversion does not keep the dtypes of empty object columns
+        for c in columns:
+            dtype = np.dtype(meta['dtypes'][c])
+            if frame[c].dtype != dtype:
+                frame[c] = frame[c].astype(dtype)
+
+        return frame
+
+    def read_column(self, path, column, start=None, stop=None):
+        meta = self._table_meta(path)
+        start, stop, _ = slice(start, stop).indices(self.num_rows(path))
+        values = self._read(path, meta, [column]).column(column)
+        values = values.to_pandas().values
+        return values[start:stop]
+
+    def select(self, path, where=None, start=None, stop=None, columns=None,
+               chunksize=None):
+        meta = self._table_meta(path)
+        nrows = sum(n for name, n in meta['parts'])
+        start, stop, _ = slice(start, stop).indices(nrows)
+
+        if chunksize is None:
+            return self._select(path, meta, where, start, stop, columns)
+
+        return (self._select(path, meta, where, cstart,
+                             min(cstart + chunksize, stop), columns)
+                for cstart in range(start, stop, chunksize))
+
+    def _select(self, path, meta, where, start, stop, columns):
+        if columns is None:
+            columns = meta['columns']
+        else:
+            columns = list(columns)
+            for c in columns:
+                if not c in meta['dtypes']:
+                    raise KeyError("The table at '{}' has no column "
+                                   "'{}'.".format(path, c))
+
+        if isinstance(where, np.ndarray):
+            frame = self._to_frame(self._read(path, meta), meta,
+                                   meta['columns'])
+            return frame.iloc[where][columns]
+        elif where is None:
+            table = self._read(path, meta, columns + ['index'])
+            return self._to_frame(table.slice(start, stop - start), meta,
+                                  columns)
+
+        table = self._read(path, meta).slice(start, stop - start)
+        frame = self._to_frame(table, meta, meta['columns'])
+        return query_frame(frame, where)[columns]
+
+    def select_as_coordinates(self, path, where=None, start=None, stop=None):
+        meta = self._table_meta(path)
+        nrows = sum(n for name, n in meta['parts'])
+        start, stop, _ = slice(start, stop).indices(nrows)
+        frame = self._to_frame(self._read(path, meta).slice(start,
+                               stop - start), meta, meta['columns'])
+        frame.index = np.arange(start, stop)
+
+        if not where is None:
+            frame = query_frame(frame, where)
+
+        return frame.index.values
+
+    def _write_part(self, path, meta, data):
+        table = self.pa.Table.from_pandas(
+            data[meta['columns']].assign(index=data.index.values),
+            preserve_index=False)
+
+        name = "part-{:06d}.arrow".format(meta['next'])
+        meta['next'] += 1
+        directory = os.path.join(self._dir(path), self.table_dir)
+
+        with self.pa.OSFile(os.path.join(directory, name), 'wb') as f:
+            writer = self.pa.ipc.new_file(f, table.schema)
+            writer.write_table(table)
+            writer.close()
+
+        meta['parts'].append([name, len(data)])
+
+    def append(self, path, data, index=True, min_itemsize=None):
+        self._check_writable()
+        meta = self._meta(path)
+
+        if meta is None:
+            if self.exists(path):
+                raise TypeError("The node at '{}' is not a table.".format(path))
+            return self.put(path, data)
+
+        if set(data.columns) != set(meta['columns']):
+            raise ValueError("The columns {} do not match the columns {} of "
+                             "the table at '{}'.".format(list(data.columns),
+                             meta['columns'], path))
+
+        for c in meta['columns']:
+            if data[c].dtype != np.dtype(meta['dtypes'][c]):
+                raise ValueError("The dtype {} of column '{}' does not match "
+                                 "the dtype {} of the table at '{}'.".format(
+                                 data[c].dtype, c, meta['dtypes'][c], path))
+
+        self._write_part(path, meta, data)
+        self._write_meta(path, meta)
+
+    def put(self, path, data, index=True, min_itemsize=None):
+        self._check_writable()
+        directory = self._dir(path)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+
+        os.makedirs(os.path.join(directory, self.table_dir))
+        meta = {
+            'columns': [str(c) for c in data.columns],
+            'dtypes': {str(c): data[c].dtype.str for c in data.columns},
+            'parts': [],
+            'next': 0
+        }
+
+        self._write_part(path, meta, data)
+        self._write_meta(path, meta)
+
+    def remove(self, path, where=None, start=None, stop=None):
+        self._check_writable()
+
+        if where is None and start is None and stop is None:
+            if not self.exists(path):
+                raise KeyError("No object named '{}' in the file.".format(path))
+            shutil.rmtree(self._dir(path))
+            return
+
+        meta = self._meta(path)
+        if meta is None:
+            if not self.exists(path):
+                raise KeyError("No object named '{}' in the file.".format(path))
+            raise ValueError("Rows can only be removed from a table, the node "
+                             "at '{}' is not one.".format(path))
+
+        # the rows that are kept are rewritten into a single file
+        frame = self._to_frame(self._read(path, meta), meta, meta['columns'])
+
+        if isinstance(where, np.ndarray):
+            coords = where
+        else:
+            coords = self.select_as_coordinates(path, where, start, stop)
+
+        keep = np.ones(len(frame), dtype=bool)
+        keep[coords] = False
+        old_parts = [name for name, nrows in meta['parts']]
+        meta['parts'] = []
+        self._write_part(path, meta, frame[keep])
+        self._write_meta(path, meta)
+
+        directory = os.path.join(self._dir(path), self.table_dir)
+        for name in old_parts:
+            os.remove(os.path.join(directory, name))
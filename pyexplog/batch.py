@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pandas as pd
+import collections
+from tables.exceptions import NodeError
+
+def _compatible(dtype, stored):
+    # the strings of a frame are objects, those of a table bytes or str
+    return dtype == stored or (dtype.kind == 'O' and stored.kind in 'OSU')
+
+class Batch:
+    """
+    Stages the result writes of an ExpLog so that they are committed
+    together (see ExpLog.batch). The confs are added to their tables as
+    the results come in, since their indices are needed, but the result
+    tables are only written on commit: the appends to the same table are
+    concatenated into a single write and the commit is reported to
+    the flush policy of the log (which flushes once, by default).
+
+    If the commit fails, the writes that have already been made are undone
+    (appended rows are removed, new tables are removed and replaced tables
+    are restored) and the confs added in the batch are removed, along with
+    their result folders. Discarding a batch only removes the confs.
+    """
+    def __init__(self, explog):
+        self.explog = explog
+        # path -> [mode, list of DataFrames]
+        self.writes = collections.OrderedDict()
+        # (logFolder, iconf, keys) for the catalog of the conf index
+        self.result_keys = []
+        # (logFolder, iconf) of the confs added in the batch
+        self.added_confs = []
+
+    def add(self, path, data, mode):
+        """
+        Stages the write of data to the table at path (see ExpLog.add_data).
+        """
+        path = "/" + path.strip("/")
+
+        if isinstance(data, collections.Mapping):
+            data = pd.DataFrame([data.values()], columns=data.keys())
+
+        if mode == "replace":
+            self.writes[path] = ["replace", [data]]
+        elif mode == "append":
+            data = self._check_schema(path, data)
+            self.writes.setdefault(path, ["append", []])[1].append(data)
+        elif mode == "exception":
+            if path in self.writes or self.explog.exists(path):
+                raise NodeError("Folder '{}' already exists and add mode"
+                                " is set to exception.".format(path))
+            self.writes[path] = ["exception", [data]]
+        else:
+            raise TypeError("Unknown mode '{}'.".format(mode))
+
+    def _check_schema(self, path, data):
+        """
+        Makes sure that data can be appended to what is already staged for
+        path (or to the table at path), as it could be outside of a batch;
+        raises a ValueError otherwise. Returns data with its columns cast to
+        the dtypes of the table where this is exact (see
+        ExpLog.add_data).
+        """
+        if path in self.writes:
+            first = self.writes[path][1][0]
+            coldtypes = {c: first[c].dtype for c in first.columns}
+        else:
+            coldtypes = self.explog._storage(path).coldtypes(path)
+            if coldtypes is None:
+                return data
+
+        data = data.copy(deep=False)
+        self.explog._cast_columns(coldtypes, data)
+
+        if set(data.columns) != set(coldtypes) or \
+           not all(_compatible(data[c].dtype, coldtypes[c])
+                   for c in data.columns):
+            raise ValueError("The columns of the data do not match the schema"
+                             " of the table at '{}'.".format(path))
+
+        return data
+
+    def discard(self, path):
+        """
+        Drops the staged writes to path and to the tables under it (when
+        the node at path is removed).
+        """
+        path = "/" + path.strip("/")
+
+        for p in list(self.writes):
+            if p == path or p.startswith(path + "/"):
+                del self.writes[p]
+
+    def __len__(self):
+        return sum(len(frames) for mode, frames in self.writes.values())
+
+    def commit(self):
+        """
+        Writes the staged results into the log and flushes it.
+        """
+        explog = self.explog
+        undo = []
+
+        try:
+            with explog._flusher.deferred():
+                for path, (mode, frames) in self.writes.items():
+                    data = frames[0] if len(frames) == 1 else pd.concat(frames)
+
+                    if not explog.exists(path):
+                        undo.append((path, None, None))
+                    elif mode == "append":
+                        undo.append((path, explog.num_rows(path), None))
+                    else:
+                        undo.append((path, None, explog.select(path)))
+
+                    explog.add_data(path, data, mode=mode)
+
+            if not explog.conf_index is None:
+                for logFolder, iconf, keys in self.result_keys:
+                    explog.conf_index.add_result_keys(logFolder, iconf, keys)
+        except BaseException:
+            self._undo(undo)
+            self.rollback()
+            raise
+
+        explog._flusher.committed()
+
+    def _undo(self, undo):
+        backend = self.explog.backend
+
+        for path, nrows, old in reversed(undo):
+            if not backend.exists(path):
+                continue
+            elif not old is None:
+                backend.put(path, old, min_itemsize=self.explog.min_itemsize)
+            elif nrows is None:
+                backend.remove(path)
+            else:
+                backend.remove(path, start=nrows)
+
+    def rollback(self):
+        """
+        Drops the staged writes and removes the confs added in the batch.
+        """
+        explog = self.explog
+        self.writes.clear()
+        self.result_keys = []
+
+        for logFolder, iconf in reversed(self.added_confs):
+            conf_path = logFolder + "/" + explog.conf_key.format(iconf=iconf)
+            if explog.backend.exists(conf_path):
+                explog.backend.remove(conf_path)
+            explog.remove(logFolder, iconf)
+
+        self.added_confs = []
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The pyexplog command line tool for inspecting logs:
+
+    pyexplog ls log.h5 /Exp
+    pyexplog tree log.h5 --depth 2
+    pyexplog confs log.h5 /Exp --conf lr=0.1
+    pyexplog head log.h5 /Exp metrics --conf lr=0.1 -n 5
+    pyexplog stats log.h5 /Exp metrics --by lr --agg mean std p90
+    pyexplog export log.h5 parquet_dir
+
+A log is either an HDF5 file or a log directory (see
+backend.DirectoryBackend). The ls and tree commands read the structure of
+the log directly (through PyTables or the metadata files of the directory),
+without importing pandas; the other commands open an ExpLog, which is only
+imported when they run.
+"""
+import argparse
+import ast
+import json
+import os
+import sys
+
+# the layout of a log directory (see backend.DirectoryBackend)
+TABLE_DIR = "table"
+META_FILE = "_meta.json"
+
+class _HDFTree:
+    """
+    Lists the nodes of an HDF5 log using PyTables only.
+    """
+    def __init__(self, log_file):
+        import tables
+        self.handle = tables.open_file(log_file, mode='r')
+
+    def children(self, path):
+        """
+        Returns a list of (name, nrows) pairs for the children of the node at
+        path; nrows is None for folders. Raises a KeyError if there is no
+        node at path.
+        """
+        try:
+            node = self.handle.get_node(path)
+        except Exception:
+            raise KeyError("There is no node at '{}'.".format(path))
+
+        children = []
+
+        for name, child in sorted(node._v_children.items()):
+            if name == "table" and 'pandas_type' in node._v_attrs:
+                continue # the data of a table stored by pandas
+            elif 'pandas_type' in child._v_attrs and \
+                 "table" in getattr(child, '_v_children', ()):
+                children.append((name, child.table.nrows))
+            else:
+                children.append((name, None))
+
+        return children
+
+    def close(self):
+        self.handle.close()
+
+class _DirectoryTree:
+    """
+    Lists the nodes of a log directory using its metadata files only.
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def children(self, path):
+        directory = os.path.join(self.root,
+                                 *[p for p in path.split("/") if len(p)])
+        if not os.path.isdir(directory):
+            raise KeyError("There is no node at '{}'.".format(path))
+
+        children = []
+
+        for name in sorted(os.listdir(directory)):
+            child = os.path.join(directory, name)
+            if name == TABLE_DIR or not os.path.isdir(child):
+                continue
+
+            try:
+                with open(os.path.join(child, TABLE_DIR, META_FILE)) as f:
+                    nrows = sum(n for part, n in json.load(f)['parts'])
+            except FileNotFoundError:
+                nrows = None
+
+            children.append((name, nrows))
+
+        return children
+
+    def close(self):
+        pass
+
+def _open_tree(log):
+    if os.path.isdir(log):
+        return _DirectoryTree(log)
+    elif not os.path.exists(log):
+        raise FileNotFoundError("No log at '{}'.".format(log))
+    return _HDFTree(log)
+
+def _describe(nrows):
+    return "folder" if nrows is None else "table ({} rows)".format(nrows)
+
+def _join(path, name):
+    return path.rstrip("/") + "/" + name
+
+def cmd_ls(args, out):
+    tree = _open_tree(args.log)
+
+    try:
+        children = tree.children(args.path)
+        width = max([len(name) for name, nrows in children] + [0])
+
+        for name, nrows in children:
+            print("{:<{}}  {}".format(name, width, _describe(nrows)), file=out)
+    finally:
+        tree.close()
+
+def cmd_tree(args, out):
+    tree = _open_tree(args.log)
+
+    def walk(path, depth):
+        for name, nrows in tree.children(path):
+            print("{}{}  [{}]".format("  " * depth, name, _describe(nrows)),
+                  file=out)
+            if args.depth is None or depth + 1 < args.depth:
+                walk(_join(path, name), depth + 1)
+
+    try:
+        print(args.path, file=out)
+        walk(args.path, 0)
+    finally:
+        tree.close()
+
+def _open_log(args):
+    from .log import ExpLog
+
+    if os.path.isdir(args.log):
+        from .backend import DirectoryBackend
+        backend = DirectoryBackend(args.log, mode='r')
+        return ExpLog(backend=backend, conf_index=args.conf_index)
+    elif not os.path.exists(args.log):
+        raise FileNotFoundError("No log at '{}'.".format(args.log))
+
+    return ExpLog(args.log, mode='r', conf_index=args.conf_index)
+
+def _parse_value(value):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+def _parse_conf(specs):
+    """
+    Parses a list of 'param=value' strings into a conf specification; the
+    values are parsed as Python literals where possible (and are strings
+    otherwise). Returns None (all confs) if the list is empty.
+    """
+    if not specs:
+        return None
+
+    conf = {}
+    for spec in specs:
+        name, sep, value = spec.partition("=")
+        if not sep:
+            raise ValueError("Expected param=value, got '{}'.".format(spec))
+        conf[name.strip()] = _parse_value(value.strip())
+
+    return conf
+
+def _print_frame(frame, out):
+    print(frame.to_string() if len(frame.columns) else
+          "(no columns, {} rows)".format(len(frame)), file=out)
+
+def cmd_confs(args, out):
+    explog = _open_log(args)
+
+    try:
+        confs = explog.select(args.folder, _parse_conf(args.conf))
+        if explog.hash_key in confs.columns:
+            del confs[explog.hash_key]
+        _print_frame(confs, out)
+    finally:
+        explog.close()
+
+def _print_results(args, out, tail):
+    import numpy as np
+    explog = _open_log(args)
+
+    try:
+        confs = explog.select(args.folder, _parse_conf(args.conf))
+
+        for iconf in confs.index:
+            path = _join(args.folder, explog.conf_key.format(iconf=iconf))
+            path = _join(path, args.key)
+            if not explog.exists(path):
+                continue
+
+            nrows = explog.num_rows(path)
+            if tail:
+                start, stop = max(nrows - args.n, 0), nrows
+            else:
+                start, stop = 0, min(args.n, nrows)
+
+            # numpy scalars are printed as Python values
+            params = ", ".join("{}={!r}".format(c, v.item()
+                                   if isinstance(v, np.generic) else v)
+                               for c, v in confs.loc[iconf].items()
+                               if c != explog.hash_key)
+            print("== {} ({}) ==".format(
+                explog.conf_key.format(iconf=iconf), params), file=out)
+            _print_frame(explog.select(path, start=start, stop=stop), out)
+    finally:
+        explog.close()
+
+def cmd_head(args, out):
+    _print_results(args, out, tail=False)
+
+def cmd_tail(args, out):
+    _print_results(args, out, tail=True)
+
+def cmd_stats(args, out):
+    explog = _open_log(args)
+
+    try:
+        stats = explog.aggregate_results(args.folder, args.key, by=args.by,
+                                         agg=args.agg, columns=args.columns,
+                                         conf=_parse_conf(args.conf),
+                                         chunksize=args.chunksize)
+        if len(stats):
+            _print_frame(stats, out)
+        else:
+            print("No results.", file=out)
+    finally:
+        explog.close()
+
+def cmd_export(args, out):
+    from .export import export_parquet
+    explog = _open_log(args)
+
+    try:
+        written = export_parquet(explog, args.root, args.folders, args.keys,
+                                 chunksize=args.chunksize,
+                                 compression=args.compression)
+    finally:
+        explog.close()
+
+    for path, nrows in sorted(written.items()):
+        print("{}  {} rows".format(path, nrows), file=out)
+    print("Exported {} rows from {} tables.".format(sum(written.values()),
+                                                   len(written)), file=out)
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog="pyexplog",
+        description="Inspects the logs written by pyexplog.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    def command(name, func, help, log_args=False):
+        sub = commands.add_parser(name, help=help, description=help)
+        sub.set_defaults(func=func)
+        sub.add_argument("log", help="an HDF5 log file or a log directory")
+
+        if log_args:
+            sub.add_argument("--conf-index", default=None,
+                help="the SQLite conf index of the log (see ExpLog)")
+
+        return sub
+
+    def conf_arg(sub):
+        sub.add_argument("--conf", "-c", action="append", default=[],
+            metavar="PARAM=VALUE",
+            help="only the confs with the value of the parameter; "
+                 "can be repeated")
+
+    sub = command("ls", cmd_ls, "lists the children of a node")
+    sub.add_argument("path", nargs="?", default="/")
+
+    sub = command("tree", cmd_tree, "prints the nodes under a node")
+    sub.add_argument("path", nargs="?", default="/")
+    sub.add_argument("--depth", "-d", type=int, default=None,
+                     help="the number of levels printed")
+
+    sub = command("confs", cmd_confs, "prints the confs of a log folder",
+                  log_args=True)
+    sub.add_argument("folder")
+    conf_arg(sub)
+
+    for name, func, which in (("head", cmd_head, "first"),
+                              ("tail", cmd_tail, "last")):
+        sub = command(name, func, "prints the {} rows of the results stored "
+                      "under a key, for every conf".format(which),
+                      log_args=True)
+        sub.add_argument("folder")
+        sub.add_argument("key")
+        sub.add_argument("-n", type=int, default=10,
+                         help="the number of rows per conf")
+        conf_arg(sub)
+
+    sub = command("stats", cmd_stats, "aggregates the results stored under "
+                  "a key (see ExpLog.aggregate_results)", log_args=True)
+    sub.add_argument("folder")
+    sub.add_argument("key")
+    sub.add_argument("--by", "-b", nargs="+", default=None,
+                     help="parameters or result columns to group by")
+    sub.add_argument("--agg", "-a", nargs="+", default=["mean", "std"],
+                     help="aggregates such as count, mean, std, min, max, "
+                          "median or p90")
+    sub.add_argument("--columns", nargs="+", default=None,
+                     help="the result columns to aggregate")
+    sub.add_argument("--chunksize", type=int, default=100000)
+    conf_arg(sub)
+
+    sub = command("export", cmd_export, "exports the log into partitioned "
+                  "Parquet datasets (see export.export_parquet)",
+                  log_args=True)
+    sub.add_argument("root", help="the directory to export into")
+    sub.add_argument("--folders", nargs="+", default=None)
+    sub.add_argument("--keys", nargs="+", default=None)
+    sub.add_argument("--chunksize", type=int, default=100000)
+    sub.add_argument("--compression", default="snappy")
+
+    return parser
+
+def main(argv=None, out=None):
+    """
+    Runs the command line tool with the arguments argv (sys.argv[1:] if None)
+    and returns the exit status.
+    """
+    args = make_parser().parse_args(argv)
+    out = sys.stdout if out is None else out
+
+    try:
+        args.func(args, out)
+    except (KeyError, TypeError, ValueError, OSError, ImportError) as e:
+        message = e.args[0] if isinstance(e, KeyError) and e.args else e
+        print("pyexplog: error: {}".format(message), file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
 import itertools
+import collections
+import bisect
+import numbers
+import random
 
 class ParameterSpaceIter:
     def __init__(self, iterable):
@@ -9,40 +15,393 @@ class ParameterSpaceIter:
     def __next__(self):
         return dict(next(self.iter))
         
+def _primes(n):
+    primes = []
+    candidate = 2
+    
+    while len(primes) < n:
+        if all(candidate % p for p in primes):
+            primes.append(candidate)
+        candidate += 1
+    
+    return primes
+
+def _radical_inverse(i, base):
+    inv, f = 0.0, 1.0 / base
+    
+    while i > 0:
+        i, digit = divmod(i, base)
+        inv += digit * f
+        f /= base
+    
+    return inv
+
+def _latin_hypercube(k, dims, rng):
+    columns = []
+    
+    for d in range(dims):
+        perm = list(range(k))
+        rng.shuffle(perm)
+        columns.append([(p + rng.random()) / k for p in perm])
+    
+    return zip(*columns)
+
+def _halton(k, dims, rng):
+    bases = _primes(dims)
+    # a random shift makes the sequence depend on the seed
+    shifts = [rng.random() for d in range(dims)]
+    return ([(_radical_inverse(i, b) + s) % 1.0 for b, s in zip(bases, shifts)]
+            for i in range(1, k + 1))
+
+def _sobol(k, dims, seed):
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError("Sobol sampling requires scipy >= 1.7.")
+    
+    if not hasattr(np.random, 'Generator'): # NumPy < 1.17
+        seed = np.random.RandomState(seed)
+    
+    return qmc.Sobol(d=dims, scramble=True, seed=seed).random(k)
+        
 class ParameterSpace:
-    class _ItWr:
-        def __init__(self, iterfunc):
-            self.iterfunc = iterfunc
-            
-        def __iter__(self):
-            return self.iterfunc()
-                
+    """
+    A space of parameter points. ParameterSpace(param_name, values) creates
+    a space with a single parameter; spaces can be combined using * (the
+    cartesian product) and + (concatenation).
+
+    The spaces are sized and indexable: len(space) is computed analytically
+    and space[i] decodes the i-th point directly (mixed-radix arithmetic for
+    products, offset lookup for sums), without iterating over the preceding
+    points. Slicing a space (space[start:stop:step]) or sharding it (see
+    shard) returns a lazy space as well, and so does sampling (see sample).
+
+    Besides point by point, the spaces can be materialized in columnar
+    blocks (see to_frame, iter_frames and to_records), which are built using
+    vectorized index arithmetic rather than a dict per point.
+    """
     def __init__(self, param_name, iterable):
-        ItWr = ParameterSpace._ItWr
-        
-        if isinstance(param_name, set):            
+        """
+        Arguments:
+            param_name: The name of the parameter; or a set of parameter
+                names, in which case iterable yields the points directly,
+                each as a sequence of (param_name, value) pairs.
+            iterable: The values of the parameter (or the points).
+        """
+        if isinstance(param_name, set):
             self.paramNames = param_name
-            self.iterable = iterable
-        else:            
+            self.param_name = None
+            self.values = [tuple(tp) for tp in iterable]
+        else:
             self.paramNames = set([param_name])
-            self.iterable = ItWr(lambda: ((tp, ) for tp in zip(itertools.repeat(param_name), iterable)))
+            self.param_name = param_name
+            
+            # the values are indexed by position; other containers (such as
+            # Series or dicts, which are indexed by label) are materialized
+            if isinstance(iterable, (list, tuple, range, np.ndarray)):
+                self.values = iterable
+            else:
+                self.values = list(iterable)
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def _point(self, i):
+        if self.param_name is None:
+            return self.values[i]
         
-    def __mul__(self, space2):
-        ItWr = ParameterSpace._ItWr
+        return ((self.param_name, self.values[i]), )
+    
+    def _points(self):
+        if self.param_name is None:
+            return iter(self.values)
+        
+        return (((self.param_name, v), ) for v in self.values)
+    
+    def _radices(self):
+        return [len(self)]
+    
+    def _frame(self, indices):
+        values = self.values
+        
+        if self.param_name is None:
+            points = [dict(values[i]) for i in indices]
+            # keep the columns in the order in which the parameters appear
+            columns = []
+            for point in points:
+                columns.extend(k for k in point if not k in columns)
+            return pd.DataFrame(points, columns=columns)
+        elif isinstance(values, range):
+            col = values.start + values.step * indices
+        else:
+            try:
+                array = self._array
+            except AttributeError:
+                # a Series keeps mixed types and tuples as objects
+                array = self._array = pd.Series(list(values)).values
+            col = array[indices]
+        
+        return pd.DataFrame({self.param_name: col})
         
+    def __mul__(self, space2):
         # make sure that the spaces do not share the same parameters
         if len(self.paramNames & space2.paramNames):
             raise RuntimeError("To compute cartesian product, the two spaces must not share the same parameters.")
             
-        return ParameterSpace(self.paramNames | space2.paramNames,
-            ItWr(lambda: (tp1 + tp2 for tp1, tp2 in itertools.product(self.iterable, space2.iterable))))
+        return ProductSpace(self, space2)
     
     def __add__(self, space2):
-        return ParameterSpace(self.paramNames | space2.paramNames,
-                              itertools.chain(self.iterable, space2.iterable))
+        return SumSpace(self, space2)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return SliceSpace(self, range(len(self))[i])
+        
+        if not isinstance(i, numbers.Integral):
+            raise TypeError("Parameter space indices must be integers "
+                            "or slices, not '{}'.".format(type(i).__name__))
+        
+        n = len(self)
+        if i < 0: i += n
+        if i < 0 or i >= n:
+            raise IndexError("Parameter space index out of range.")
+        
+        return dict(self._point(i))
+    
+    def shard(self, ishard, num_shards):
+        """
+        Returns the ishard-th of num_shards strided shards of the space,
+        i.e. the points ishard, ishard + num_shards, ishard + 2*num_shards...
+        """
+        if ishard < 0 or ishard >= num_shards:
+            raise IndexError("Shard index out of range.")
+        return self[ishard::num_shards]
+    
+    def sample(self, k, method='uniform', seed=None):
+        """
+        Draws k points from the space and returns them as a lazy space. Only
+        the k drawn indices are generated, so this takes O(k) time and memory
+        regardless of the size of the space. The draw is reproducible given
+        the seed.
+        
+        Arguments:
+            method: str
+                * 'uniform': uniformly, without replacement;
+                * 'stratified': the index space is split into k equally
+                  sized strata and one point is drawn from each;
+                * 'lhs': a Latin hypercube over the factors of a product
+                  space (for other spaces the same as 'stratified'): the
+                  indices of every factor are split into k strata and each
+                  stratum is hit exactly once;
+                * 'halton': a (randomly shifted) Halton sequence over the
+                  factors of a product space;
+                * 'sobol': a scrambled Sobol sequence over the factors of
+                  a product space (requires scipy).
+                Unlike 'uniform' and 'stratified', the last three may draw the
+                same point more than once if k is comparable to the number of
+                values of the factors.
+        
+        If k is larger than the space, a ValueError is raised.
+        """
+        n = len(self)
+        if k < 0 or k > n:
+            raise ValueError("Cannot draw {} points from a space of "
+                             "{} points.".format(k, n))
+        
+        rng = random.Random(seed)
+        
+        if method == 'uniform':
+            indices = rng.sample(range(n), k)
+        elif method == 'stratified':
+            indices = [j * n // k + rng.randrange((j + 1) * n // k - j * n // k)
+                       for j in range(k)]
+        else:
+            radices = self._radices()
+            
+            if method == 'lhs':
+                units = _latin_hypercube(k, len(radices), rng)
+            elif method == 'halton':
+                units = _halton(k, len(radices), rng)
+            elif method == 'sobol':
+                units = _sobol(k, len(radices), seed)
+            else:
+                raise ValueError("Unknown sampling method '{}'.".format(method))
+            
+            indices = []
+            
+            for unit in units:
+                i = 0
+                for u, l in zip(unit, radices):
+                    i = i * l + min(int(u * l), l - 1)
+                indices.append(i)
+        
+        return SliceSpace(self, indices)
             
     def __iter__(self):
-        return ParameterSpaceIter(self.iterable)
+        return ParameterSpaceIter(self._points())
+    
+    def to_frame(self, start=None, stop=None, step=None):
+        """
+        Materializes the points space[start:stop:step] as a DataFrame with
+        a column per parameter. In a sum of spaces with different parameters,
+        the parameters that a point does not have are NaN.
+        """
+        indices = range(len(self))[start:stop:step]
+        return self._frame(np.arange(indices.start, indices.stop,
+                                     indices.step, dtype=np.int64))
+    
+    def iter_frames(self, chunksize=100000):
+        """
+        Materializes the space in chunks of chunksize points; yields them as
+        DataFrames (see to_frame).
+        """
+        for start in range(0, len(self), chunksize):
+            yield self.to_frame(start, start + chunksize)
+    
+    def to_records(self, start=None, stop=None, step=None):
+        """
+        Like to_frame, but returns a numpy structured array.
+        """
+        return self.to_frame(start, stop, step).to_records(index=False)
+
+class ProductSpace(ParameterSpace):
+    """
+    The cartesian product of parameter spaces; the last factor varies the
+    fastest. Created by multiplying spaces using *.
+    """
+    def __init__(self, *spaces):
+        self.factors = []
+        
+        for space in spaces:
+            if isinstance(space, ProductSpace):
+                self.factors.extend(space.factors)
+            else:
+                self.factors.append(space)
+        
+        self.paramNames = set().union(*(f.paramNames for f in self.factors))
+        self.lens = [len(f) for f in self.factors]
+        
+    def __len__(self):
+        n = 1
+        for l in self.lens: n *= l
+        return n
+    
+    def _point(self, i):
+        parts = []
+        
+        for f, l in zip(reversed(self.factors), reversed(self.lens)):
+            i, j = divmod(i, l)
+            parts.append(f._point(j))
+        
+        return sum(reversed(parts), ())
+    
+    def _points(self):
+        return (sum(tps, ()) for tps in
+                itertools.product(*(f._points() for f in self.factors)))
+    
+    def _radices(self):
+        return self.lens
+    
+    def _frame(self, indices):
+        frames = []
+        
+        for f, l in zip(reversed(self.factors), reversed(self.lens)):
+            indices, j = np.divmod(indices, l)
+            frames.append(f._frame(j))
+        
+        return pd.concat(frames[::-1], axis=1)
+
+class SumSpace(ParameterSpace):
+    """
+    The concatenation of parameter spaces. Created by adding spaces using +.
+    """
+    def __init__(self, *spaces):
+        self.terms = []
+        
+        for space in spaces:
+            if isinstance(space, SumSpace):
+                self.terms.extend(space.terms)
+            else:
+                self.terms.append(space)
+        
+        self.paramNames = set().union(*(t.paramNames for t in self.terms))
+        self.offsets = [0]
+        for t in self.terms:
+            self.offsets.append(self.offsets[-1] + len(t))
+    
+    def __len__(self):
+        return self.offsets[-1]
+    
+    def _point(self, i):
+        k = bisect.bisect_right(self.offsets, i) - 1
+        return self.terms[k]._point(i - self.offsets[k])
+    
+    def _points(self):
+        return itertools.chain.from_iterable(t._points() for t in self.terms)
+    
+    def _frame(self, indices):
+        iterms = np.searchsorted(self.offsets, indices, side='right') - 1
+        frames = []
+        
+        for k in np.unique(iterms):
+            pos = np.nonzero(iterms == k)[0]
+            frame = self.terms[k]._frame(indices[pos] - self.offsets[k])
+            frame.index = pos
+            frames.append(frame)
+        
+        if len(frames) == 0:
+            return pd.DataFrame()
+        
+        # keep the columns in the order in which the parameters appear
+        columns = []
+        for frame in frames:
+            columns.extend(c for c in frame.columns if not c in columns)
+        
+        frame = pd.concat([f.reindex(columns=columns) for f in frames])
+        frame = frame.sort_index()
+        frame.index = pd.RangeIndex(len(frame))
+        return frame
+
+class SliceSpace(ParameterSpace):
+    """
+    A lazy view of the points of a space, which are selected by a sequence
+    of indices: a range if created by slicing or sharding a space, a list if
+    created by sampling it.
+    """
+    def __init__(self, space, indices):
+        # slices of slices are composed into a single range
+        if isinstance(space, SliceSpace) and isinstance(indices, range) \
+           and isinstance(space.indices, range):
+            base = space.indices
+            indices = range(base.start + base.step * indices.start,
+                            base.start + base.step * indices.stop,
+                            base.step * indices.step)
+            space = space.space
+            
+        self.space = space
+        self.indices = indices
+        self.paramNames = space.paramNames
+        
+    def __len__(self):
+        return len(self.indices)
+    
+    def _point(self, i):
+        return self.space._point(self.indices[i])
+    
+    def _points(self):
+        return (self.space._point(i) for i in self.indices)
+    
+    def _frame(self, indices):
+        if isinstance(self.indices, range):
+            r = self.indices
+            return self.space._frame(r.start + r.step * indices)
+        
+        try:
+            array = self._array
+        except AttributeError:
+            array = self._array = np.asarray(self.indices, dtype=np.int64)
+        
+        return self.space._frame(array[indices])
         
 class Configuration(dict):
     """
@@ -92,11 +451,93 @@ class Configuration(dict):
         if not unlogged_params is None:
             self.unlogged_params.update(unlogged_params)
 
+class ConfPoint(collections.MutableMapping):
+    """
+    A compact configuration: a view of a shared base configuration with
+    a small per-point overlay of parameters. It behaves as a Configuration
+    (a mapping of the logged parameters with an unlogged_params attribute),
+    but only stores the overlay, so millions of points can be created from
+    one base without copying it for each of them.
+    
+    Writes go to the overlay; the base is never modified (but changes made
+    to the base are visible through every point). Use to_configuration to
+    obtain a standalone Configuration.
+    
+    A pickled ConfPoint includes its base: the points pickled together
+    (e.g. in a list) share a single copy of it, but every point pickled on
+    its own carries a whole copy.
+    """
+    __slots__ = ('base', 'overlay', 'unlogged_overlay', 'deleted')
+    
+    def __init__(self, base, overlay=None, unlogged_params=None):
+        self.base = base
+        self.overlay = overlay if not overlay is None else {}
+        self.unlogged_overlay = unlogged_params
+        self.deleted = None
+    
+    def __getitem__(self, key):
+        try:
+            return self.overlay[key]
+        except KeyError:
+            if not self.deleted is None and key in self.deleted:
+                raise
+            return self.base[key]
+    
+    def __setitem__(self, key, value):
+        self.overlay[key] = value
+        if not self.deleted is None:
+            self.deleted.discard(key)
+    
+    def __delitem__(self, key):
+        if not key in self:
+            raise KeyError(key)
+        
+        self.overlay.pop(key, None)
+        if key in self.base:
+            if self.deleted is None:
+                self.deleted = set()
+            self.deleted.add(key)
+    
+    def __iter__(self):
+        # the base parameters come first, as in a Configuration
+        for k in self.base:
+            if self.deleted is None or not k in self.deleted:
+                yield k
+        
+        for k in self.overlay:
+            if not k in self.base:
+                yield k
+    
+    def __len__(self):
+        return sum(1 for k in self)
+    
+    def __repr__(self):
+        return "ConfPoint({})".format(dict(self))
+    
+    @property
+    def unlogged_params(self):
+        if self.unlogged_overlay is None:
+            self.unlogged_overlay = {}
+        
+        return collections.ChainMap(self.unlogged_overlay,
+                    getattr(self.base, 'unlogged_params', {}))
+    
+    def to_configuration(self):
+        return Configuration(derived_from=self)
+    
+    def __getstate__(self):
+        return self.base, self.overlay, self.unlogged_overlay, self.deleted
+    
+    def __setstate__(self, state):
+        self.base, self.overlay, self.unlogged_overlay, self.deleted = state
+
 class ConfCollectionIter:
-    def __init__(self, base_conf, param_generator, unlogged_generator=None):
+    def __init__(self, base_conf, param_generator, unlogged_generator=None,
+                 compact=False):
         self.base_conf = base_conf
         self.param_generator = param_generator
         self.unlogged_generator = unlogged_generator
+        self.compact = compact
         
     def __next__(self):
         param_point = next(self.param_generator)
@@ -105,12 +546,69 @@ class ConfCollectionIter:
         else:
             unlogged_params = None
         
+        if self.compact:
+            return ConfPoint(self.base_conf, param_point, unlogged_params)
+        
         return Configuration(self.base_conf, **param_point, unlogged_params=unlogged_params)
         
 class ConfCollection:
-    def __init__(self, base_conf=None, param_space=None):
+    def __init__(self, base_conf=None, param_space=None, compact=False):
+        """
+        Arguments:
+            base_conf: The configuration shared by all the points.
+            param_space: The space of the parameters that vary between
+                the points (e.g. a ParameterSpace).
+            compact: If True, the configurations are yielded as ConfPoints,
+                which share the base_conf instead of copying it; if False
+                (the default), as standalone Configurations.
+        """
         self.base_conf = base_conf if not base_conf is None else {}
         self.param_space = param_space if not param_space is None else [{}]
+        self.compact = compact
+    
+    def __len__(self):
+        return len(self.param_space)
+    
+    def __getitem__(self, i):
+        """
+        Returns the i-th configuration of the collection, or a collection
+        with a slice of the parameter space if i is a slice. The parameter
+        space needs to be indexable (e.g. a ParameterSpace).
+        """
+        if isinstance(i, slice):
+            return ConfCollection(self.base_conf, self.param_space[i],
+                                  self.compact)
+        
+        if self.compact:
+            return ConfPoint(self.base_conf, self.param_space[i])
+        
+        return Configuration(self.base_conf, **self.param_space[i])
+    
+    def sample(self, k, method='uniform', seed=None):
+        """
+        Draws k configurations from the collection and returns them as
+        a collection; see ParameterSpace.sample.
+        """
+        return ConfCollection(self.base_conf,
+                              self.param_space.sample(k, method, seed),
+                              self.compact)
+    
+    def iter_frames(self, chunksize=100000):
+        """
+        Materializes the logged parameters of the configurations in chunks
+        of chunksize; yields them as DataFrames with a column per parameter,
+        which can be inserted into a log directly (see ExpLog.add_confs).
+        The parameter space needs to be a ParameterSpace.
+        """
+        for frame in self.param_space.iter_frames(chunksize):
+            for k, v in self.base_conf.items():
+                if not k in frame:
+                    frame[k] = v if np.isscalar(v) else [v] * len(frame)
+            
+            # the base parameters come first, as in a Configuration
+            base = [k for k in self.base_conf]
+            yield frame[base + [k for k in frame.columns if not k in base]]
     
     def __iter__(self):
-        return ConfCollectionIter(self.base_conf, iter(self.param_space))
\ No newline at end of file
+        return ConfCollectionIter(self.base_conf, iter(self.param_space),
+                                  compact=self.compact)
\ No newline at end of file
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import contextlib
+import json
+import os
+import re
+import sqlite3
+from .backend import query_frame
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    columns TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS confs (
+    folder TEXT NOT NULL,
+    iconf INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    PRIMARY KEY (folder, iconf)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS confs_hash ON confs (folder, hash);
+CREATE TABLE IF NOT EXISTS results (
+    folder TEXT NOT NULL,
+    iconf INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (folder, iconf, key)
+) WITHOUT ROWID;
+"""
+
+def _folder(path):
+    return "/" + path.strip("/")
+
+def _dtype_name(dtype):
+    # object columns are stored as 'object': pandas does not accept '|O'
+    return 'object' if dtype.kind == 'O' else dtype.str
+
+def _plain(value):
+    # numpy scalars are not JSON serializable
+    return value.item() if isinstance(value, np.generic) else value
+
+class SQLiteConfIndex:
+    """
+    Keeps the conf tables of a log (and a catalog of the result keys of
+    every conf) in an SQLite database next to the log, so that several
+    processes can look up and add configurations concurrently; the results
+    themselves stay in the backend of the log. See ExpLog (the conf_index
+    argument).
+
+    The database is in WAL mode, so lookups do not block each other or
+    a writer. Configurations are added in IMMEDIATE transactions, which
+    serialize the writers: claim looks up a configuration and adds it if it
+    is missing within a single transaction, so two processes never assign
+    different indices to the same configuration, or the same index to two
+    configurations. Full-configuration lookups use an index on the hash of
+    the configuration (see ExpLog.conf_hash); other where clauses are
+    evaluated on the conf table using DataFrame.query.
+
+    The index provides the table operations of a Backend for the conf
+    tables. Every process (and thread) needs its own connection;
+    the connection is reopened automatically in a forked child.
+    """
+    def __init__(self, path, hash_key="_hash_", timeout=60.0):
+        """
+        Arguments:
+            path: str
+                The path to the SQLite database; it is created if it does
+                not exist.
+            timeout: float
+                How long (in seconds) to wait for the lock of another writer.
+        """
+        self.path = path
+        self.hash_key = hash_key
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+
+        # the schema is created under the write lock, since several
+        # processes may open a new database at once
+        with self._transaction() as conn:
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+
+    @property
+    def conn(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                         isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+
+        return self._conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def _columns(self, folder, conn=None):
+        row = (conn or self.conn).execute(
+            "SELECT columns FROM folders WHERE folder = ?",
+            (_folder(folder),)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _table_columns(self, folder):
+        columns = self._columns(folder)
+        if columns is None:
+            raise KeyError("No object named '{}' in the file.".format(folder))
+        return columns
+
+    def keys(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT folder FROM folders ORDER BY folder")]
+
+    def has_table(self, folder):
+        return not self._columns(folder) is None
+
+    exists = has_table
+
+    # the database has its own index of the hashes; the parameter columns
+    # are not indexed
+    indexes = False
+
+    def create_index(self, folder, columns, optlevel=6, kind='medium'):
+        pass
+
+    def coldtypes(self, folder):
+        columns = self._columns(folder)
+        if columns is None:
+            return None
+
+        return {name: np.dtype(dtype) for name, dtype in columns}
+
+    def num_rows(self, folder):
+        self._table_columns(folder)
+        return self.conn.execute("SELECT COUNT(*) FROM confs WHERE folder = ?",
+                                 (_folder(folder),)).fetchone()[0]
+
+    def _frame(self, columns, rows):
+        """
+        Converts (iconf, hash, params) rows into a DataFrame indexed by iconf.
+        """
+        params = [name for name, dtype in columns if name != self.hash_key]
+        frame = pd.DataFrame.from_records([json.loads(p) for i, h, p in rows],
+                                          columns=params)
+        frame[self.hash_key] = [h for i, h, p in rows]
+        frame.index = pd.Index([i for i, h, p in rows], dtype=np.int64)
+
+        frame = frame[[name for name, dtype in columns]]
+        for name, dtype in columns:
+            frame[name] = frame[name].astype(np.dtype(dtype))
+
+        return frame
+
+    def _rows(self, folder, start=None, stop=None, hash=None):
+        """
+        Returns the (iconf, hash, params) rows of the conf table between
+        positions start and stop, ordered by iconf; if hash is not None,
+        only the rows with that hash.
+        """
+        nrows = self.num_rows(folder)
+        start, stop, _ = slice(start, stop).indices(nrows)
+        rows = "SELECT iconf, hash, params FROM confs WHERE folder = ?"
+        args = [_folder(folder)]
+
+        if hash is None:
+            sql = rows + " ORDER BY iconf LIMIT ? OFFSET ?"
+            args += [stop - start, start]
+        elif start == 0 and stop == nrows:
+            # looked up in the hash index
+            sql = rows + " AND hash = ? ORDER BY iconf"
+            args += [hash]
+        else:
+            sql = "SELECT * FROM ({} ORDER BY iconf LIMIT ? OFFSET ?) " \
+                  "WHERE hash = ?".format(rows)
+            args += [stop - start, start, hash]
+
+        return self.conn.execute(sql, args).fetchall()
+
+    def select(self, folder, where=None, start=None, stop=None, columns=None,
+               chunksize=None):
+        table_columns = self._table_columns(folder)
+
+        if chunksize is None:
+            return self._select(folder, table_columns, where,
+                                start, stop, columns)
+
+        start, stop, _ = slice(start, stop).indices(self.num_rows(folder))
+        return (self._select(folder, table_columns, where, cstart,
+                             min(cstart + chunksize, stop), columns)
+                for cstart in range(start, stop, chunksize))
+
+    def _select(self, folder, table_columns, where, start, stop, columns):
+        hash = None
+
+        if isinstance(where, np.ndarray):
+            frame = self._frame(table_columns, self._rows(folder))
+            frame = frame.iloc[where]
+        else:
+            # the hash of a full-conf lookup (see ExpLog._conf_where) is
+            # looked up in the index of the database
+            m = None if where is None else re.match(
+                r"\s*{} = (\d+) and (.*)$".format(re.escape(self.hash_key)),
+                where, re.S)
+            if not m is None:
+                hash, where = int(m.group(1)), m.group(2)
+
+            frame = self._frame(table_columns,
+                                self._rows(folder, start, stop, hash))
+            if not where is None:
+                frame = query_frame(frame, where)
+
+        if not columns is None:
+            frame = frame[list(columns)]
+
+        return frame
+
+    def select_as_coordinates(self, folder, where=None, start=None,
+                              stop=None):
+        frame = self._frame(self._table_columns(folder), self._rows(folder))
+        start, stop, _ = slice(start, stop).indices(len(frame))
+        frame = frame.iloc[start:stop]
+        frame.index = np.arange(start, stop)
+
+        if not where is None:
+            frame = query_frame(frame, where)
+
+        return frame.index.values
+
+    def read_column(self, folder, column, start=None, stop=None):
+        return self.select(folder, start=start, stop=stop,
+                           columns=[column])[column].values
+
+    def _insert(self, conn, folder, data, start):
+        params = [c for c in data.columns if c != self.hash_key]
+        rows = [(folder, start + i, int(h),
+                 json.dumps([_plain(v) for v in values]))
+                for i, (h, values) in enumerate(zip(
+                    data[self.hash_key].values,
+                    data[params].itertuples(index=False)))]
+        conn.executemany("INSERT INTO confs VALUES (?, ?, ?, ?)", rows)
+        return list(range(start, start + len(rows)))
+
+    def _next_iconf(self, conn, folder):
+        return conn.execute("SELECT COALESCE(MAX(iconf) + 1, 0) FROM confs "
+                            "WHERE folder = ?", (folder,)).fetchone()[0]
+
+    def _ensure_table(self, conn, folder, data):
+        columns = self._columns(folder, conn)
+        new = [[str(c), _dtype_name(data[c].dtype)] for c in data.columns]
+
+        if columns is None:
+            conn.execute("INSERT INTO folders VALUES (?, ?)",
+                         (folder, json.dumps(new)))
+            return new
+
+        if set(c for c, d in columns) != set(c for c, d in new):
+            raise ValueError("The columns {} do not match the columns {} of "
+                             "the conf table at '{}'.".format(
+                             list(data.columns), [c for c, d in columns],
+                             folder))
+
+        return columns
+
+    def append(self, folder, data):
+        """
+        Appends the configurations in data (a DataFrame with a hash column)
+        and returns the indices assigned to them, which follow the largest
+        index in the table (the index of data is ignored).
+        """
+        folder = _folder(folder)
+
+        with self._transaction() as conn:
+            columns = self._ensure_table(conn, folder, data)
+            data = data[[c for c, d in columns]]
+            return self._insert(conn, folder, data,
+                                self._next_iconf(conn, folder))
+
+    def put(self, folder, data):
+        """
+        Replaces the conf table with data, keeping the indices of data.
+        """
+        folder = _folder(folder)
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM confs WHERE folder = ?", (folder,))
+            conn.execute("DELETE FROM folders WHERE folder = ?", (folder,))
+            columns = self._ensure_table(conn, folder, data)
+            data = data[[c for c, d in columns]]
+            params = [c for c, d in columns if c != self.hash_key]
+            conn.executemany("INSERT INTO confs VALUES (?, ?, ?, ?)",
+                [(folder, int(i), int(h),
+                  json.dumps([_plain(v) for v in values]))
+                 for i, h, values in zip(data.index, data[self.hash_key].values,
+                                         data[params].itertuples(index=False))])
+
+    def claim(self, folder, data):
+        """
+        Looks up every configuration in data (a DataFrame with a hash column
+        of full configurations) and adds the ones that are missing, all in
+        a single transaction. Returns a list with the indices of every
+        configuration (the first match for the ones that already exist) and
+        a list of the indices that have been added.
+        """
+        folder = _folder(folder)
+        idx, added = [], []
+
+        with self._transaction() as conn:
+            columns = self._ensure_table(conn, folder, data)
+            data = data[[c for c, d in columns]]
+            params = [c for c, d in columns if c != self.hash_key]
+
+            for irow in range(len(data)):
+                row = data.iloc[irow:irow+1]
+                h = int(row[self.hash_key].values[0])
+                encoded = json.dumps([_plain(v) for v in row[params].values[0]])
+                match = conn.execute(
+                    "SELECT iconf FROM confs WHERE folder = ? AND hash = ? "
+                    "AND params = ? ORDER BY iconf LIMIT 1",
+                    (folder, h, encoded)).fetchone()
+
+                if match is None:
+                    match = self._insert(conn, folder, row,
+                                         self._next_iconf(conn, folder))
+                    added.extend(match)
+                idx.append(match[0])
+
+        return idx, added
+
+    def remove(self, folder, where=None, start=None, stop=None):
+        """
+        Removes the conf table or, if where, start or stop is given,
+        the matching rows (along with their entries in the result catalog).
+        """
+        folder = _folder(folder)
+
+        if where is None and start is None and stop is None:
+            self._table_columns(folder)
+            with self._transaction() as conn:
+                for table in ("confs", "folders", "results"):
+                    conn.execute("DELETE FROM {} WHERE folder = ?".format(
+                                 table), (folder,))
+            return
+
+        iconfs = self.select(folder, where, start, stop, columns=[]).index
+
+        with self._transaction() as conn:
+            for table in ("confs", "results"):
+                conn.executemany("DELETE FROM {} WHERE folder = ? AND "
+                                 "iconf = ?".format(table),
+                                 [(folder, int(i)) for i in iconfs])
+
+    def add_result_keys(self, folder, iconf, keys):
+        """
+        Records that conf iconf of folder has results under keys.
+        """
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO results VALUES (?, ?, ?)",
+                             [(_folder(folder), int(iconf), str(k))
+                              for k in keys])
+
+    def remove_result_keys(self, folder, iconf, keys=None):
+        """
+        Removes keys (all the keys if None) of conf iconf from the catalog.
+        """
+        with self._transaction() as conn:
+            if keys is None:
+                conn.execute("DELETE FROM results WHERE folder = ? AND "
+                             "iconf = ?", (_folder(folder), int(iconf)))
+            else:
+                conn.executemany("DELETE FROM results WHERE folder = ? AND "
+                                 "iconf = ? AND key = ?",
+                                 [(_folder(folder), int(iconf), str(k))
+                                  for k in keys])
+
+    def result_keys(self, folder, iconf=None):
+        """
+        Returns the sorted result keys recorded for conf iconf of folder, or,
+        if iconf is None, a dictionary that maps the confs with results to
+        their keys.
+        """
+        if iconf is None:
+            keys = {}
+            for i, k in self.conn.execute(
+                    "SELECT iconf, key FROM results WHERE folder = ? "
+                    "ORDER BY iconf, key", (_folder(folder),)):
+                keys.setdefault(i, []).append(k)
+            return keys
+
+        return [row[0] for row in self.conn.execute(
+            "SELECT key FROM results WHERE folder = ? AND iconf = ? "
+            "ORDER BY key", (_folder(folder), int(iconf)))]
+
+    def close(self):
+        if not self._conn is None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import pandas as pd
+from .log import ExpLog
+
+# the file in which export_parquet records the rows exported so far
+STATE_FILE = "_pyexplog_export.json"
+# the column into which the conf index is exported in the _confs datasets
+ICONF_COLUMN = "iconf"
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Exporting to Parquet requires pyarrow.")
+
+    return pyarrow, pyarrow.parquet
+
+def _load_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _save_state(root, state):
+    # write the state atomically, so that an interrupted export is resumed
+    # from the last file that has been written completely
+    path = os.path.join(root, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def _checksum(explog, path, nrows):
+    """
+    Returns a checksum of the first and the last of the first nrows rows of
+    the table at path (see export_parquet).
+    """
+    rows = pd.concat([explog.select(path, start=0, stop=1),
+                      explog.select(path, start=nrows - 1, stop=nrows)])
+    return int(pd.util.hash_pandas_object(rows, index=True).sum())
+
+def _folder_dir(root, logFolder):
+    return os.path.join(root, *logFolder.strip("/").split("/"))
+
+def export_parquet(explog, root, logFolders=None, keys=None,
+                   chunksize=100000, compression='snappy'):
+    """
+    Exports the log into a directory of Parquet files, which can be read
+    as partitioned datasets by pyarrow, Spark, DuckDB and the like. Requires
+    pyarrow. The layout is:
+
+        root/<logFolder>/_confs/part-<start>.parquet
+        root/<logFolder>/<key>/iconf=<iconf>/part-<start>.parquet
+
+    i.e. every result key of a logFolder is a dataset partitioned by
+    the conf index, which the _confs dataset stores in its iconf column.
+    The parameters of the configuration are joined to the results as
+    columns (unless a result column has the same name).
+
+    The tables are streamed in chunks of chunksize rows, so the memory used
+    does not depend on the size of the log (only the conf table of
+    the exported logFolder is loaded whole). The number of rows exported
+    from every table is recorded in root, so a re-export only writes
+    the rows appended since (as new part files). Along with it, a checksum
+    of the first and the last exported row is recorded: a table that has
+    fewer rows than have been exported, or in which either of these rows
+    has changed, is taken to have been replaced and is exported again.
+    A replacement that keeps both of these rows is not detected.
+
+    Returns a dictionary that maps the paths of the tables in the log to
+    the number of rows written.
+
+    Arguments:
+        explog: ExpLog or str
+            The log to export, or the path to a log file.
+        root: str
+            The directory to export into.
+        logFolders: str, list of str, or None
+            The log folders to export. If None, all log folders are exported.
+        keys: str, list of str, or None
+            The result keys to export. If None, all result keys are exported.
+        compression: str
+            The compression codec of the Parquet files.
+    """
+    if isinstance(explog, str):
+        explog = ExpLog(explog, mode='r')
+        try:
+            return export_parquet(explog, root, logFolders, keys,
+                                  chunksize, compression)
+        finally:
+            explog.close()
+
+    pa, pq = _import_pyarrow()
+
+    if logFolders is None:
+        logFolders = explog.log_folders()
+    elif isinstance(logFolders, str):
+        logFolders = [logFolders]
+
+    if isinstance(keys, str):
+        keys = [keys]
+
+    os.makedirs(root, exist_ok=True)
+    state = _load_state(root)
+    written = {}
+
+    def export_table(path, directory, params=None, index=None):
+        try:
+            nrows = int(explog.num_rows(path))
+        except TypeError: # not a table (e.g. a file node)
+            return
+
+        seen = state.get(path, {'rows': 0, 'checksum': None})
+
+        if seen['rows'] and (nrows < seen['rows'] or
+                _checksum(explog, path, seen['rows']) != seen['checksum']):
+            shutil.rmtree(directory, ignore_errors=True)
+            seen = {'rows': 0, 'checksum': None}
+
+        for start in range(seen['rows'], nrows, chunksize):
+            stop = min(start + chunksize, nrows)
+            data = explog.select(path, start=start, stop=stop)
+
+            if not index is None:
+                data = data.rename_axis(index).reset_index()
+
+            if not params is None:
+                for name, value in params.items():
+                    if not name in data.columns:
+                        data[name] = value
+
+            os.makedirs(directory, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(data, preserve_index=False),
+                           os.path.join(directory,
+                                        "part-{:012d}.parquet".format(start)),
+                           compression=compression)
+
+            state[path] = {'rows': stop,
+                           'checksum': _checksum(explog, path, stop)}
+            written[path] = written.get(path, 0) + stop - start
+            _save_state(root, state)
+
+    for logFolder in logFolders:
+        logFolder = "/" + logFolder.strip("/")
+        folder_dir = _folder_dir(root, logFolder)
+        export_table(logFolder, os.path.join(folder_dir, "_confs"),
+                     index=ICONF_COLUMN)
+        confs = explog.select(logFolder)
+
+        for iconf, conf in zip(confs.index, confs.to_dict('records')):
+            conf_path = logFolder + "/" + explog.conf_key.format(iconf=iconf)
+            for key in explog.get_keys(conf_path) or []:
+                if not keys is None and not key in keys:
+                    continue
+
+                export_table(conf_path + "/" + key,
+                             os.path.join(folder_dir, key,
+                                          "iconf={}".format(iconf)),
+                             conf)
+
+    return written
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import contextlib
+import threading
+import time
+import weakref
+
+class FlushPolicy:
+    """
+    Determines when an ExpLog flushes its writes into the file (see
+    the flush_policy argument of ExpLog). Writes are the calls of add_data,
+    remove and remove_children that change the backend; a commit is the end
+    of a batch (see ExpLog.batch). The log is flushed when any of
+    the enabled conditions is met and there are unflushed writes:
+
+        FlushPolicy(every_writes=100)        # after every 100 writes
+        FlushPolicy(every_seconds=5.0)       # at most 5 seconds after a write
+        FlushPolicy(on_commit=True, fsync=True)
+
+    Flushing costs time, while whatever has not been flushed is lost if
+    the process crashes; fsync makes sure that the flushed data is written
+    through to the disk as well, which costs more.
+
+    The names 'never', 'commit' (the default) and 'always' (after every
+    write) can be passed to ExpLog in place of a policy.
+    """
+    def __init__(self, every_writes=None, every_seconds=None,
+                 on_commit=True, fsync=False):
+        """
+        Arguments:
+            every_writes: int or None
+                Flush after this many writes.
+            every_seconds: float or None
+                Flush once this many seconds have passed since the first
+                unflushed write; a background thread of the log flushes
+                the writes that are not followed by any other.
+            on_commit: bool
+                Flush when a batch is committed.
+            fsync: bool
+                Ask the operating system to write the flushed data through
+                to the disk (see ExpLog.flush).
+        """
+        if not every_writes is None and every_writes < 1:
+            raise ValueError("every_writes needs to be at least 1.")
+        if not every_seconds is None and every_seconds <= 0:
+            raise ValueError("every_seconds needs to be positive.")
+
+        self.every_writes = every_writes
+        self.every_seconds = every_seconds
+        self.on_commit = on_commit
+        self.fsync = fsync
+
+    @classmethod
+    def create(cls, policy):
+        """
+        Returns policy if it is a FlushPolicy, or the policy of the name.
+        """
+        if isinstance(policy, FlushPolicy):
+            return policy
+        elif policy is None or policy == 'commit':
+            return cls()
+        elif policy == 'never':
+            return cls(on_commit=False)
+        elif policy == 'always':
+            return cls(every_writes=1)
+
+        raise ValueError("Unknown flush policy '{}'.".format(policy))
+
+    def __repr__(self):
+        return "FlushPolicy(every_writes={}, every_seconds={}, " \
+               "on_commit={}, fsync={})".format(self.every_writes,
+               self.every_seconds, self.on_commit, self.fsync)
+
+class Flusher:
+    """
+    Applies a FlushPolicy to an ExpLog: the log reports its writes and
+    commits and the flusher flushes it when the policy says so. If
+    the policy flushes every_seconds, a daemon thread flushes the writes
+    that have been left unflushed for that long; the log then has a lock
+    (held by its public methods, see profiling.profiled), so that
+    the thread never flushes in the middle of a call.
+    """
+    def __init__(self, explog, policy):
+        self.policy = policy
+        self.writes = 0
+        self.first_write = None
+        self.lock = None
+        self._explog = weakref.ref(explog)
+        self._deferred = 0
+        self._stop = None
+
+        if not policy.every_seconds is None:
+            self.lock = threading.RLock()
+            self._stop = threading.Event()
+            thread = threading.Thread(target=Flusher._run,
+                                      args=(weakref.ref(self), self._stop),
+                                      name="pyexplog-flusher", daemon=True)
+            thread.start()
+
+    def _due(self):
+        policy = self.policy
+
+        if not self.writes:
+            return False
+        elif not policy.every_writes is None and \
+             self.writes >= policy.every_writes:
+            return True
+        elif not policy.every_seconds is None and \
+             time.monotonic() - self.first_write >= policy.every_seconds:
+            return True
+
+        return False
+
+    def _flush(self):
+        explog = self._explog()
+        if not explog is None:
+            explog.flush(fsync=self.policy.fsync)
+
+    def wrote(self):
+        """
+        Records a write and flushes if the policy says so.
+        """
+        if not self.writes:
+            self.first_write = time.monotonic()
+        self.writes += 1
+
+        if not self._deferred and self._due():
+            self._flush()
+
+    def committed(self):
+        """
+        Records a commit and flushes if the policy says so.
+        """
+        if self.writes and (self.policy.on_commit or self._due()):
+            self._flush()
+
+    def flushed(self):
+        """
+        Records that the log has been flushed.
+        """
+        self.writes = 0
+        self.first_write = None
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """
+        A context, in which the writes are counted but do not cause flushes
+        (e.g. while a batch is committed).
+        """
+        self._deferred += 1
+        try:
+            yield
+        finally:
+            self._deferred -= 1
+
+    @staticmethod
+    def _run(ref, stop):
+        # the thread only holds a weak reference, so that the log can be
+        # collected (and closed) while the thread waits
+        while True:
+            flusher = ref()
+            if flusher is None:
+                return
+
+            interval = flusher.policy.every_seconds
+            if flusher.writes and not flusher._deferred:
+                interval -= time.monotonic() - flusher.first_write
+
+            del flusher
+            if stop.wait(max(interval, 0.01)):
+                return
+
+            flusher = ref()
+            if flusher is None:
+                return
+
+            with flusher.lock:
+                if not flusher._deferred and flusher._due():
+                    flusher._flush()
+
+            del flusher
+
+    def stop(self):
+        """
+        Stops the background thread, if there is one.
+        """
+        if not self._stop is None:
+            self._stop.set()
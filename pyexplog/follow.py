@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import collections
+import os
+import time
+import tables
+from .log import ExpLog
+
+# A batch of rows appended to a table of the log. For result tables,
+# logFolder, iconf and key identify the results; for conf tables,
+# logFolder is the path of the table and iconf and key are None.
+Update = collections.namedtuple('Update',
+                                ['path', 'logFolder', 'iconf', 'key', 'data'])
+
+class LogFollower:
+    """
+    Follows a log that is being written by another process (e.g. by a long
+    running experiment) and yields the rows that are appended to its tables.
+
+    The follower remembers the number of rows it has seen in every table.
+    The file is only opened (read-only) when its size or modification time
+    has changed since the last poll and it is closed again right after the
+    new rows are read, so no stale handle is kept and the writer is not
+    blocked. The writer needs to flush (see ExpLog.flush) for its rows to
+    show up.
+
+    With HDF5 1.10 or later, the library locks the files it opens; if
+    the writer keeps the file open, HDF5_USE_FILE_LOCKING=FALSE needs to be
+    set in the environment of both processes.
+    """
+    def __init__(self, log_file, logFolders=None, chunksize=100000,
+                 from_start=True):
+        """
+        Arguments:
+            log_file: str
+                The path to the log file.
+            logFolders: list of str or None
+                If not None, only the tables in these folders (conf tables
+                and their results) are followed.
+            chunksize: int
+                The maximum number of rows in a single Update.
+            from_start: bool
+                If False, the rows that are already in the log are skipped
+                and only the rows appended from now on are yielded.
+        """
+        self.log_file = log_file
+        self.chunksize = chunksize
+        self.nrows = {}
+        self._stat = None
+
+        if logFolders is None:
+            self.logFolders = None
+        else:
+            self.logFolders = ["/" + f.strip("/") for f in logFolders]
+
+        if not from_start:
+            for update in self.poll(read=False):
+                pass
+
+    def _followed(self, path):
+        if self.logFolders is None:
+            return True
+
+        return any(path == f or path.startswith(f + "/")
+                   for f in self.logFolders)
+
+    def _update(self, explog, path, start, stop):
+        parts = path.strip("/").split("/")
+        iconf = explog.parse_conf_key(parts[-2]) if len(parts) > 2 else None
+
+        if iconf is None:
+            logFolder, key = path, None
+        else:
+            logFolder, key = "/" + "/".join(parts[:-2]), parts[-1]
+
+        data = explog.select(path, start=start, stop=stop)
+        return Update(path, logFolder, iconf, key, data)
+
+    def changed(self):
+        """
+        Returns whether the file has changed since the last poll.
+        """
+        st = os.stat(self.log_file)
+        return (st.st_size, st.st_mtime_ns) != self._stat
+
+    def poll(self, read=True):
+        """
+        Yields an Update for every batch of rows appended since the last poll.
+        If the file has not changed, nothing is read. If a table has fewer
+        rows than before (it has been replaced), it is read from the start.
+
+        If read is False, the new rows are only marked as seen.
+        """
+        st = os.stat(self.log_file)
+        stat = (st.st_size, st.st_mtime_ns)
+        if stat == self._stat:
+            return
+
+        explog = ExpLog(self.log_file, mode='r')
+
+        try:
+            for path in explog.backend.keys():
+                if not self._followed(path):
+                    continue
+
+                nrows = explog.num_rows(path)
+                seen = self.nrows.get(path, 0)
+                if nrows < seen:
+                    seen = 0
+
+                for start in range(seen, nrows, self.chunksize):
+                    stop = min(start + self.chunksize, nrows)
+                    if read:
+                        yield self._update(explog, path, start, stop)
+                    self.nrows[path] = stop
+
+                self.nrows[path] = nrows
+        finally:
+            explog.close()
+
+        # only once everything has been read; if the writer was caught
+        # in the middle of a flush, the next poll tries again
+        self._stat = stat
+
+    def follow(self, interval=1.0, timeout=None):
+        """
+        Polls the log every interval seconds and yields the Updates. If
+        timeout is not None, stops once there have been no new rows for
+        timeout seconds.
+
+        Errors caused by reading the file while it is being flushed are
+        ignored; the rows are read by a later poll.
+        """
+        last = time.monotonic()
+
+        while timeout is None or time.monotonic() - last < timeout:
+            try:
+                for update in self.poll():
+                    last = time.monotonic()
+                    yield update
+            except (tables.HDF5ExtError, tables.NoSuchNodeError, OSError,
+                    KeyError):
+                pass
+
+            time.sleep(interval)
+
+    def run(self, callback, interval=1.0, timeout=None):
+        """
+        Calls callback(update) for every Update yielded by follow.
+        """
+        for update in self.follow(interval=interval, timeout=timeout):
+            callback(update)
@@ -3,24 +3,193 @@
 import numpy as np
 import pandas as pd
 import collections
+import contextlib
 import numbers
+import hashlib
+import math
+import re
 from tables.nodes import filenode
 from tables.exceptions import NodeError, NoSuchNodeError
+from .profiling import Profiler, profiled
+from .backend import HDFBackend
+from .confindex import SQLiteConfIndex
+from .configuration import ConfCollection, SliceSpace
+from .aggregate import Aggregator
+from .batch import Batch
+from .flushing import FlushPolicy, Flusher
+from .query import In, NoMatch, is_condition, as_condition, literal, \
+                   typed_value
 import io
 
+def _canonical_dtype(a, b):
+    """
+    Returns the dtype, into which two columns of dtypes a and b are converted
+    so that their values can be compared for equality (see
+    ExpLog.missing_confs), or None if they can be compared as they are.
+    """
+    a_num = np.issubdtype(a, np.number) or a == bool
+    b_num = np.issubdtype(b, np.number) or b == bool
+
+    if a == b:
+        return None
+    elif a_num and b_num:
+        return np.float64
+    else:
+        return str
+
+def _column_kind(dtype):
+    """
+    Returns 'n' for the dtypes stored as numbers and 's' for the rest
+    (see ExpLog.conf_hash).
+    """
+    return 'n' if np.dtype(dtype).kind in 'biuf' else 's'
+
+def _canonical_value(value, kind):
+    """
+    Converts value into the text that enters the hash of a configuration:
+    numbers compare equal regardless of their type (1, 1.0, True and
+    numpy.int64(1) are all '1'), anything else is converted to str.
+    """
+    if kind == 's':
+        return str(value)
+    elif isinstance(value, (numbers.Integral, np.bool_)):
+        return str(int(value))
+    
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
 class ExpLog:
-    def __init__(self, log_file=None, in_memory=False, image=None):
+    def __init__(self, log_file=None, in_memory=False, image=None,
+                 profile=False, index_threshold=10000, index_optlevel=6,
+                 index_kind='medium', mode='a', backend=None,
+                 conf_index=None, flush_policy='commit'):
+        """
+        Arguments:
+            backend: Backend or None
+                The storage of the log (see backend.Backend), e.g.
+                a backend.DirectoryBackend. If None, the log is stored in
+                the HDF5 file log_file (see backend.HDFBackend).
+            conf_index: str, SQLiteConfIndex or None
+                If not None, the conf tables are kept in an SQLite database
+                (a path to it can be passed in) instead of the backend, so
+                that several processes can look up and add configurations
+                concurrently; see confindex.SQLiteConfIndex. The results are
+                still stored in the backend.
+            mode: str
+                The mode in which log_file is opened (see pandas.HDFStore):
+                'a' to read and write, 'r' to only read it (e.g. while it is
+                written by another process, see follow.LogFollower).
+            profile: bool or Profiler
+                If True (or if a Profiler shared with other logs is passed
+                in), the calls to the public methods and to the underlying
+                HDFStore are counted; see enable_profiling.
+            index_threshold: int
+                The number of rows from which the parameter columns of conf
+                tables are indexed (see update_indexes); smaller tables are
+                scanned, which is cheaper than maintaining the indexes.
+            index_optlevel: int
+                The optimization level (0-9) of the parameter indexes.
+            index_kind: str
+                The kind of the parameter indexes: 'ultralight', 'light',
+                'medium' or 'full'.
+            flush_policy: FlushPolicy or str
+                When the writes are flushed into the file: 'never', 'commit'
+                (when a batch is committed), 'always' (after every write), or
+                a flushing.FlushPolicy, which can also flush every so many
+                writes or seconds and fsync.
+        """
+        self._lock = None
         self.conf_key = "conf_{iconf}"
+        self.hash_key = "_hash_"
         self.min_itemsize = 200
+        # conditions with more terms are evaluated on the column values
+        self.max_terms = 32
+        self.index_threshold = index_threshold
+        self.index_optlevel = index_optlevel
+        self.index_kind = index_kind
+        self.profiler = None
+        self._batch = None
         
-        if log_file is None:
-            self.hdfstore = None
+        if not backend is None:
+            self.backend = backend
+        elif log_file is None:
+            self.backend = None
         else:
-            if in_memory:
-                self.hdfstore = pd.HDFStore(log_file, mode='a', image=image,
-                        driver='H5FD_CORE', driver_core_backing_store=0)
-            else:
-                self.hdfstore = pd.HDFStore(log_file)
+            self.backend = HDFBackend(log_file, mode=mode,
+                                      in_memory=in_memory, image=image)
+
+        if isinstance(conf_index, str):
+            conf_index = SQLiteConfIndex(conf_index, hash_key=self.hash_key)
+        self.conf_index = conf_index
+
+        self.flush_policy = FlushPolicy.create(flush_policy)
+        self._flusher = Flusher(self, self.flush_policy)
+        self._lock = self._flusher.lock
+
+        if profile:
+            self.enable_profiling(None if profile is True else profile)
+
+    def _storage(self, path):
+        """
+        Returns the storage of the table at path: the conf index for
+        the conf tables kept in it and the backend otherwise.
+        """
+        if not self.conf_index is None and self.conf_index.exists(path):
+            return self.conf_index
+        return self.backend
+
+    @property
+    def hdfstore(self):
+        """
+        The pandas.HDFStore of the log, or None if the log is not stored in
+        an HDF5 file.
+        """
+        return getattr(self.backend, 'store', None)
+
+    def enable_profiling(self, profiler=None):
+        """
+        Starts counting the calls, wall time, rows and bytes read or written
+        by the public methods of the log and by the underlying HDFStore
+        operations (the latter under the 'hdfstore.' prefix, only for
+        the HDF5 backend). The time of a
+        method includes the time of the methods that it calls.
+
+        A profiler can be passed in to share it among several logs;
+        otherwise a new one is created. Returns the profiler, which can also
+        be used to add per-call trace hooks (see Profiler.add_hook).
+        """
+        self.disable_profiling()
+        self.profiler = Profiler() if profiler is None else profiler
+
+        if not self.backend is None:
+            self.backend.enable_profiling(self.profiler)
+
+        return self.profiler
+
+    def disable_profiling(self):
+        """
+        Stops profiling; the overhead of the log is back to nothing.
+        """
+        if not self.backend is None:
+            self.backend.disable_profiling()
+        self.profiler = None
+
+    def stats(self, reset=False):
+        """
+        Returns a snapshot of the profiling counters as a DataFrame with
+        a row per operation and the columns calls, errors, time (in seconds),
+        rows and bytes. If reset is True, the counters are reset afterwards.
+
+        If profiling is not enabled, a RuntimeError is raised.
+        """
+        if self.profiler is None:
+            raise RuntimeError("Profiling is not enabled.")
+        return self.profiler.stats(reset=reset)
     
     def getFileImage(self):
         """
@@ -31,7 +200,7 @@ class ExpLog:
         as the image argument to the constructor and also setting in_memory
         to True.
         """
-        return self.hdfstore._handle.get_file_image()
+        return self.backend.file_image()
 
     def conf2where(conf):
         """
@@ -40,8 +209,12 @@ class ExpLog:
             * None: None is returned back;
             * A where string: returned back unmodified;
             * An integer: interpreted as an index, i.e. returns 'index = conf';
-            * A mapping (dict): returns a 'key = "value"' list as a where spec
-              (items with the value of None are ignored);
+            * A mapping (dict): returns a 'key = value' list as a where spec,
+              in which the values keep their types: numbers and bools are
+              not quoted, strings are (see query.literal); items with the
+              value of None are ignored; the values can
+              also be Conditions (In, Range, Not), ranges or sets, which
+              are compiled into the corresponding comparisons;
             * A numpy array with an integral dtype: we know that these are
               integer indices, so where uses the form index in (...). 
             * A container: calls conf2where recursively for every item and
@@ -55,8 +228,19 @@ class ExpLog:
         elif isinstance(conf, numbers.Integral): # conf is an integer index
             return 'index = {}'.format(conf)
         elif isinstance(conf, collections.Mapping): # conf is a dictionary
-            return " and ".join(('{} = "{}"'.format(k, v) for k, v in conf.items()
-                    if not v is None))
+            terms = []
+
+            for k, v in conf.items():
+                if v is None:
+                    continue
+                elif is_condition(v):
+                    where = as_condition(v).where(k)
+                    if len(where):
+                        terms.append("(" + where + ")")
+                else:
+                    terms.append('{} = {}'.format(k, literal(v)))
+
+            return " and ".join(terms)
         # conf is an integer numpy array - we can safely use index in ()
         elif isinstance(conf, np.ndarray) and \
           np.issubdtype(conf.dtype, np.integer):
@@ -68,7 +252,208 @@ class ExpLog:
             raise TypeError("Configuration format not understood "
                             "for '{}'.".format(conf))
     conf2where = staticmethod(conf2where)        
+
+    def conf_hash(conf, kinds=None):
+        """
+        Returns a stable hash of the parameters of conf. The hash does not
+        depend on the order of the items, on the process, or on the session,
+        so it can be stored in the log. Items with the value of None (or NaN)
+        are ignored, like in conf2where.
+
+        The hash is a non-negative integer of 53 bits, since pandas passes
+        the integer constants of where clauses through a float.
+
+        Arguments:
+            kinds: dict or None
+                Maps the names of the parameters to 'n' (stored as a number)
+                or 's' (stored as a string); the values are converted
+                accordingly before they are hashed. If None or if a parameter
+                is missing, the kind is derived from the type of the value.
+        """
+        if kinds is None:
+            kinds = {}
+        
+        h = hashlib.blake2b(digest_size=8)
+        
+        for k, v in sorted((str(k), v) for k, v in conf.items()
+                           if not _is_missing(v)):
+            kind = kinds.get(k)
+            if kind is None:
+                kind = 'n' if isinstance(v, (numbers.Real, np.bool_)) \
+                       else 's'
+            h.update("{}\0{}:{}\0".format(
+                k, kind, _canonical_value(v, kind)).encode('utf-8'))
+        
+        return int.from_bytes(h.digest(), 'little') & (2**53 - 1)
+    conf_hash = staticmethod(conf_hash)
+
+    def conf_hashes(self, data, kinds=None):
+        """
+        Returns the conf_hash of every row of a DataFrame as an int64 array.
+        If kinds is None, they are derived from the dtypes of the columns.
+        """
+        columns = [c for c in data.columns if c != self.hash_key]
+        
+        if kinds is None:
+            kinds = {c: _column_kind(data[c].dtype) for c in columns}
+
+        return np.array([self.conf_hash(dict(zip(columns, row)), kinds)
+                         for row in data[columns].itertuples(index=False)],
+                        dtype=np.int64)
+
+    def _conf_coldtypes(self, path):
+        """
+        Returns the dtypes of the columns of the table at path (see
+        Backend.coldtypes) if it is a table with a hash column (i.e. a conf
+        table) and None otherwise.
+        """
+        coldtypes = self._storage(path).coldtypes(path)
+        
+        if not coldtypes is None and self.hash_key in coldtypes:
+            return coldtypes
+        return None
+
+    def _cast_columns(self, coldtypes, data):
+        """
+        Casts the numeric columns of data (in place) to the dtypes of the
+        columns of the table, where this is exact: ints into a float column
+        (if they can be represented), or integral floats into an int column.
+        Otherwise, a conf with 1 instead of 1.0 could not be appended, and
+        neither could int results to the tables written by the versions of
+        pyexplog that stored all the numbers as floats.
+        """
+        for c in data.columns:
+            dtype = coldtypes.get(c)
+            if dtype is None or dtype == data[c].dtype:
+                continue
+
+            values = data[c].values
             
+            if dtype.kind == 'f' and values.dtype.kind in 'iu':
+                cast = values.astype(dtype)
+                if np.all(cast.astype(values.dtype) == values):
+                    data[c] = cast
+            elif dtype.kind in 'iu' and values.dtype.kind == 'f' and \
+                 np.all(np.mod(values, 1) == 0):
+                data[c] = values.astype(dtype)
+
+    def _typed_conf(self, coldtypes, conf):
+        """
+        Converts the values of conf to the types of the columns (see
+        query.typed_value), so that they are compared natively. A value that
+        cannot be equal to any value of its column is replaced by
+        a condition that matches nothing.
+        """
+        typed = {}
+
+        for k, v in conf.items():
+            dtype = coldtypes.get(k)
+            
+            if v is None or dtype is None:
+                typed[k] = v
+            elif is_condition(v):
+                typed[k] = as_condition(v).typed(dtype)
+            else:
+                try:
+                    typed[k] = typed_value(v, dtype)
+                except NoMatch:
+                    typed[k] = In()
+
+        return typed
+
+    def _table_kinds(self, coldtypes):
+        return {c: _column_kind(dtype) for c, dtype in coldtypes.items()
+                if c != self.hash_key}
+
+    def _conf_where(self, path, conf, start=None, stop=None):
+        """
+        Converts conf into a where clause for the table at path (see
+        conf2where). If conf specifies all the parameters of a conf table,
+        the clause starts with an equality on the hash column, so that the
+        rows are looked up using its index; the remaining terms guard
+        against hash collisions.
+
+        If conf contains conditions with more than max_terms terms, the
+        coordinates of the matching rows between start and stop are returned
+        instead (see _conf_coordinates).
+        """
+        if isinstance(conf, collections.Mapping):
+            coldtypes = self._storage(path).coldtypes(path)
+            if not coldtypes is None:
+                conf = self._typed_conf(coldtypes, conf)
+
+        if isinstance(conf, collections.Mapping) and \
+           any(is_condition(v) and as_condition(v).num_terms() >
+               self.max_terms for v in conf.values()):
+            return self._conf_coordinates(path, conf, start, stop)
+
+        # an empty clause (e.g. from an empty dict) matches everything
+        where = self.conf2where(conf) or None
+        
+        if not isinstance(conf, collections.Mapping) or not where or \
+           any(is_condition(v) for v in conf.values()):
+            return where
+
+        coldtypes = self._conf_coldtypes(path)
+        if coldtypes is None:
+            return where
+
+        kinds = self._table_kinds(coldtypes)
+        params = {str(k) for k, v in conf.items() if not _is_missing(v)}
+        if params != set(kinds):
+            return where
+
+        try:
+            h = self.conf_hash(conf, kinds)
+        except (TypeError, ValueError):
+            # the values do not fit the columns; leave it to select
+            return where
+        
+        return "{} = {} and {}".format(self.hash_key, h, where)
+
+    def _conf_coordinates(self, path, conf, start=None, stop=None,
+                          chunksize=100000):
+        """
+        Returns the coordinates of the rows of the table at path that match
+        conf. The long conditions are evaluated on the values of their
+        columns, read in chunks of chunksize rows; the rest of conf is
+        passed to the backend as a where clause.
+        """
+        storage = self._storage(path)
+        if not storage.exists(path):
+            raise KeyError("No object named '{}' in the file.".format(path))
+
+        if storage.coldtypes(path) is None:
+            raise TypeError("The node at '{}' is not a table.".format(path))
+
+        long_conds = {k: as_condition(v) for k, v in conf.items()
+                      if is_condition(v) and
+                         as_condition(v).num_terms() > self.max_terms}
+        nrows = storage.num_rows(path)
+        start, stop, _ = slice(start, stop).indices(nrows)
+        coords = [np.zeros(0, dtype=np.int64)]
+
+        for cstart in range(start, stop, chunksize):
+            cstop = min(cstart + chunksize, stop)
+            mask = np.ones(cstop - cstart, dtype=bool)
+
+            for k, cond in long_conds.items():
+                mask &= cond.mask(storage.read_column(path, k,
+                                                      cstart, cstop))
+
+            coords.append(np.flatnonzero(mask) + cstart)
+
+        coords = np.concatenate(coords)
+        where = self.conf2where({k: v for k, v in conf.items()
+                                 if not k in long_conds})
+
+        if where:
+            coords = np.intersect1d(coords, storage.select_as_coordinates(
+                path, where=where, start=start, stop=stop))
+
+        return coords
+            
+    @profiled
     def conf2idx(self, logFolder, conf, addNonExistent=False,
                  addMissingFolder=False, alwaysAddConf=False,
                  start=None, stop=None, returnAddedIdx=False):
@@ -129,7 +514,7 @@ class ExpLog:
         idx = []
         added = [] # used to store indices of added entries
         
-        if isinstance(conf, dict) and len(conf) == 0:
+        if isinstance(conf, collections.Mapping) and len(conf) == 0:
             conf = None
 
         if isinstance(conf, str) and len(conf.strip()) == 0:
@@ -148,7 +533,7 @@ class ExpLog:
             else:
                 return []
 
-        elif not isinstance(conf, dict) \
+        elif not isinstance(conf, collections.Mapping) \
              and not isinstance(conf, str) \
              and isinstance(conf, collections.Container):
             
@@ -163,8 +548,12 @@ class ExpLog:
                 if not addMissingFolder and not self.exists(logFolder):
                     raise KeyError("Folder '{}' does not exists and"
                     " addMissingFolder is False.".format(logFolder))
-                idx = self.add_data(logFolder, conf, mode='append')
+                idx = self.add_confs(logFolder, conf)
                 added.extend(idx)
+            elif addNonExistent and self._claims(logFolder, conf,
+                                                 addMissingFolder):
+                idx, new = self._claim_conf(logFolder, conf)
+                added.extend(new)
             else:
                 try:
                     res = self.select(logFolder, conf, start=start,
@@ -172,13 +561,13 @@ class ExpLog:
                     idx = list(res.index)
                     
                     if not conf is None and addNonExistent and len(idx) == 0:               
-                        idx = self.add_data(logFolder, conf, mode='append')
+                        idx = self.add_confs(logFolder, conf)
                         added.extend(idx)
                     
                 except KeyError:
                     if addMissingFolder:
                         if not conf is None:
-                            idx = self.add_data(logFolder, conf)
+                            idx = self.add_confs(logFolder, conf)
                             added.extend(idx)
                     else:
                         raise KeyError("Folder '{}' does not exists and"
@@ -189,6 +578,7 @@ class ExpLog:
         else:
             return idx
     
+    @profiled
     def exists(self, path, where=None):
         """
         Returns whether the specified node exists. Optionally, a where clause
@@ -205,36 +595,29 @@ class ExpLog:
                 This specifies what rows of a table to check for. If None,
                 the method checks for the existence of a node as such.
         """
-        not_node_exists = self.hdfstore.get_node(path) is None
+        storage = self._storage(path)
 
-        if not_node_exists:
+        if not storage.exists(path):
             return False
         else:  
             if where is None:
                 return True
             else:
-                where = self.conf2where(where)
-                return len(self.hdfstore.select(path, where=where)) != 0
+                where = self._conf_where(path, where)
+                if isinstance(where, np.ndarray):
+                    return len(where) != 0
+                return len(storage.select(path, where=where)) != 0
             
+    @profiled
     def get_children(self, path=""):
         """
         Returns the children of the node specified by path. If the node does
         not exists, returns None. If the node has no children, returns an empty
         dictionary.
         """
-
-        if not len(path):
-            n = self.hdfstore.root
-        else:
-            n = self.hdfstore.get_node(path)
-
-        if n is None: return None
-            
-        try:
-            return n._v_children
-        except AttributeError:
-            return {}
+        return self.backend.children(path)
         
+    @profiled
     def get_keys(self, path=""):
         """
         Returns names of the children of the node specified by path. If the
@@ -270,6 +653,7 @@ class ExpLog:
 
 
 
+    @profiled
     def result_keys(self, logFolder, conf=None):
         """
         Returns the names of the tables (in a dict_keys container) that contain
@@ -290,6 +674,10 @@ class ExpLog:
         If the specified configuration exists, but no results have been logged
         for it yet, an empty dict_keys container is returned.
         
+        If the conf table is kept in the conf index, the keys are looked up in
+        its result catalog, which records the results added by add_results
+        (and removed by remove_results or remove), rather than in the backend.
+        
         Arguments:
             logFolder : str
                 Path to the folder in which the configurations of the experiment
@@ -306,8 +694,7 @@ class ExpLog:
         if conf is None:
             return self.get_keys(logFolder)
         elif isinstance(conf, numbers.Integral):
-            keys = self.get_keys(logFolder + "/" +
-                                 self.conf_key.format(iconf=conf))
+            keys = self._conf_result_keys(logFolder, conf)
             if not keys is None:
                 return keys
             elif self.exists(logFolder, self.conf2where(conf)):
@@ -330,8 +717,7 @@ class ExpLog:
             res = []
 
             for ii in idx:
-                iikeys = self.get_keys(logFolder + "/" +
-                          self.conf_key.format(iconf=ii))
+                iikeys = self._conf_result_keys(logFolder, ii)
                 res.append(iikeys if not iikeys is None else {}.keys())
 
             return res
@@ -340,6 +726,33 @@ class ExpLog:
         else:
             raise TypeError("conf format '{}' not understood".format(conf))
 
+    def _conf_result_keys(self, logFolder, iconf):
+        """
+        Returns the result keys of conf iconf (see result_keys), or None if
+        there are none: from the result catalog if the conf table is in
+        the conf index, from the backend otherwise.
+        """
+        if not self.conf_index is None and self.conf_index.exists(logFolder):
+            keys = self.conf_index.result_keys(logFolder, iconf)
+            return dict.fromkeys(keys).keys() if len(keys) else None
+
+        return self.get_keys(logFolder + "/" + self.conf_key.format(iconf=iconf))
+
+    def _uncatalog(self, conf_path, keys=None):
+        """
+        Removes keys (all the keys if None) of the results at conf_path
+        (a results folder) from the result catalog of the conf index.
+        """
+        if self.conf_index is None or not "/" in conf_path.strip("/"):
+            return
+
+        logFolder, name = conf_path.rstrip("/").rsplit("/", 1)
+        iconf = self.parse_conf_key(name)
+        if not iconf is None:
+            self.conf_index.remove_result_keys(logFolder, iconf,
+                [keys] if isinstance(keys, str) else keys)
+
+    @profiled
     def select(self, path, where=None, start=None,
                stop=None, columns=None):
         """
@@ -364,10 +777,23 @@ class ExpLog:
                 Row number to stop selection. If None, goes until the last row.
             columns: list of strings
                 A list with the names of the columns that are to be selected.
+                The hash column of conf tables is only returned if it is
+                requested explicitly.
         """
-        return self.hdfstore.select(path, where=self.conf2where(where),
-                                    start=start, stop=stop, columns=columns)
+        where = self._conf_where(path, where, start, stop)
+        
+        if isinstance(where, np.ndarray): # coordinates already within range
+            start, stop = None, None
+        
+        res = self._storage(path).select(path, where=where, start=start,
+                                         stop=stop, columns=columns)
+        
+        if columns is None and self.hash_key in res.columns:
+            res = res.drop(self.hash_key, axis=1)
+        
+        return res
                 
+    @profiled
     def add_folder(self, path, folder):
         """
         Adds a new folder at the specified path. The path must be absolute and
@@ -378,8 +804,9 @@ class ExpLog:
         
         If successful, returns the newly added folder.
         """
-        return self.hdfstore._handle.createGroup(path, folder)
+        return self.backend.add_group(path, folder)
 
+    @profiled
     def num_rows(self, path):
         """
         Returns the number of rows in the table at the specified path.
@@ -388,17 +815,16 @@ class ExpLog:
         If the path points to a node that is not a table (e.g. to a folder), 
         a TypeError is raised.
         """
-        storer = self.hdfstore.get_storer(path)
-        if storer is None:
-            raise NoSuchNodeError("There is no node at '{}'.".format(path))
-        return storer.nrows       
+        return self._storage(path).num_rows(path)
 
+    @profiled
     def add_data(self, path, data=None, mode="append"):
         """
         Adds the specified data into the table located at the specified path.
         
         The index of the data is automatically replaced so that the rows are
-        numbered sequentially by their indices.
+        numbered sequentially by their indices. When appending to a conf
+        table, its hash column is filled in automatically.
 
         Returns the indices of the newly added rows.
 
@@ -428,42 +854,304 @@ class ExpLog:
         if mode == 'replace': # if replacing the old data, start from 0
             istart = 0
         else: # if not, get the index of the last row and start from there
-            storer = self.hdfstore.get_storer(path)
-            
-            if storer is None:
+            if not self.exists(path):
                 istart = 0
             else:
                 istart = self.select(path, columns=[],
-                                     start=storer.nrows-1).index[0] + 1
+                    start=self.num_rows(path)-1).index[0] + 1
 
-        # do the actual reindexing: in a new DataFrame for exception safety
+        # do the actual reindexing: in a new DataFrame for exception safety;
+        # the dtypes of the columns are kept as they are
         index = pd.RangeIndex(start=istart, stop=istart + len(data))
-        data = pd.DataFrame(data.values, index=index, columns=data.columns)
+        data = data.copy(deep=False)
+        data.index = index
+
+        coldtypes = self._storage(path).coldtypes(path) \
+                    if mode == "append" else None
+        
+        if not coldtypes is None:
+            self._cast_columns(coldtypes, data)
+        
+        # the confs appended to a conf table get their hashes
+        if not coldtypes is None and self.hash_key in coldtypes:
+            if not self.hash_key in data.columns:
+                data[self.hash_key] = self.conf_hashes(
+                    data, self._table_kinds(coldtypes))
+
+        # the conf tables in the conf index always have a hash column
+        if not self.conf_index is None and self.conf_index.exists(path) and \
+           not self.hash_key in data.columns:
+            data[self.hash_key] = self.conf_hashes(data)
+
+        # pandas indexes every data column of other tables; conf tables are
+        # indexed by update_indexes instead
+        is_conf = self.hash_key in data.columns
+
+        if is_conf and not self.conf_index is None:
+            index = self._add_indexed_confs(path, data, mode)
+            self._flusher.wrote()
+            return index
         
         # store the data
         if mode == "replace":
-            self.hdfstore.put(path, data,
-                              format='table', data_columns=True,
-                              min_itemsize=self.min_itemsize)
+            self.backend.put(path, data, min_itemsize=self.min_itemsize,
+                             index=not is_conf)
         elif mode == "append":
-            self.hdfstore.append(path, data,
-                             format='table', data_columns=True,
-                             min_itemsize=self.min_itemsize)
+            self.backend.append(path, data, min_itemsize=self.min_itemsize,
+                                index=not is_conf)
         elif mode == "exception":
             if self.exists(path):
                 raise NodeError("Folder '{}' already exists and add mode"
                                 " is set to exception.".format(path))
                 
-            self.hdfstore.put(path, data,
-                              format='table', data_columns=True,
-                              min_itemsize=self.min_itemsize)
+            self.backend.put(path, data, min_itemsize=self.min_itemsize,
+                             index=not is_conf)
                                 
         else:
             raise TypeError("Unknown mode '{}'.".format(mode))
+
+        if is_conf:
+            self.update_indexes(path)
+
+        self._flusher.wrote()
         
         # return indices of newly added rows
         return index
 
+    def _add_indexed_confs(self, logFolder, data, mode):
+        """
+        Stores the conf table data at logFolder in the conf index (see
+        add_data) and makes sure that the folder exists in the backend, so
+        that results can be stored in it.
+        """
+        if mode == "append":
+            index = pd.Index(self.conf_index.append(logFolder, data))
+        elif mode == "replace" or mode == "exception":
+            if mode == "exception" and self.exists(logFolder):
+                raise NodeError("Folder '{}' already exists and add mode"
+                                " is set to exception.".format(logFolder))
+            self.conf_index.put(logFolder, data)
+            index = data.index
+        else:
+            raise TypeError("Unknown mode '{}'.".format(mode))
+
+        self._ensure_folder(logFolder)
+        return index
+
+    def _ensure_folder(self, path):
+        """
+        Adds the folder at path to the backend, along with any missing
+        parent folders.
+        """
+        parent = ""
+        for name in path.strip("/").split("/"):
+            if not self.backend.exists(parent + "/" + name):
+                self.add_folder(parent or "/", name)
+            parent += "/" + name
+
+    def _claims(self, logFolder, conf, addMissingFolder):
+        """
+        Returns whether conf2idx looks up and adds conf in a single
+        transaction of the conf index: conf needs to be a full conf and
+        the conf table needs to be in the conf index (or not exist yet).
+        """
+        if self.conf_index is None or \
+           not isinstance(conf, collections.Mapping) or \
+           any(v is None or is_condition(v) for v in conf.values()):
+            return False
+
+        coldtypes = self.conf_index.coldtypes(logFolder)
+        if coldtypes is None:
+            return addMissingFolder and not self.backend.exists(logFolder)
+
+        return set(map(str, conf)) == set(self._table_kinds(coldtypes))
+
+    def _claim_conf(self, logFolder, conf):
+        """
+        Looks up conf in the conf index and adds it if it is missing,
+        atomically; returns conf2idx's list of indices and the added ones.
+        """
+        block = pd.DataFrame([list(conf.values())], columns=list(conf.keys()))
+        coldtypes = self.conf_index.coldtypes(logFolder)
+
+        if coldtypes is None:
+            block[self.hash_key] = self.conf_hashes(block)
+        else:
+            self._cast_columns(coldtypes, block)
+            block[self.hash_key] = self.conf_hashes(
+                block, self._table_kinds(coldtypes))
+
+        idx, added = self.conf_index.claim(logFolder, block)
+        # a lookup does not touch the backend
+        if len(added):
+            self._ensure_folder(logFolder)
+        return idx, added
+
+    @profiled
+    def update_indexes(self, logFolder, force=False):
+        """
+        Maintains the indexes of the conf table at logFolder: once the table
+        has index_threshold rows (or right away if force is True), the
+        parameter columns that are not indexed yet get an index of
+        index_kind and index_optlevel. The rows appended to indexed columns
+        are indexed incrementally as they are written; the index slices
+        left unsorted by that are sorted here. This is called automatically
+        after the conf table is appended to.
+
+        Returns whether the parameter columns are indexed. Tables that are
+        not conf tables with a hash column (see conf_hash) are not indexed,
+        and neither are the tables of backends without indexes.
+        """
+        storage = self._storage(logFolder)
+        coldtypes = self._conf_coldtypes(logFolder)
+        if coldtypes is None or not storage.indexes:
+            return False
+
+        indexed = storage.indexed_columns(logFolder)
+        columns = [c for c in self._table_kinds(coldtypes)
+                   if not c in indexed]
+
+        if storage.num_rows(logFolder) < self.index_threshold and not force:
+            return not len(columns)
+
+        if len(columns):
+            storage.create_index(logFolder, columns=columns,
+                                 optlevel=self.index_optlevel,
+                                 kind=self.index_kind)
+        storage.reindex_dirty(logFolder)
+
+        return True
+
+    @profiled
+    def add_confs(self, logFolder, confs):
+        """
+        Adds configurations into logFolder in bulk and returns their indices.
+        No lookup of existing configurations is done: all of them are added.
+
+        Arguments:
+            logFolder: str
+                The folder to add the configurations to. It is created if
+                it does not exist yet.
+            confs: a single configuration (a dict), a DataFrame, a numpy
+                structured array, or an iterable of these (such as
+                ConfCollection.iter_frames()). Every block is stored using
+                a single append.
+        
+        When a conf table is created, a hash column (see conf_hash) is added
+        to it and indexed using a completely sorted index, which is what
+        full-conf lookups use.
+        """
+        if isinstance(confs, (pd.DataFrame, np.ndarray, collections.Mapping)):
+            confs = [confs]
+
+        idx = []
+
+        for block in confs:
+            if isinstance(block, np.ndarray):
+                block = pd.DataFrame.from_records(block)
+            elif isinstance(block, collections.Mapping):
+                if any(is_condition(v) for v in block.values()):
+                    raise ValueError("A configuration with conditions cannot"
+                                     " be added: '{}'.".format(block))
+                block = pd.DataFrame([block.values()], columns=block.keys())
+
+            if self.exists(logFolder):
+                idx.extend(self.add_data(logFolder, block, mode='append'))
+            else:
+                block = block.copy(deep=False)
+                block[self.hash_key] = self.conf_hashes(block)
+                idx.extend(self.add_data(logFolder, block, mode='append'))
+                self._storage(logFolder).create_index(logFolder,
+                    columns=[self.hash_key], optlevel=9, kind='full')
+
+        return idx
+
+    @profiled
+    def missing_confs(self, logFolder, confs, chunksize=100000,
+                      returnMatched=False):
+        """
+        Returns the configurations from confs that are not logged in
+        logFolder yet, as a lazy ConfCollection (a view of the parameter
+        space of confs). A configuration matches a logged one if all of the
+        columns of the conf table are equal.
+
+        The collection is materialized in chunks of chunksize rows (see
+        ConfCollection.iter_frames) and each chunk is hash-joined with the
+        conf table, which is read and converted into the canonical form only
+        once (per combination of the dtypes of the chunks). Values are
+        compared in
+        a canonical form: numbers of different dtypes are compared as floats,
+        numbers compared to strings are compared as strings.
+
+        If logFolder does not exist, all the configurations are missing.
+
+        Arguments:
+            confs: ConfCollection
+                The configurations to look up. The parameter space needs
+                to be a ParameterSpace.
+            returnMatched: boolean
+                If true, a collection with the configurations that are
+                already logged is returned as the second return value.
+        """
+        if not isinstance(confs, ConfCollection):
+            raise TypeError("confs must be a ConfCollection.")
+
+        if self.exists(logFolder):
+            logged = self.select(logFolder)
+            logged = logged.drop_duplicates()
+        else:
+            logged = None
+
+        missing = []
+        matched = []
+        start = 0
+        # the canonical forms of the conf table, by the dtypes they are for
+        rights = {}
+
+        for frame in confs.iter_frames(chunksize):
+            pos = np.arange(start, start + len(frame))
+            start += len(frame)
+
+            if logged is None or set(frame.columns) != set(logged.columns):
+                missing.append(pos)
+                continue
+
+            dtypes = tuple(_canonical_dtype(frame[col].dtype,
+                                            logged[col].dtype)
+                           for col in frame.columns)
+
+            right = rights.get(dtypes)
+            if right is None:
+                right = rights[dtypes] = logged.copy()
+                for col, dtype in zip(frame.columns, dtypes):
+                    if not dtype is None:
+                        right[col] = right[col].astype(dtype)
+
+            left = frame.copy()
+            for col, dtype in zip(frame.columns, dtypes):
+                if not dtype is None:
+                    left[col] = left[col].astype(dtype)
+
+            left['_pos_'] = pos
+            joined = left.merge(right, how='left', on=list(frame.columns),
+                                indicator=True)
+            is_missing = (joined['_merge'] == 'left_only').values
+            missing.append(joined['_pos_'].values[is_missing])
+            matched.append(joined['_pos_'].values[~is_missing])
+
+        def collection(indices):
+            indices = np.concatenate(indices) if len(indices) \
+                      else np.zeros(0, dtype=np.int64)
+            return ConfCollection(confs.base_conf,
+                                  SliceSpace(confs.param_space, indices),
+                                  confs.compact)
+
+        if returnMatched:
+            return collection(missing), collection(matched)
+        else:
+            return collection(missing)
+
+    @profiled
     def remove(self, path, where=None, start=None, stop=None):
         """
         Removes the specified folder, table, or some of its entries (if where is 
@@ -479,10 +1167,37 @@ class ExpLog:
                 clause does not conform to the schema of the table, a ValueError
                 is raised as well.
         """
-        where = self.conf2where(where)
-        self.hdfstore.remove(path, where, start=start, stop=stop)
+        if not self._batch is None and where is None and \
+           start is None and stop is None:
+            self._batch.discard(path)
+
+        where = self._conf_where(path, where, start, stop)
+
+        if isinstance(where, np.ndarray): # coordinates already within range
+            start, stop = None, None
+
+        storage = self._storage(path)
+
+        if not self.conf_index is None and where is None and \
+           start is None and stop is None and not storage is self.conf_index:
+            # a results folder or a result table
+            parent, name = ("/" + path.strip("/")).rsplit("/", 1)
+            if self.parse_conf_key(name) is None:
+                self._uncatalog(parent, name)
+            else:
+                self._uncatalog(path)
+
+        if storage is self.conf_index and where is None and \
+           start is None and stop is None:
+            # the folder with the results goes too
+            if self.backend.exists(path):
+                self.backend.remove(path)
+
+        storage.remove(path, where, start=start, stop=stop)
+        self._flusher.wrote()
 
     # this is used from select_results; does not need to be tested separately
+    @profiled
     def select_children(self, path, keys=None,
                         start=None, stop=None, columns=None):
         if keys is None:
@@ -515,6 +1230,7 @@ class ExpLog:
         else:
             raise RuntimeError("key format not understood")
 
+    @profiled
     def select_results(self, logFolder, conf=None, result_key=None,
                        start=None, stop=None, columns=None):
         """
@@ -608,14 +1324,118 @@ class ExpLog:
         else:
              raise RuntimeError("conf format not understood")
 
+    @profiled
+    def aggregate_results(self, logFolder, key, by=None, agg=('mean', 'std'),
+                          columns=None, conf=None, irun_key='_irun_',
+                          chunksize=100000, aggregator=None):
+        """
+        Aggregates the result tables stored under key for the configurations
+        in logFolder, e.g. the mean and the standard deviation of a metric
+        over the repeats, grouped by some of the parameters:
+
+            explog.aggregate_results("Exp", "metrics", by=['lr'],
+                                     agg=['mean', 'std', 'median', 'p90'])
+
+        The result tables are streamed in chunks of chunksize rows into an
+        Aggregator, so the log does not need to fit into memory. Returns
+        a DataFrame indexed by the by columns, with (column, aggregate) pairs
+        as its columns. If no results are found, an empty DataFrame is
+        returned.
+
+        Arguments:
+            by: list of str or None
+                The columns to group by: parameters from the conf table and/or
+                columns of the result tables (such as an epoch column). If
+                None, all the results are aggregated into a single row.
+            agg: list of str
+                The aggregates (see aggregate.parse_agg).
+            columns: list of str or None
+                The result columns to aggregate. If None, all the numeric
+                result columns except for irun_key and the by columns are
+                aggregated.
+            conf: a valid conf specification for conf2where
+                Restricts the aggregation to the matching configurations.
+            aggregator: Aggregator or None
+                If not None, the results are added into this aggregator
+                (e.g. to aggregate several logs) and it is returned instead of
+                the DataFrame; by, agg and columns are then ignored.
+        """
+        if not aggregator is None:
+            by = aggregator.by
+        elif by is None:
+            by = []
+        elif isinstance(by, str):
+            by = [by]
+
+        coldtypes = self._storage(logFolder).coldtypes(logFolder)
+        if coldtypes is None:
+            raise KeyError("No conf table at '{}'.".format(logFolder))
+        
+        conf_by = [b for b in by if b in coldtypes]
+        confs = self.select(logFolder, conf, columns=conf_by)
+
+        return_result = aggregator is None
+        if return_result:
+            aggregator = Aggregator(by, columns, agg)
+
+        for iconf in confs.index:
+            path = logFolder + "/" + self.conf_key.format(iconf=iconf) + \
+                   "/" + key
+            if not self.exists(path):
+                continue
+
+            for chunk in self.backend.select(path, chunksize=chunksize):
+                for b in conf_by:
+                    chunk[b] = confs.at[iconf, b]
+                
+                if aggregator.columns is None:
+                    aggregator.columns = [c for c in chunk.columns
+                        if not c in by and c != irun_key and
+                           np.issubdtype(chunk[c].dtype, np.number)]
+
+                aggregator.update(chunk)
+
+        if return_result:
+            return aggregator.result()
+        return aggregator
+
+    def export_parquet(self, root, logFolders=None, keys=None,
+                       chunksize=100000, compression='snappy'):
+        """
+        Exports the log into a directory of partitioned Parquet datasets,
+        incrementally on re-export; see export.export_parquet.
+        """
+        from .export import export_parquet
+        return export_parquet(self, root, logFolders, keys,
+                              chunksize, compression)
+
+    def share_image(self, name=None):
+        """
+        Publishes a read-only snapshot of the log in shared memory, which
+        worker processes can open without copying it; see
+        shared.SharedImage.
+        """
+        from .shared import SharedImage
+        return SharedImage.publish(self, name)
+
     # this is used from remove_results; does not need to be tested separately
+    @profiled
     def remove_children(self, path, keys=None,
                         start=None, stop=None, columns=None):
+        if not self._batch is None and start is None and stop is None:
+            for key in [None] if keys is None else \
+                       [keys] if isinstance(keys, str) else keys:
+                self._batch.discard(path if key is None else path + "/" + key)
+
+        if start is None and stop is None:
+            self._uncatalog(path, keys)
+
         if keys is None:
             # remove all results
             if start is None and stop is None:
                 # if start and stop are specified, delete the whole thing
-                self.hdfstore.remove(path, start=start, stop=stop)
+                self.backend.remove(path, start=start, stop=stop)
+                self._flusher.wrote()
             else: # if start and/or stop are specified, we go key by key
                 keys = self.get_keys(path)
 
@@ -625,14 +1445,17 @@ class ExpLog:
 
         if isinstance(keys, str):
             # remove the specified result table
-            self.hdfstore.remove(path + "/" + keys,
+            self.backend.remove(path + "/" + keys,
                                  start=start, stop=stop)
         elif isinstance(keys, collections.Container):
             for rk in keys:
-                self.hdfstore.remove(path + "/" + rk, start=start, stop=stop)                                    
+                self.backend.remove(path + "/" + rk, start=start, stop=stop)                                    
         else:
             raise RuntimeError("keys format not understood")
 
+        self._flusher.wrote()
+
+    @profiled
     def remove_results(self, logFolder, conf=None, result_key=None,
                        start=None, stop=None):
         """
@@ -697,9 +1520,57 @@ class ExpLog:
 
     def __add_result__(self, logFolder, iconf, results, mode):
         result_path = logFolder + "/" + self.conf_key.format(iconf=iconf)
+
+        if not self._batch is None:
+            for key, data in results.items():
+                self._batch.add(result_path + "/" + key, data, mode)
+            self._batch.result_keys.append((logFolder, iconf,
+                                            list(results.keys())))
+            return
+
         for key, data in results.items():
             self.add_data(result_path + "/" + key, data, mode=mode)
+
+        if not self.conf_index is None:
+            self.conf_index.add_result_keys(logFolder, iconf, results.keys())
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        A context, in which the results added by add_results are staged and
+        committed together when it exits, with a single flush:
+
+            with explog.batch():
+                for conf, results in runs:
+                    explog.add_results("Exp", conf, results)
+
+        The confs are added right away (so conf2idx sees them), but
+        the result tables are only written on commit and the writes to
+        the same table are concatenated; the results are not visible to
+        selects until then. If an exception leaves the context, or if
+        the commit fails, nothing of the batch is kept: the written results
+        are undone and the confs added in the batch are removed. See
+        batch.Batch.
+
+        Batches do not nest: an inner batch is a part of the outer one.
+        """
+        if not self._batch is None:
+            yield self._batch
+            return
+
+        self._batch = Batch(self)
+
+        try:
+            yield self._batch
+        except BaseException:
+            batch, self._batch = self._batch, None
+            batch.rollback()
+            raise
+
+        batch, self._batch = self._batch, None
+        batch.commit()
                 
+    @profiled
     def add_results(self, logFolder, conf, results, mode='append'):
         """
         Adds the specified results to the log.
@@ -787,6 +1658,154 @@ class ExpLog:
             # re-raise the exception
             raise
 
+        if not self._batch is None:
+            self._batch.added_confs.extend((logFolder, aa) for aa in added)
+
+    def parse_conf_key(self, name):
+        """
+        The inverse of conf_key.format: returns the conf index encoded in the
+        name of a results folder, or None if name is not a results folder name.
+        """
+        prefix, suffix = self.conf_key.split("{iconf}")
+        m = re.fullmatch(re.escape(prefix) + r"(\d+)" + re.escape(suffix), name)
+        return None if m is None else int(m.group(1))
+
+    @profiled
+    def log_folders(self):
+        """
+        Returns the paths of all log folders, i.e. of all the configuration
+        tables stored in the log (result tables are not included).
+        """
+        folders = []
+
+        for key in self.backend.keys():
+            parent = key.rsplit("/", 1)[0].rsplit("/", 1)[-1]
+            if self.parse_conf_key(parent) is None:
+                folders.append(key)
+
+        if not self.conf_index is None:
+            folders = sorted(set(folders) | set(self.conf_index.keys()))
+
+        return folders
+
+    @profiled
+    def merge(self, other_logs, logFolders=None, chunksize=100000):
+        """
+        Merges the configurations and results from other logs (e.g. shards
+        written by different cluster nodes) into this log.
+
+        Configurations are deduplicated by value: a configuration that is
+        already present in this log (or in a shard merged before) reuses its
+        existing entry, other configurations are appended in bulk and their
+        results are stored under the newly assigned conf indices. Result
+        tables that do not exist in this log yet are copied at the HDF5 level;
+        only the tables that already exist are appended through pandas (in
+        chunks of chunksize rows).
+
+        If the configuration tables of a logFolder have different columns
+        in the two logs, a ValueError is raised.
+
+        Returns a list with an item for every merged log: a dictionary that
+        maps every merged logFolder to a dictionary, which maps the old conf
+        indices to the new ones.
+
+        Arguments:
+            other_logs: ExpLog, str, or a list of these
+                The logs to merge into this one. Strings are interpreted as
+                paths to log files.
+            logFolders: str, list of str, or None
+                The log folders to merge. If None, all log folders are merged.
+        """
+        if isinstance(other_logs, (ExpLog, str)):
+            other_logs = [other_logs]
+
+        mappings = []
+
+        for other in other_logs:
+            if isinstance(other, str):
+                other = ExpLog(other)
+                try:
+                    mappings.append(self._merge_log(other, logFolders,
+                                                    chunksize))
+                finally:
+                    other.close()
+            else:
+                mappings.append(self._merge_log(other, logFolders, chunksize))
+
+        return mappings
+
+    def _merge_log(self, other, logFolders, chunksize):
+        if logFolders is None:
+            logFolders = other.log_folders()
+        elif isinstance(logFolders, str):
+            logFolders = [logFolders]
+
+        return {logFolder: self._merge_folder(other, logFolder, chunksize)
+                for logFolder in logFolders}
+
+    def _merge_folder(self, other, logFolder, chunksize):
+        logFolder = "/" + logFolder.strip("/")
+        other_confs = other.select(logFolder)
+
+        # index the confs that are already logged by their values
+        if self.exists(logFolder):
+            confs = self.select(logFolder)
+            if set(confs.columns) != set(other_confs.columns):
+                raise ValueError("The configuration tables at '{}' have "
+                                 "different columns.".format(logFolder))
+            other_confs = other_confs[confs.columns]
+            known = {}
+            for iconf, row in zip(confs.index, confs.itertuples(index=False)):
+                known.setdefault(tuple(row), iconf)
+        else:
+            known = {}
+
+        # map the other confs onto the existing ones and collect the new ones
+        mapping = {}
+        pending = {}
+        new_rows = {}
+        new_confs = []
+
+        for iconf, row in zip(other_confs.index,
+                              other_confs.itertuples(index=False)):
+            row = tuple(row)
+            try:
+                mapping[iconf] = known[row]
+            except KeyError:
+                if not row in new_rows:
+                    new_rows[row] = len(new_confs)
+                    new_confs.append(iconf)
+                pending[iconf] = new_rows[row]
+
+        # add the new confs in a single append
+        if len(new_confs):
+            idx = self.add_confs(logFolder, other_confs.loc[new_confs])
+            for iconf, inew in pending.items():
+                mapping[iconf] = idx[inew]
+
+        # move the results
+        for iconf, inew in mapping.items():
+            src_path = logFolder + "/" + other.conf_key.format(iconf=iconf)
+            children = other.get_children(src_path)
+            if not children: continue
+
+            dst_name = self.conf_key.format(iconf=inew)
+            dst_path = logFolder + "/" + dst_name
+            if not self.exists(dst_path):
+                self.add_folder(logFolder, dst_name)
+
+            for key in children:
+                if not self.exists(dst_path + "/" + key):
+                    self.backend.copy_from(other.backend, src_path + "/" + key,
+                                           dst_path + "/" + key, chunksize)
+                else:
+                    for chunk in other.backend.select(src_path + "/" + key,
+                                                      chunksize=chunksize):
+                        self.add_data(dst_path + "/" + key, chunk,
+                                      mode='append')
+
+        return mapping
+
 #    def get_conf_path(self, logFolder, conf, useFirstConf=False):
 #        """
 #            useFirstConf: If true and there are multiple entries corresponding
@@ -897,13 +1916,43 @@ class ExpLog:
     
     
     
-    def open(self, log_file):
-        self.hdfstore = pd.HDFStore(log_file)
-    
+    def open(self, log_file, mode='a'):
+        if not self.backend is None and self.backend.is_open:
+            self.backend.close()
+
+        self.backend = HDFBackend(log_file, mode=mode)
+        if not self.profiler is None:
+            self.backend.enable_profiling(self.profiler)
+
+    @profiled
+    def flush(self, fsync=None):
+        """
+        Flushes the buffered writes into the file. If fsync is True, the
+        operating system is also asked to write the file through to disk;
+        if None, the fsync setting of the flush policy is used.
+        """
+        if fsync is None:
+            fsync = self.flush_policy.fsync
+
+        if not self.backend is None and self.backend.is_open:
+            self.backend.flush(fsync=fsync)
+            self._flusher.flushed()
+
     def close(self):
-        if not self.hdfstore is None and self.hdfstore.is_open:
-            self.hdfstore.close()
-            self.hdfstore = None
+        flusher = getattr(self, '_flusher', None)
+
+        if not flusher is None:
+            flusher.stop()
+            # closing flushes the file, but does not fsync it
+            if flusher.writes and self.flush_policy.fsync:
+                self.flush()
+
+        if not getattr(self, 'backend', None) is None and self.backend.is_open:
+            self.backend.close()
+            self.backend = None
+
+        if not getattr(self, 'conf_index', None) is None:
+            self.conf_index.close()
     
     def __del__(self):
         self.close()
@@ -3,10 +3,25 @@
 import pandas as pd
 import numpy as np
 import collections
+import sys
+import time
+import re
+import contextlib
+import shutil
+import tempfile
+import joblib
 from joblib import Parallel, delayed, cpu_count
+from .transport import SharedResultsExperiment, receive_results, \
+                       default_directory
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 class ExpManager:
-    def __init__(self, explog, update_mode='skip'):
+    def __init__(self, explog, update_mode='skip', runinfo_key=None,
+                 irun_key='_irun_'):
         """
             Constructs an experiment manager.
             
@@ -18,58 +33,372 @@ class ExpManager:
                        'skip': Skip this configuration, and do not add the results.
                        'replace': Replaces the existing entry with the new entry.
                        'append': Adds the new entry and also keeps the existing entry.
+            runinfo_key: If not None, every experiment call is measured (see
+                   measure_run) and the measurements are stored in a result
+                   table of this name (typically '_runinfo'), next to the
+                   results. The row describing the whole call has irun_key
+                   set to -1; the rows describing individual repeats (if the
+                   experiment adds them, see repeated_experiment) carry
+                   the index of the repeat.
+            irun_key: The name of the column that identifies repeats.
         """
         self.explog = explog
         self.update_mode = update_mode
+        self.runinfo_key = runinfo_key
+        self.irun_key = irun_key
+
+    def _lookupRun(self, iconf, conf, logGroup):
+        """
+        Applies the update mode to conf. Returns a tuple (skip, replace_run),
+        where skip says whether the conf should not be run at all and
+        replace_run is the index of the logged run to replace (or None).
+        """
+        try:
+            if self.update_mode == 'skip' and self.explog.exists(logGroup, conf):
+                print("Skipping configuration {}: results already logged.".format(iconf))
+                return True, None
+            elif self.update_mode == 'replace':
+                it = self.explog.select(logGroup, conf)
+                if len(it):
+                    print("Replacing configuration {}.".format(iconf))
+                    return False, it.index[0]
+                                        
+        except KeyError:
+            print("Group '{}' not found. It will be created.".format(logGroup))
+
+        return False, None
               
     def runExperiment(self, experiment, confCollection, logGroup):
         if isinstance(confCollection, collections.Mapping):
             confCollection = [confCollection]
         
         for iconf, conf in enumerate(confCollection):
-            replace_run = None
-    
-            try:
-                if self.update_mode == 'skip' and self.explog.has_entry(logGroup, conf):
-                    print("Skipping configuration {}: results already logged.".format(iconf))
-                    continue
-                elif self.update_mode == 'replace':
-                    it = self.explog.select(logGroup, conf)
-                    if len(it):
-                        replace_run = it.index[0]
-                        print("Replacing configuration {}.".format(iconf))
-                                                
-            except KeyError:
-                print("Group '{}' not found. It will be created.".format(logGroup))
+            skip, replace_run = self._lookupRun(iconf, conf, logGroup)
+            if skip: continue
                 
             print("Running experiment '{}'...".format(logGroup))
-            res = experiment(conf)
+            
+            if self.runinfo_key is None:
+                res = experiment(conf)
+            else:
+                res, info = measure_run(experiment, conf)
+                info[self.irun_key] = -1
+                
+                if self.runinfo_key in res:
+                    res[self.runinfo_key] = pd.concat(
+                        [res[self.runinfo_key], info])
+                else:
+                    res[self.runinfo_key] = info
             
             if replace_run is None:
                 print(conf, '\n', res)
                 self.explog.add_results(logGroup, conf, res)
             else:
                 self.explog.add_results(logGroup, replace_run, res)
+
+    def runRepeatedExperiment(self, experiment, confCollection, logGroup,
+                              num_repeats, n_jobs=cpu_count(),
+                              irun_key=None, transport='pickle',
+                              transport_dir=None):
+        """
+        Like runExperiment, but runs num_repeats repeats of the experiment
+        for every configuration and logs each repeat as soon as it completes
+        (see log_repeated_experiment). If a run fails midway, the repeats
+        that have already completed stay in the log.
+        
+        If the manager has a runinfo_key, every repeat is measured in the
+        process that runs it and the whole call is measured as well.
+        
+        transport and transport_dir select how the results are sent from
+        the workers (see repeated_experiment). If irun_key is None,
+        the irun_key of the manager is used.
+        """
+        if irun_key is None:
+            irun_key = self.irun_key
+        
+        if isinstance(confCollection, collections.Mapping):
+            confCollection = [confCollection]
+        
+        for iconf, conf in enumerate(confCollection):
+            skip, replace_run = self._lookupRun(iconf, conf, logGroup)
+            if skip: continue
                 
-def repeated_experiment(experiment, configuration, num_repeats, n_jobs=cpu_count(), irun_key='_irun_'):
-    resCol = Parallel(n_jobs=n_jobs)(delayed(experiment)(configuration) for i in range(num_repeats))
-    res = {}
+            print("Running experiment '{}'...".format(logGroup))
+            
+            if replace_run is None:
+                log_conf, mode = conf, 'append'
+            else:
+                log_conf, mode = replace_run, 'replace'
+            
+            wall_time, cpu_time = time.perf_counter(), time.process_time()
+            log_repeated_experiment(self.explog, logGroup, experiment,
+                                    conf, num_repeats, n_jobs=n_jobs,
+                                    irun_key=irun_key, conf=log_conf,
+                                    mode=mode, runinfo_key=self.runinfo_key,
+                                    transport=transport,
+                                    transport_dir=transport_dir)
+
+            if not self.runinfo_key is None:
+                info = run_info(time.perf_counter() - wall_time,
+                                time.process_time() - cpu_time)
+                info[irun_key] = -1
+                self.explog.add_results(logGroup, log_conf,
+                                        {self.runinfo_key: info})
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the current process in bytes
+    (the high-water mark since the process started), or -1 if it cannot be
+    determined on this platform.
+    """
+    if resource is None:
+        return -1
+    
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+def run_info(wall_time, cpu_time, results=None):
+    """
+    Builds the single-row DataFrame that describes a run: its wall time and
+    CPU time (in seconds), the peak RSS of the process that ran it (see
+    peak_rss) and the total number of rows and bytes of the results.
+    
+    The peak RSS is stored as worker_maxrss: it is the high-water mark of
+    the whole process, not of the run, and joblib reuses its worker
+    processes, so it also covers the runs that the worker has carried out
+    before (and any other work of the process).
+    """
+    result_rows = 0
+    result_bytes = 0
+    
+    if isinstance(results, collections.Mapping):
+        for r in results.values():
+            if isinstance(r, collections.Mapping):
+                r = pd.DataFrame([r.values()], columns=r.keys())
+            result_rows += len(r)
+            result_bytes += int(r.memory_usage(deep=True).sum())
+    
+    return pd.DataFrame(collections.OrderedDict([
+        ('wall_time', [wall_time]),
+        ('cpu_time', [cpu_time]),
+        ('worker_maxrss', [peak_rss()]),
+        ('result_rows', [result_rows]),
+        ('result_bytes', [result_bytes])
+    ]))
+
+def measure_run(experiment, configuration):
+    """
+    Calls experiment(configuration) and measures the run. Returns a tuple
+    of the results and the run_info DataFrame. The CPU time only covers
+    the calling process, not any worker processes it uses.
+    """
+    wall_time, cpu_time = time.perf_counter(), time.process_time()
+    res = experiment(configuration)
+    info = run_info(time.perf_counter() - wall_time,
+                    time.process_time() - cpu_time, res)
+    return res, info
+
+class RunInfoExperiment:
+    """
+    Wraps an experiment so that every call is measured using measure_run and
+    the measurements are added to its results under runinfo_key.
+    """
+    def __init__(self, experiment, runinfo_key='_runinfo'):
+        self.experiment = experiment
+        self.runinfo_key = runinfo_key
+    
+    def __call__(self, configuration):
+        res, info = measure_run(self.experiment, configuration)
+        
+        if isinstance(res, dict):
+            res[self.runinfo_key] = info
+        
+        return res
+
+@contextlib.contextmanager
+def _transported(experiment, transport, transport_dir):
+    """
+    A context, which wraps experiment for the transport of its results to
+    the parent process: 'pickle' sends the DataFrames through the pipes of
+    joblib, 'mmap' writes them into memory-mapped files and sends only their
+    descriptions (see transport.SharedResultsExperiment).
+    
+    The files are written into a new directory in transport_dir, which is
+    removed when the context exits, along with the files of the results that
+    have not been received (e.g. because logging a repeat has failed).
+    """
+    if transport == 'pickle':
+        yield experiment
+        return
+    elif transport != 'mmap':
+        raise ValueError("Unknown transport '{}'.".format(transport))
+    
+    if transport_dir is None:
+        transport_dir = default_directory()
+    
+    directory = tempfile.mkdtemp(prefix="pyexplog-", dir=transport_dir)
+    try:
+        yield SharedResultsExperiment(experiment, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def repeated_experiment(experiment, configuration, num_repeats, n_jobs=cpu_count(), irun_key='_irun_', runinfo_key=None,
+                        transport='pickle', transport_dir=None):
+    """
+    Runs num_repeats repeats of the experiment in parallel and returns their
+    results concatenated, with irun_key identifying the repeat.
+    
+    If runinfo_key is not None, every repeat is measured in the process that
+    runs it (see RunInfoExperiment).
+    
+    With transport='mmap', the workers write the result DataFrames into
+    memory-mapped files (in a new directory in transport_dir, /dev/shm by
+    default, which is removed once the results are received) and only
+    send back their descriptions, which saves pickling large results;
+    the frames are rebuilt on the mapped files (see transport.SharedFrame).
+    """
+    if not runinfo_key is None:
+        experiment = RunInfoExperiment(experiment, runinfo_key)
+    
+    res = collections.OrderedDict()
+    
+    with _transported(experiment, transport, transport_dir) as experiment:
+        resCol = Parallel(n_jobs=n_jobs)(delayed(experiment)(configuration) for i in range(num_repeats))
+        resCol = [receive_results(rd) for rd in resCol]
 
     for ir, rd in enumerate(resCol):
         if not isinstance(rd, dict):
             raise TypeError("The results of the experiment must come as a dictionary.")
         
         for rk, r in rd.items():
-            print(rk)
-
             r[irun_key] = ir
+            res.setdefault(rk, []).append(r)
 
-            try:
-                frame = res[rk]
-            except KeyError:
-                res[rk] = r
-            else:
-                res[rk] = frame.append(r)
+    # concatenate once per key instead of appending repeat by repeat
+    return {rk: pd.concat(frames) for rk, frames in res.items()}
+
+def _joblib_version():
+    return tuple(int(v) for v in re.findall(r'\d+', joblib.__version__)[:2])
+
+def _streaming_return_as(ordered):
+    """
+    Returns the return_as argument of Parallel that yields the results as
+    they complete, given the installed version of joblib: 'generator_unordered'
+    requires joblib 1.4 and 'generator' joblib 1.3; older versions only
+    return lists (None).
+    """
+    version = _joblib_version()
+    
+    if not ordered and version >= (1, 4):
+        return 'generator_unordered'
+    elif version >= (1, 3):
+        return 'generator'
+    
+    return None
+
+def iter_repeated_experiment(experiment, configuration, num_repeats,
+                             n_jobs=cpu_count(), irun_key='_irun_',
+                             ordered=False, runinfo_key=None,
+                             transport='pickle', transport_dir=None):
+    """
+    Runs num_repeats repeats of the experiment in parallel and yields the
+    results of every repeat as soon as it is completed, so that only a single
+    repeat needs to be held in memory at a time. Each yielded item is the
+    results dictionary returned by the experiment, with irun_key added to
+    every result table.
+    
+    Arguments:
+        ordered: If False, the repeats are yielded (and numbered) in the
+            order in which they complete. If True, they are yielded in the
+            order in which they were submitted, which may require joblib to
+            hold on to the repeats that finish early.
+            
+            Yielding the repeats in the order of completion requires
+            joblib 1.4; with joblib 1.3, they are always yielded in order.
+            Older versions of joblib return all the repeats at once, so they
+            are only yielded after all of them have completed.
+        runinfo_key: If not None, every repeat is measured in the process
+            that runs it (see RunInfoExperiment).
+        transport: How the results are sent from the workers: 'pickle' or
+            'mmap' (see repeated_experiment).
+    """
+    if not runinfo_key is None:
+        experiment = RunInfoExperiment(experiment, runinfo_key)
+
+    return_as = _streaming_return_as(ordered)
+    parallel = Parallel(n_jobs=n_jobs) if return_as is None else \
+               Parallel(n_jobs=n_jobs, return_as=return_as)
+    
+    with _transported(experiment, transport, transport_dir) as experiment:
+        resGen = parallel(delayed(experiment)(configuration)
+                          for i in range(num_repeats))
+        
+        try:
+            for ir, rd in enumerate(resGen):
+                rd = receive_results(rd)
+                
+                if not isinstance(rd, dict):
+                    raise TypeError("The results of the experiment must come as a dictionary.")
+                
+                for r in rd.values():
+                    r[irun_key] = ir
+        
+                yield rd
+        finally:
+            # stop the repeats that are still running before their files
+            # are removed
+            if hasattr(resGen, 'close'):
+                resGen.close()
 
-    return res
+def log_repeated_experiment(explog, logFolder, experiment, configuration,
+                            num_repeats, n_jobs=cpu_count(),
+                            irun_key='_irun_', conf=None, mode='append',
+                            ordered=False, runinfo_key=None,
+                            transport='pickle', transport_dir=None):
+    """
+    Runs num_repeats repeats of the experiment and appends the results of
+    each repeat to the log as soon as it completes. The log is flushed
+    after every repeat so that the repeats completed so far survive a crash.
+    
+    Returns the number of repeats that have been logged.
+    
+    Arguments:
+        explog: The ExpLog into which the results are stored.
+        logFolder: The folder into which the results are stored.
+        conf: The configuration under which the results are logged (any conf
+            specification accepted by ExpLog.add_results). If None,
+            configuration itself is used.
+        mode: The add_results mode used for the first repeat; the subsequent
+            repeats are always appended to it.
+        runinfo_key: If not None, every repeat is measured in the process
+            that runs it (see RunInfoExperiment).
+        transport: How the results are sent from the workers: 'pickle' or
+            'mmap' (see repeated_experiment).
+    """
+    if conf is None:
+        conf = configuration
+    
+    # resolve the addnew entry once, so that all the repeats go under it
+    if mode == 'addnew':
+        conf = list(explog.conf2idx(logFolder, conf, alwaysAddConf=True,
+                                    addMissingFolder=True))
+        mode = 'replace'
+    
+    num_logged = 0
+    repeats = iter_repeated_experiment(experiment, configuration, num_repeats,
+                                       n_jobs=n_jobs, irun_key=irun_key,
+                                       ordered=ordered,
+                                       runinfo_key=runinfo_key,
+                                       transport=transport,
+                                       transport_dir=transport_dir)
+    
+    # closing the repeats removes the files of the ones not received yet
+    with contextlib.closing(repeats):
+        for rd in repeats:
+            explog.add_results(logFolder, conf, rd, mode=mode)
+            explog.flush()
+            mode = 'append'
+            num_logged += 1
     
+    return num_logged
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pandas as pd
+import collections
+import functools
+import time
+
+def measure(data):
+    """
+    Returns a (rows, bytes) tuple for data read or written by the log: pandas
+    objects are measured directly, dictionaries and lists are measured
+    item by item, anything else counts as nothing.
+    """
+    if isinstance(data, pd.DataFrame):
+        return len(data), int(data.memory_usage(index=True).sum())
+    elif isinstance(data, (pd.Series, pd.Index)):
+        return len(data), int(data.nbytes)
+    elif isinstance(data, collections.Mapping):
+        data = data.values()
+    elif not isinstance(data, (list, tuple)):
+        return 0, 0
+
+    rows, nbytes = 0, 0
+    for d in data:
+        r, b = measure(d)
+        rows += r
+        nbytes += b
+
+    return rows, nbytes
+
+class Profiler:
+    """
+    Collects the number of calls, errors, the wall time and the numbers of
+    rows and bytes read or written for every profiled operation.
+
+    Hooks can be added to trace the individual calls: every hook is called
+    as hook(name, elapsed, rows, nbytes) after each profiled call.
+    """
+    columns = ['calls', 'errors', 'time', 'rows', 'bytes']
+
+    def __init__(self):
+        self.hooks = []
+        self.reset()
+
+    def reset(self):
+        """
+        Resets all the counters.
+        """
+        self.counters = collections.defaultdict(lambda: [0, 0, 0.0, 0, 0])
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def record(self, name, elapsed, rows=0, nbytes=0, error=False):
+        c = self.counters[name]
+        c[0] += 1
+        c[1] += error
+        c[2] += elapsed
+        c[3] += rows
+        c[4] += nbytes
+
+        for hook in self.hooks:
+            hook(name, elapsed, rows, nbytes)
+
+    def call(self, name, func, *args, measured=None, **kwargs):
+        """
+        Calls func(*args, **kwargs) and records the call under name. The
+        rows and bytes are measured on the return value, unless another
+        object (e.g. the data being written) is passed in as measured.
+        """
+        start = time.perf_counter()
+
+        try:
+            res = func(*args, **kwargs)
+        except:
+            self.record(name, time.perf_counter() - start, error=True)
+            raise
+
+        elapsed = time.perf_counter() - start
+        rows, nbytes = measure(res if measured is None else measured)
+        self.record(name, elapsed, rows, nbytes)
+
+        return res
+
+    def stats(self, reset=False):
+        """
+        Returns a snapshot of the counters as a DataFrame indexed by the names
+        of the operations. If reset is True, the counters are reset afterwards.
+        """
+        stats = pd.DataFrame.from_dict(dict(self.counters), orient='index')
+        stats = stats.reindex(columns=range(len(self.columns)))
+        stats.columns = self.columns
+        stats = stats.sort_index()
+
+        if reset:
+            self.reset()
+
+        return stats
+
+class ProfiledStore:
+    """
+    A proxy for a pandas HDFStore, which records the reads and writes into
+    a Profiler (under the 'hdfstore.' prefix) and forwards everything else.
+    """
+    reads = ['select', 'get', 'get_storer', 'get_node', 'keys']
+    writes = ['append', 'put']
+    other = ['remove', 'flush']
+
+    def __init__(self, store, profiler):
+        self.store = store
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        attr = getattr(self.store, name)
+
+        if name in self.reads or name in self.other:
+            return functools.partial(self.profiler.call,
+                                     'hdfstore.' + name, attr)
+        elif name in self.writes:
+            def write(key, value, *args, **kwargs):
+                return self.profiler.call('hdfstore.' + name, attr, key,
+                                          value, *args, measured=value,
+                                          **kwargs)
+            return write
+        else:
+            return attr
+
+def profiled(method):
+    """
+    A decorator for the ExpLog methods: if the log has a profiler, the calls
+    are recorded into it; otherwise the method is called directly. If
+    the log has a lock (see flushing.Flusher), the call holds it.
+    """
+    def call(self, *args, **kwargs):
+        if self.profiler is None:
+            return method(self, *args, **kwargs)
+        return self.profiler.call(method.__name__, method,
+                                  self, *args, **kwargs)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._lock is None:
+            return call(self, *args, **kwargs)
+
+        with self._lock:
+            return call(self, *args, **kwargs)
+
+    return wrapper
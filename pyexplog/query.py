@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import collections
+import numbers
+import math
+
+class Condition:
+    """
+    A condition on a single parameter. Conditions can be used as the values
+    of conf specifications (see ExpLog.conf2where) in place of plain values:
+
+        {'lr': In(0.1, 0.01, 0.001), 'batch': Range(10, 100)}
+
+    selects the confs with lr in the set and 10 <= batch < 100.
+
+    A condition is compiled either into a where clause (see where), or, if
+    the clause would be too long, evaluated on the values of the column
+    (see mask).
+    """
+    def where(self, column, negate=False):
+        """
+        Returns the where clause for column. If negate is True, the clause
+        is negated (pandas cannot pass negations on to PyTables, so
+        the negation is pushed down to the individual terms). An empty
+        string means that the condition holds for any value.
+        """
+        raise NotImplementedError()
+
+    def num_terms(self):
+        """
+        Returns the number of comparisons in the where clause.
+        """
+        raise NotImplementedError()
+
+    def mask(self, values):
+        """
+        Evaluates the condition on a numpy array with the values of
+        the column and returns a boolean array.
+        """
+        raise NotImplementedError()
+
+    def typed(self, dtype):
+        """
+        Returns the condition with the constants converted to the type of
+        a column of dtype (see typed_value).
+        """
+        raise NotImplementedError()
+
+# a where clause that matches no rows
+_NOTHING = 'index < 0'
+
+def literal(value):
+    """
+    Formats value as a constant of a where clause, keeping its type: bools
+    and numbers are not quoted (floats are written using repr, which
+    round-trips exactly), strings are quoted and escaped, anything else is
+    converted to str first (as it is stored in the log).
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return 'True' if value else 'False'
+    elif isinstance(value, numbers.Integral):
+        return str(int(value))
+    elif isinstance(value, numbers.Real):
+        value = float(value)
+        if math.isnan(value): # never equal to anything, as before
+            return '"nan"'
+        elif math.isinf(value):
+            return '1e400' if value > 0 else '-1e400'
+        return repr(value)
+    
+    value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return '"{}"'.format(value)
+
+class NoMatch(Exception):
+    """
+    Raised by typed_value if no value of the column can be equal to
+    the value.
+    """
+
+def _parse_number(value):
+    if isinstance(value, str):
+        for convert in (int, float):
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+
+    return value
+
+def typed_value(value, dtype):
+    """
+    Converts value to the type of a column of dtype: for string columns, it
+    is converted to str; for numeric columns, numeric strings are parsed.
+    For integer columns, integral floats are converted to ints; other floats
+    cannot be equal to any value of the column, so NoMatch is raised.
+    """
+    kind = np.dtype(dtype).kind
+
+    if kind in 'SUO':
+        return str(value)
+
+    value = _parse_number(value)
+
+    if kind in 'iu' and isinstance(value, numbers.Real) and \
+       not isinstance(value, numbers.Integral):
+        if not float(value).is_integer():
+            raise NoMatch()
+        return int(value)
+
+    return value
+
+def _constants(values, dtype):
+    """
+    Converts the constants of a condition so that they can be compared with
+    the values of a column of dtype (as stored by PyTables).
+    """
+    if dtype.kind == 'S':
+        return np.array([str(v).encode('utf-8') for v in values])
+    elif dtype.kind == 'U' or dtype.kind == 'O':
+        return np.array([str(v) for v in values])
+    else:
+        return np.array([float(v) if isinstance(v, str) else v
+                         for v in values])
+
+def _is_int(value):
+    return isinstance(value, numbers.Integral) and \
+           not isinstance(value, (bool, np.bool_))
+
+class In(Condition):
+    """
+    The parameter is equal to one of the values. The values can be passed
+    in as arguments or as a single iterable (such as a range). Runs of
+    consecutive integers are compiled into ranges, so In(range(10**6)) is
+    just two comparisons.
+    """
+    def __init__(self, *values):
+        if len(values) == 1 and isinstance(values[0], collections.Iterable) \
+           and not isinstance(values[0], str):
+            values = values[0]
+
+        self.values = list(values)
+
+    def runs(self):
+        """
+        Returns the values as a list of (first, last) runs: integers are
+        sorted and the consecutive ones are merged, any other values are
+        kept as runs of a single value.
+        """
+        ints = sorted(set(v for v in self.values if _is_int(v)))
+        runs = [(v, v) for v in self.values if not _is_int(v)]
+
+        for v in ints:
+            if len(runs) and _is_int(runs[-1][1]) and runs[-1][1] + 1 == v:
+                runs[-1] = (runs[-1][0], v)
+            else:
+                runs.append((v, v))
+
+        return runs
+
+    def where(self, column, negate=False):
+        if not len(self.values):
+            return '' if negate else _NOTHING
+
+        terms = []
+
+        for first, last in self.runs():
+            if first == last or last == first + 1:
+                terms.extend('{} {} {}'.format(column, '!=' if negate else '=',
+                             literal(v)) for v in sorted({first, last}))
+            elif negate:
+                terms.append('({c} < {} | {c} > {})'.format(
+                    literal(first), literal(last), c=column))
+            else:
+                terms.append('({c} >= {} & {c} <= {})'.format(
+                    literal(first), literal(last), c=column))
+
+        return (' & ' if negate else ' | ').join(terms)
+
+    def num_terms(self):
+        return sum(1 if first == last else 2 for first, last in self.runs())
+
+    def mask(self, values):
+        return np.in1d(values, _constants(self.values, values.dtype))
+
+    def typed(self, dtype):
+        values = []
+
+        for v in self.values:
+            try:
+                values.append(typed_value(v, dtype))
+            except NoMatch:
+                pass
+
+        return In(values)
+
+    def __repr__(self):
+        return "In({})".format(", ".join(repr(v) for v in self.values))
+
+class Range(Condition):
+    """
+    The parameter lies in the half-open interval start <= x < stop (or in
+    the closed interval start <= x <= stop if inclusive is True). Either
+    bound can be None.
+    """
+    def __init__(self, start=None, stop=None, inclusive=False):
+        self.start = start
+        self.stop = stop
+        self.inclusive = inclusive
+
+    def where(self, column, negate=False):
+        terms = []
+
+        if not self.start is None:
+            terms.append('{} {} {}'.format(column, '<' if negate else '>=',
+                                           literal(self.start)))
+
+        if not self.stop is None:
+            if self.inclusive:
+                op = '>' if negate else '<='
+            else:
+                op = '>=' if negate else '<'
+            terms.append('{} {} {}'.format(column, op, literal(self.stop)))
+
+        if not len(terms):
+            return _NOTHING if negate else ''
+
+        return '(' + (' | ' if negate else ' & ').join(terms) + ')'
+
+    def num_terms(self):
+        return (not self.start is None) + (not self.stop is None)
+
+    def mask(self, values):
+        mask = np.ones(len(values), dtype=bool)
+
+        if not self.start is None:
+            mask &= values >= _constants([self.start], values.dtype)[0]
+
+        if not self.stop is None:
+            stop = _constants([self.stop], values.dtype)[0]
+            mask &= values <= stop if self.inclusive else values < stop
+
+        return mask
+
+    def typed(self, dtype):
+        def bound(value, rounding):
+            if value is None:
+                return None
+
+            # the bounds of integer columns need to be integers as well;
+            # PyTables would truncate them
+            value = _parse_number(value)
+            if np.dtype(dtype).kind in 'iu' and \
+               isinstance(value, numbers.Real) and \
+               not isinstance(value, numbers.Integral):
+                value = rounding(value)
+
+            return typed_value(value, dtype)
+
+        return Range(bound(self.start, math.ceil),
+                     bound(self.stop, math.floor if self.inclusive
+                                      else math.ceil),
+                     self.inclusive)
+
+    def __repr__(self):
+        return "Range({!r}, {!r}, inclusive={!r})".format(
+            self.start, self.stop, self.inclusive)
+
+class Not(Condition):
+    """
+    Negates a condition, or a plain value (i.e. the parameter is not equal
+    to it).
+    """
+    def __init__(self, cond):
+        self.cond = as_condition(cond)
+
+    def where(self, column, negate=False):
+        return self.cond.where(column, not negate)
+
+    def num_terms(self):
+        return self.cond.num_terms()
+
+    def mask(self, values):
+        return ~self.cond.mask(values)
+
+    def typed(self, dtype):
+        return Not(self.cond.typed(dtype))
+
+    def __repr__(self):
+        return "Not({!r})".format(self.cond)
+
+def is_condition(value):
+    """
+    Returns whether value is to be interpreted as a condition rather than
+    a plain value: Conditions, ranges and sets are.
+    """
+    return isinstance(value, (Condition, range, set, frozenset))
+
+def as_condition(value):
+    """
+    Converts the value of a conf specification into a Condition: a range
+    or a set becomes In, a plain value becomes In with a single value.
+    """
+    if isinstance(value, Condition):
+        return value
+    elif isinstance(value, range) and value.step == 1:
+        return Range(value.start, value.stop)
+    elif isinstance(value, (range, set, frozenset)):
+        return In(value)
+    else:
+        return In([value])
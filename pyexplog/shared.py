@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import uuid
+from .log import ExpLog
+
+try:
+    from multiprocessing import shared_memory
+except ImportError: # Python < 3.8
+    shared_memory = None
+
+# where POSIX shared memory segments appear as files (on Linux)
+SHM_DIR = "/dev/shm"
+
+def _untrack(shm):
+    # a process that attaches to a segment would otherwise unlink it on exit
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except (ImportError, AttributeError):
+        pass
+
+class SharedImage:
+    """
+    A read-only snapshot of a log (its HDF5 file image, see
+    ExpLog.getFileImage) published once in shared memory, so that any number
+    of worker processes can read it at the memory cost of a single copy:
+
+        with SharedImage.publish(explog) as image:
+            Parallel(n_jobs=32)(delayed(analyze)(image, i) for i in ...)
+
+        def analyze(image, i):
+            explog = image.open()
+            ...
+
+    SharedImages are pickled as a reference to the segment, not its content.
+
+    The image is stored in a multiprocessing.shared_memory segment (or, on
+    Python versions without it, in a file in /dev/shm or the temporary
+    directory). Where the segment is visible as a file (on Linux), workers
+    open it as a read-only log file: HDF5 reads the shared pages directly
+    and only keeps its own caches, so the image is not copied. Elsewhere,
+    every worker copies the image into an in-memory log.
+
+    The process that publishes the image owns the segment; it is removed by
+    unlink (or when the with block exits).
+    """
+    def __init__(self, name, size, path=None):
+        """
+        Arguments:
+            name: str
+                The name of the shared memory segment (or of the file).
+            size: int
+                The size of the image in bytes.
+            path: str or None
+                The path under which the image can be opened as a file, if
+                there is one.
+        """
+        self.name = name
+        self.size = size
+        self.path = path
+        self._shm = None
+        self._owner = False
+
+    @classmethod
+    def publish(cls, explog, name=None):
+        """
+        Copies the current state of explog (an ExpLog stored in an HDF5 file,
+        or the path to a log file) into shared memory and returns
+        the SharedImage. If name is None, a unique name is generated.
+        """
+        if isinstance(explog, str):
+            explog = ExpLog(explog, mode='r')
+            try:
+                return cls.publish(explog, name)
+            finally:
+                explog.close()
+
+        image = explog.getFileImage()
+        size = len(image)
+
+        if not shared_memory is None:
+            shm = shared_memory.SharedMemory(name=name, create=True,
+                                             size=size)
+            shm.buf[:size] = image
+            path = os.path.join(SHM_DIR, shm.name)
+
+            shared = cls(shm.name, size,
+                         path if os.path.isfile(path) else None)
+            shared._shm = shm
+        else:
+            if name is None:
+                name = "pyexplog-" + uuid.uuid4().hex
+            directory = SHM_DIR if os.path.isdir(SHM_DIR) else \
+                        tempfile.gettempdir()
+            path = os.path.join(directory, name)
+
+            with open(path, "xb") as f:
+                f.write(image)
+
+            shared = cls(name, size, path)
+
+        shared._owner = True
+        return shared
+
+    def open(self, **kwargs):
+        """
+        Returns a read-only ExpLog on the image; kwargs are passed to ExpLog.
+        """
+        if not self.path is None:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError("The shared image '{}' has been "
+                                        "unlinked.".format(self.name))
+            return ExpLog(self.path, mode='r', **kwargs)
+
+        # the segment cannot be opened as a file: copy the image
+        shm = shared_memory.SharedMemory(name=self.name)
+        _untrack(shm)
+
+        try:
+            image = bytes(shm.buf[:self.size])
+        finally:
+            shm.close()
+
+        return ExpLog(self.name + ".h5", in_memory=True, image=image,
+                      **kwargs)
+
+    def unlink(self):
+        """
+        Removes the image from shared memory; the logs that are open on it
+        can still be read (until they are closed). Only the publishing
+        process can unlink an image.
+        """
+        if not self._owner:
+            raise RuntimeError("Only the process that published the image "
+                               "can unlink it.")
+
+        if not self._shm is None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+        self._owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._owner:
+            self.unlink()
+
+    def __reduce__(self):
+        return (SharedImage, (self.name, self.size, self.path))
+
+    def __repr__(self):
+        return "SharedImage({!r}, {}, {!r})".format(self.name, self.size,
+                                                    self.path)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import collections
+import os
+import tempfile
+import uuid
+
+# the alignment of the blocks in the files of SharedFrames
+ALIGNMENT = 64
+
+def default_directory():
+    """
+    Returns the directory in which the results are shared: /dev/shm where it
+    exists (so that the files stay in memory), the temporary directory
+    otherwise.
+    """
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+def _shared_dtype(dtype):
+    # only plain numpy dtypes of fixed size are stored in the file
+    return isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM'
+
+class SharedFrame:
+    """
+    Describes a DataFrame that a worker process has written into
+    a memory-mapped file, so that only the description needs to be sent to
+    the parent process (see SharedResultsExperiment).
+
+    The columns of every numeric dtype are stored as a single (columns, rows)
+    block, which is the layout of pandas blocks. If all the columns are
+    stored in one block, the frame rebuilt by load is a view of the mapped
+    file, without any copy; otherwise, pandas copies the columns once when it
+    puts the frame together. Columns of other dtypes (e.g. strings) and
+    the index are pickled along with the description.
+    """
+    def __init__(self, frame, directory=None):
+        """
+        Writes frame into a new file in directory (see default_directory).
+        """
+        self.path = None
+        self.frame = None
+        self.nrows = len(frame)
+        self.columns = list(frame.columns)
+        self.blocks = []
+        self.inline = collections.OrderedDict()
+
+        if isinstance(frame.index, pd.RangeIndex) and \
+           frame.index.equals(pd.RangeIndex(self.nrows)):
+            self.index = None
+        else:
+            self.index = frame.index
+
+        groups = collections.OrderedDict()
+
+        if frame.columns.is_unique:
+            for c in self.columns:
+                if _shared_dtype(frame[c].dtype):
+                    groups.setdefault(frame[c].dtype, []).append(c)
+
+        offset = 0
+        for dtype, columns in groups.items():
+            self.blocks.append((dtype.str, columns, offset))
+            size = len(columns) * self.nrows * dtype.itemsize
+            offset += -(-size // ALIGNMENT) * ALIGNMENT
+
+        shared = {c for dtype, columns, o in self.blocks for c in columns}
+        for c in self.columns:
+            if not c in shared:
+                self.inline[c] = frame[c]
+
+        if offset == 0: # nothing to share: the frame is pickled
+            self.frame = frame
+            self.blocks = []
+            self.inline = collections.OrderedDict()
+            return
+
+        if directory is None:
+            directory = default_directory()
+
+        self.path = os.path.join(directory,
+                                 "pyexplog-results-" + uuid.uuid4().hex)
+        mm = np.memmap(self.path, dtype=np.uint8, mode='w+', shape=offset)
+
+        for dtype, columns, o in self.blocks:
+            block = self._block(mm, dtype, columns, o)
+            for i, c in enumerate(columns):
+                block[i] = frame[c].values
+
+        mm.flush()
+        del mm
+
+    def _block(self, mm, dtype, columns, offset):
+        dtype = np.dtype(dtype)
+        size = len(columns) * self.nrows * dtype.itemsize
+        return mm[offset:offset + size].view(dtype).reshape(len(columns),
+                                                            self.nrows)
+
+    def load(self, unlink=True):
+        """
+        Returns the DataFrame. The file is mapped copy-on-write, so
+        the frame can be modified without changing the file. If unlink is
+        True, the file is removed (the mapping stays valid until the frame
+        is collected).
+        """
+        if self.path is None:
+            return self.frame
+
+        # a plain view of the map (pandas does not expect memmaps)
+        mm = np.asarray(np.memmap(self.path, dtype=np.uint8, mode='c'))
+        if unlink:
+            self.unlink()
+
+        blocks = [self._block(mm, *b) for b in self.blocks]
+
+        if len(blocks) == 1 and not len(self.inline):
+            # the transposed block is what pandas stores: no copy
+            return pd.DataFrame(blocks[0].T, index=self.index,
+                                columns=self.columns, copy=False)
+
+        data = collections.OrderedDict(self.inline)
+        for (dtype, columns, offset), block in zip(self.blocks, blocks):
+            for i, c in enumerate(columns):
+                data[c] = block[i]
+
+        return pd.DataFrame(data, index=self.index, columns=self.columns)
+
+    def unlink(self):
+        """
+        Removes the file (e.g. if the frame is not going to be loaded).
+        """
+        if not self.path is None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+def share_results(results, directory=None):
+    """
+    Replaces the DataFrames in a results dictionary by SharedFrames.
+    """
+    if not isinstance(results, dict):
+        return results
+
+    return {k: SharedFrame(r, directory) if isinstance(r, pd.DataFrame) else r
+            for k, r in results.items()}
+
+def receive_results(results):
+    """
+    The inverse of share_results: loads the SharedFrames of a results
+    dictionary (and removes their files).
+    """
+    if not isinstance(results, dict):
+        return results
+
+    return {k: r.load() if isinstance(r, SharedFrame) else r
+            for k, r in results.items()}
+
+class SharedResultsExperiment:
+    """
+    Wraps an experiment so that the DataFrames it returns are written into
+    memory-mapped files in directory and only their descriptions
+    (SharedFrames) are sent back to the parent process, which loads them
+    using receive_results. See the transport argument of
+    repeated_experiment.
+
+    If the parent does not receive the results (e.g. it is killed), the files
+    are left behind in directory.
+    """
+    def __init__(self, experiment, directory=None):
+        self.experiment = experiment
+        self.directory = directory
+
+    def __call__(self, configuration):
+        return share_results(self.experiment(configuration), self.directory)
@@ -3,6 +3,9 @@
 from setuptools import setup, find_packages
 
 setup(
+	# joblib 1.3 or 1.4 is needed for the repeats to be logged as they
+	# complete (see manager.iter_repeated_experiment)
+	install_requires=['joblib>=0.14'],
 	# for running tests using py.test
 	setup_requires=['pytest-runner'],
 	tests_require=['pytest']
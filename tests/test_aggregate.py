@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+import numpy as np
+import pandas as pd
+from pyexplog.aggregate import TDigest, Aggregator, parse_agg
+
+def make_frame(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({'g': rng.randint(0, 3, n), 'x': rng.randn(n),
+                         'y': rng.rand(n) * 100})
+
+# Tests for TDigest.
+class TestTDigest:
+    def testExact(self):
+        d = TDigest(compression=100)
+        d.update([5, 1, 4, 2, 3, np.nan])
+        assert d.quantile(0.5) == 3
+        assert d.quantile(0.25) == np.percentile([1, 2, 3, 4, 5], 25)
+
+    def testAccuracy(self):
+        x = np.random.RandomState(1).rand(100000)
+        d = TDigest()
+        for chunk in np.array_split(x, 50):
+            d.update(chunk)
+
+        assert len(d.means) <= 100
+        assert d.count() == len(x)
+        for q in [0.01, 0.1, 0.5, 0.9, 0.99]:
+            assert abs(d.quantile(q) - q) < 0.02
+
+    def testMerge(self):
+        x = np.random.RandomState(2).rand(20000)
+        a, b = TDigest(), TDigest()
+        a.update(x[:5000])
+        b.update(x[5000:])
+        a.merge(b)
+
+        assert a.count() == len(x)
+        assert a.min == x.min() and a.max == x.max()
+        assert abs(a.quantile(0.5) - 0.5) < 0.02
+
+    def testEmpty(self):
+        assert np.isnan(TDigest().quantile(0.5))
+
+# Tests for Aggregator.
+class TestAggregator:
+    def testMoments(self):
+        frame = make_frame(1000)
+        agg = Aggregator(by=['g'], agg=['count', 'sum', 'mean', 'var', 'std',
+                                        'min', 'max'])
+        for chunk in np.array_split(frame, 7):
+            agg.update(chunk)
+        
+        res = agg.result()
+        expected = frame.groupby('g').agg(['count', 'sum', 'mean', 'var',
+                                           'std', 'min', 'max'])
+        assert list(res.index) == [0, 1, 2]
+        for col in ['x', 'y']:
+            for name in ['count', 'sum', 'mean', 'var', 'std', 'min', 'max']:
+                assert np.allclose(res[(col, name)], expected[(col, name)])
+
+    def testMerge(self):
+        frame = make_frame(1000)
+        a = Aggregator(by=['g'], columns=['x'], agg=['mean', 'std', 'median'])
+        b = Aggregator(by=['g'], columns=['x'], agg=['mean', 'std', 'median'])
+        a.update(frame[:300])
+        b.update(frame[300:])
+        a.merge(b)
+        
+        res = a.result()
+        expected = frame.groupby('g')['x'].agg(['mean', 'std', 'median'])
+        assert np.allclose(res[('x', 'mean')], expected['mean'])
+        assert np.allclose(res[('x', 'std')], expected['std'])
+        assert np.allclose(res[('x', 'median')], expected['median'], atol=0.1)
+
+    def testReduce(self):
+        frame = make_frame(1000)
+        agg = Aggregator(by=['g'], columns=['y'], agg=['mean'], max_parts=5)
+        for chunk in np.array_split(frame, 20):
+            agg.update(chunk)
+        
+        assert len(agg.parts) <= 2
+        assert np.allclose(agg.result()[('y', 'mean')],
+                           frame.groupby('g')['y'].mean())
+
+    def testNoGroups(self):
+        frame = make_frame(100)
+        agg = Aggregator(columns=['x'], agg=['count', 'p50'])
+        agg.update(frame)
+        res = agg.result()
+        assert list(res.index) == [0]
+        assert res[('x', 'count')][0] == 100
+        assert np.isclose(res[('x', 'p50')][0], frame['x'].median())
+
+    def testParseAgg(self):
+        assert parse_agg(['mean', 'median', 'p90']) == \
+               [('mean', None), ('median', 0.5), ('p90', 0.9)]
+        assert np.isclose(parse_agg('p99.9')[0][1], 0.999)
+        
+        with pytest.raises(ValueError):
+            parse_agg(['p101'])
+
+        with pytest.raises(ValueError):
+            parse_agg(['mode'])
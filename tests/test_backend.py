@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+import pytest
+import numpy as np
+import pandas as pd
+from pyexplog.log import ExpLog
+from pyexplog.query import In, Range
+from routines import make_results, make_explog
+pytest.importorskip("pyarrow")
+from pyexplog.backend import DirectoryBackend, _where_expr
+
+def make_frame():
+    return pd.DataFrame({'a': [1, 2, 3, 4], 'b': ["x", "y", "x", 'q"'],
+                         'c': [0.5, 1.5, 2.5, 3.5],
+                         'd': [True, False, True, False]},
+                        columns=['a', 'b', 'c', 'd'])
+
+# Tests for the translation of where clauses.
+class TestWhereExpr:
+    def testEquality(self):
+        assert _where_expr('a = 1 and b != "x"') == 'a == 1 and b != "x"'
+        assert _where_expr('(a >= 1 & a <= 2) | a == 3') == \
+               '(a >= 1 & a <= 2) | a == 3'
+        assert _where_expr('b = "a = b" & c = \'=\'') == \
+               'b == "a = b" & c == \'=\''
+
+# Tests for DirectoryBackend.
+class TestDirectoryBackend:
+    def testSelect(self, tmpdir):
+        backend = DirectoryBackend(str(tmpdir))
+        frame = make_frame()
+        backend.append("/T", frame[:2])
+        backend.append("/T", frame[2:])
+
+        assert backend.keys() == ["/T"]
+        assert backend.num_rows("/T") == 4
+        assert backend.coldtypes("/T")['a'] == np.int64
+        assert backend.coldtypes("/T")['b'] == object
+        assert (backend.select("/T") == frame).all().all()
+        assert list(backend.select("/T", 'b = "x" & a > 1').index) == [2]
+        assert list(backend.select("/T", 'b = "q\\""').index) == [3]
+        assert list(backend.select("/T", 'index in (0, 3)', start=1,
+                                   columns=['c'])['c']) == [3.5]
+        assert [len(c) for c in backend.select("/T", chunksize=3)] == [3, 1]
+        assert list(backend.select_as_coordinates("/T", 'd = True',
+                                                  start=1)) == [2]
+        assert list(backend.read_column("/T", 'c', 1, 3)) == [1.5, 2.5]
+
+    def testErrors(self, tmpdir):
+        backend = DirectoryBackend(str(tmpdir))
+        backend.append("/T", make_frame())
+        backend.add_group("/", "G")
+
+        with pytest.raises(KeyError):
+            backend.select("/X")
+        with pytest.raises(TypeError):
+            backend.select("/G")
+        with pytest.raises(ValueError):
+            backend.select("/T", 'e = 5')
+        with pytest.raises(ValueError):
+            backend.append("/T", make_frame()[['a', 'b']])
+        with pytest.raises(ValueError):
+            backend.append("/T", make_frame().assign(a=0.5))
+
+    def testRemove(self, tmpdir):
+        backend = DirectoryBackend(str(tmpdir))
+        backend.append("/T", make_frame())
+        backend.remove("/T", 'a > 1 & a < 4')
+
+        assert list(backend.select("/T").index) == [0, 3]
+        backend.remove("/T", start=1)
+        assert list(backend.select("/T")['b']) == ["x"]
+        backend.remove("/T")
+        assert not backend.exists("/T")
+
+    def testReadOnly(self, tmpdir):
+        DirectoryBackend(str(tmpdir)).append("/T", make_frame())
+        backend = DirectoryBackend(str(tmpdir), mode='r')
+        assert len(backend.select("/T")) == 4
+
+        with pytest.raises(ValueError):
+            backend.append("/T", make_frame())
+
+# Tests for ExpLog with a DirectoryBackend.
+class TestDirectoryLog:
+    def testResults(self, tmpdir):
+        explog = ExpLog(backend=DirectoryBackend(str(tmpdir)))
+        explog.add_results("Exp", {'p1': 1, 'p2': "a"}, make_results())
+        explog.add_results("Exp", {'p1': 2, 'p2': "b"}, make_results(2))
+        explog.add_results("Exp", {'p1': 2.0, 'p2': "b"}, make_results(3))
+        
+        assert explog.conf2idx("Exp", {'p1': 2, 'p2': "b"}) == [1]
+        assert explog.conf2idx("Exp", {'p1': In(1, 2)}) == [0, 1]
+        assert explog.conf2idx("Exp", {'p1': Range(2)}) == [1]
+        assert set(explog.result_keys("Exp", 1)) == {'in_metrics',
+                                                     'out_metrics'}
+
+        res = explog.select_results("Exp", {'p1': 2})[0]['in_metrics']
+        assert list(res['cc1']) == [222, 444, 333, 666]
+
+        explog.remove_results("Exp", 0)
+        assert explog.select_results("Exp", 0) == {}
+
+        # the log persists in the directory
+        explog = ExpLog(backend=DirectoryBackend(str(tmpdir), mode='r'))
+        assert explog.log_folders() == ["/Exp"]
+        assert len(explog.select_results("Exp", 1)['out_metrics']) == 4
+
+    def testParallelAppends(self, tmpdir):
+        def work(i):
+            explog = ExpLog(backend=DirectoryBackend(str(tmpdir)))
+            for p in range(5):
+                explog.add_results("Exp{}".format(i), {'p': p},
+                                   make_results(i))
+
+        threads = [threading.Thread(target=work, args=(i,))
+                   for i in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        explog = ExpLog(backend=DirectoryBackend(str(tmpdir)))
+        assert len(explog.log_folders()) == 4
+        for i in range(4):
+            assert explog.conf2idx("Exp{}".format(i), None) == list(range(5))
+
+    def testMerge(self, tmpdir):
+        explog = ExpLog(backend=DirectoryBackend(str(tmpdir)))
+        other = make_explog()
+        explog.merge(other)
+
+        assert explog.conf2idx("EvoExperiment", None) == [0, 1]
+        sel = explog.select_results("EvoExperiment", 1)
+        assert (sel['in_metrics'].values == 
+                make_results()['in_metrics'].values).all()
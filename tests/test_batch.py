@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+import pandas as pd
+from tables.exceptions import NodeError
+from pyexplog.log import ExpLog
+from routines import make_results, function_explog
+
+def metrics(*values):
+    return {'metrics': pd.DataFrame({'loss': list(values)})}
+
+# Tests for ExpLog.batch.
+class TestBatch:
+    def testCommit(self, function_explog):
+        explog = function_explog
+
+        with explog.batch() as batch:
+            explog.add_results("Exp", {'p': 1}, metrics(1.0))
+            explog.add_results("Exp", {'p': 1}, metrics(2.0, 3.0))
+            explog.add_results("Exp", {'p': 2}, metrics(4.0))
+
+            # the confs are there, the results are not yet
+            assert explog.conf2idx("Exp", {'p': 1}) == [0]
+            assert not explog.exists("Exp/conf_0/metrics")
+            assert len(batch) == 3
+
+        res = explog.select_results("Exp", {'p': 1})[0]['metrics']
+        assert list(res['loss']) == [1.0, 2.0, 3.0]
+        assert list(res.index) == [0, 1, 2]
+        assert explog.num_rows("Exp/conf_1/metrics") == 1
+
+    def testReplace(self, function_explog):
+        explog = function_explog
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+
+        with explog.batch():
+            explog.add_results("Exp", {'p': 1}, metrics(2.0))
+            explog.add_results("Exp", {'p': 1}, metrics(3.0), mode='replace')
+            explog.add_results("Exp", {'p': 1}, metrics(4.0))
+
+        res = explog.select_results("Exp", {'p': 1})[0]['metrics']
+        assert list(res['loss']) == [3.0, 4.0]
+
+    def testError(self, function_explog):
+        explog = function_explog
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+
+        with pytest.raises(RuntimeError):
+            with explog.batch():
+                explog.add_results("Exp", {'p': 1}, metrics(2.0))
+                explog.add_results("Exp", {'p': 2}, metrics(3.0))
+                raise RuntimeError("interrupted")
+
+        assert explog.conf2idx("Exp", None) == [0]
+        assert not explog.exists("Exp/conf_1")
+        res = explog.select_results("Exp", {'p': 1})[0]['metrics']
+        assert list(res['loss']) == [1.0]
+
+    def testFailedCommit(self, function_explog):
+        explog = function_explog
+        explog.add_results("Exp", {'p': 1}, make_results())
+        explog.add_results("Exp", {'p': 1}, {'notes': {'s': "a"}})
+        explog.add_results("Exp", {'p': 2}, metrics(1.0))
+
+        with pytest.raises(ValueError):
+            with explog.batch():
+                explog.add_results("Exp", {'p': 1}, make_results(2))
+                explog.add_results("Exp", {'p': 2}, metrics(5.0),
+                                   mode='replace')
+                explog.add_results("Exp", {'p': 3}, metrics(2.0))
+                # longer than the strings that the existing table can store
+                explog.add_results("Exp", {'p': 1},
+                                   {'notes': {'s': "a" * 1000}})
+
+        # everything written by the commit is undone
+        res = explog.select_results("Exp", {'p': 1})[0]
+        assert len(res['in_metrics']) == 2
+        assert len(res['out_metrics']) == 2
+        res = explog.select_results("Exp", {'p': 2})[0]['metrics']
+        assert list(res['loss']) == [1.0]
+        assert explog.conf2idx("Exp", None) == [0, 1]
+        assert not explog.exists("Exp/conf_2")
+
+    def testSchemaMismatch(self, function_explog):
+        explog = function_explog
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+
+        with pytest.raises(ValueError):
+            with explog.batch():
+                explog.add_results("Exp", {'p': 1},
+                                   {'other': pd.DataFrame({'x': [1]})})
+                explog.add_results("Exp", {'p': 1},
+                                   {'other': pd.DataFrame({'y': [2.0]})})
+
+        with pytest.raises(ValueError):
+            with explog.batch():
+                explog.add_results("Exp", {'p': 1}, metrics(2.5))
+                explog.add_results("Exp", {'p': 1},
+                                   {'metrics': pd.DataFrame({'loss': ["x"]})})
+
+        # exactly convertible dtypes are appended, as outside of a batch
+        with explog.batch():
+            explog.add_results("Exp", {'p': 1}, {'metrics': {'loss': 3}})
+
+        assert not explog.exists("Exp/conf_0/other")
+        res = explog.select_results("Exp", {'p': 1})[0]['metrics']
+        assert list(res['loss']) == [1.0, 3.0]
+
+    def testNested(self, function_explog):
+        explog = function_explog
+
+        with explog.batch() as outer:
+            with explog.batch() as inner:
+                assert inner is outer
+                explog.add_results("Exp", {'p': 1}, metrics(1.0))
+            assert not explog.exists("Exp/conf_0/metrics")
+
+        assert explog.exists("Exp/conf_0/metrics")
+
+    def testRemoveInBatch(self, function_explog):
+        explog = function_explog
+
+        with explog.batch():
+            explog.add_results("Exp", {'p': 1}, make_results())
+            explog.remove_results("Exp", {'p': 1}, "in_metrics")
+
+        assert list(explog.get_keys("Exp/conf_0")) == ['out_metrics']
+
+    def testException(self, function_explog):
+        explog = function_explog
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+
+        with pytest.raises(NodeError):
+            with explog.batch():
+                explog.add_results("Exp", {'p': 1}, metrics(2.0),
+                                   mode='exception')
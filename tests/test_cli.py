@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import os
+import subprocess
+import sys
+import pandas as pd
+import pyexplog
+from pyexplog.log import ExpLog
+from pyexplog.cli import main
+
+def make_log(log_file):
+    explog = ExpLog(log_file)
+    for lr in [0.1, 0.01]:
+        explog.add_results("Exp", {'lr': lr, 'name': "a"}, {
+            'metrics': pd.DataFrame({'epoch': [0, 1, 2],
+                                     'loss': [3.0, 2.0, 1.0]})
+        })
+    explog.close()
+    return log_file
+
+def run(*argv):
+    out = io.StringIO()
+    status = main(list(argv), out=out)
+    return status, out.getvalue()
+
+# Tests for the command line tool.
+class TestCLI:
+    def testLs(self, tmpdir):
+        log_file = make_log(str(tmpdir.join("log.h5")))
+
+        status, out = run("ls", log_file)
+        assert status == 0
+        assert out.split() == ["Exp", "table", "(2", "rows)"]
+
+        status, out = run("ls", log_file, "/Exp/conf_1")
+        assert out.split() == ["metrics", "table", "(3", "rows)"]
+
+        status, out = run("tree", log_file, "--depth", "2")
+        lines = out.splitlines()
+        assert lines[0] == "/"
+        assert lines[1].startswith("Exp  [table")
+        assert lines[2].startswith("  conf_0  [folder]")
+        assert len(lines) == 4
+
+        status, out = run("ls", log_file, "/Missing")
+        assert status == 1
+
+    def testLsDoesNotImportPandas(self, tmpdir):
+        log_file = make_log(str(tmpdir.join("log.h5")))
+        root = os.path.dirname(os.path.dirname(pyexplog.__file__))
+        code = ("import sys; from pyexplog.cli import main; "
+                "main(['ls', {!r}]); "
+                "sys.exit('pandas' in sys.modules)").format(log_file)
+
+        env = dict(os.environ, PYTHONPATH=root)
+        assert subprocess.call([sys.executable, "-c", code], env=env,
+                               stdout=subprocess.DEVNULL) == 0
+
+    def testResults(self, tmpdir):
+        log_file = make_log(str(tmpdir.join("log.h5")))
+
+        status, out = run("confs", log_file, "/Exp", "--conf", "lr=0.01")
+        assert status == 0
+        assert not "_hash_" in out
+        assert out.splitlines()[1].split() == ["1", "0.01", "a"]
+
+        status, out = run("head", log_file, "Exp", "metrics", "-n", "1")
+        lines = out.splitlines()
+        assert lines[0] == "== conf_0 (lr=0.1, name='a') =="
+        assert lines[2].split() == ["0", "0", "3.0"]
+        assert len(lines) == 6
+
+        status, out = run("tail", log_file, "Exp", "metrics", "-n", "2",
+                          "-c", "lr=0.1")
+        lines = out.splitlines()
+        assert [l.split() for l in lines[2:]] == [["1", "1", "2.0"],
+                                                  ["2", "2", "1.0"]]
+
+    def testStats(self, tmpdir):
+        log_file = make_log(str(tmpdir.join("log.h5")))
+
+        status, out = run("stats", log_file, "Exp", "metrics", "--by",
+                          "epoch", "--columns", "loss", "--agg", "mean", "max")
+        assert status == 0
+        lines = out.splitlines()
+        assert lines[-1].split() == ["2", "1.0", "1.0"]
+
+        status, out = run("stats", log_file, "Exp", "missing")
+        assert out.strip() == "No results."
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+import pickle
+import pandas as pd
+import numpy as np
+from pyexplog.configuration import ParameterSpace, Configuration, \
+                                   ConfCollection, ConfPoint
+
+def make_space():
+    p1 = ParameterSpace("p1", range(3))
+    p2 = ParameterSpace("p2", [2, 3, 4, 5])
+    p3 = ParameterSpace("p3", "ab")
+    p4 = ParameterSpace("p4", (x for x in [7, 8]))
+    return p1 * p2 * p3 + p4
+
+# Tests for ParameterSpace.
+class TestParameterSpace:
+    def testIter(self):
+        p1 = ParameterSpace("p1", range(2))
+        p2 = ParameterSpace("p2", [5, 6])
+        assert list(p1 * p2 + p1) == [
+            {'p1': 0, 'p2': 5}, {'p1': 0, 'p2': 6},
+            {'p1': 1, 'p2': 5}, {'p1': 1, 'p2': 6},
+            {'p1': 0}, {'p1': 1}
+        ]
+
+    def testIterTwice(self):
+        space = make_space()
+        assert list(space) == list(space)
+
+    def testSharedParams(self):
+        p1 = ParameterSpace("p1", range(2))
+        with pytest.raises(RuntimeError):
+            p1 * p1
+
+    def testLen(self):
+        assert len(make_space()) == 3 * 4 * 2 + 2
+
+    def testLenHuge(self):
+        p = ParameterSpace("p", range(10**5))
+        q = ParameterSpace("q", range(10**5))
+        assert len(p * q) == 10**10
+        assert (p * q)[10**10 - 1] == {'p': 10**5 - 1, 'q': 10**5 - 1}
+
+    def testGetItem(self):
+        space = make_space()
+        points = list(space)
+        assert [space[i] for i in range(len(space))] == points
+        assert space[-1] == points[-1]
+
+    def testGetItemOutOfRange(self):
+        space = make_space()
+
+        with pytest.raises(IndexError):
+            space[len(space)]
+
+        with pytest.raises(IndexError):
+            space[-len(space) - 1]
+
+    def testGetItemWrongType(self):
+        with pytest.raises(TypeError):
+            make_space()['p1']
+
+    def testSlice(self):
+        space = make_space()
+        points = list(space)
+
+        for s in [slice(3, 20), slice(None, None, 3), slice(25, 2, -2),
+                  slice(-5, None)]:
+            assert list(space[s]) == points[s]
+            assert len(space[s]) == len(points[s])
+
+    def testSliceOfSlice(self):
+        space = make_space()
+        points = list(space)
+        assert list(space[2:20:2][1::3]) == points[2:20:2][1::3]
+        assert space[2:20:2][::-1][1] == points[2:20:2][::-1][1]
+
+    def testLabelledValues(self):
+        series = pd.Series([5, 6, 7], index=[10, 11, 12])
+        assert list(ParameterSpace("p", series)) == [{'p': 5}, {'p': 6},
+                                                      {'p': 7}]
+        assert ParameterSpace("p", series)[0] == {'p': 5}
+        assert ParameterSpace("p", {'x': 1, 'y': 2})[1] == {'p': 'y'}
+
+    def testPoints(self):
+        points = [(('p1', 0), ('p2', 'a')), (('p1', 1), ('p2', 'b'))]
+        space = ParameterSpace({'p1', 'p2'}, iter(points))
+        assert list(space) == [{'p1': 0, 'p2': 'a'}, {'p1': 1, 'p2': 'b'}]
+        assert space[1] == {'p1': 1, 'p2': 'b'}
+        assert len(space * ParameterSpace("p3", range(2))) == 4
+        assert list(space.to_frame().columns) == ['p1', 'p2']
+
+        with pytest.raises(RuntimeError):
+            space * ParameterSpace("p1", range(2))
+
+    def testShard(self):
+        space = make_space()
+        shards = [space.shard(i, 4) for i in range(4)]
+        assert sum(len(s) for s in shards) == len(space)
+        assert list(shards[1]) == list(space)[1::4]
+
+        with pytest.raises(IndexError):
+            space.shard(4, 4)
+
+# Tests for the columnar materialization of ParameterSpace.
+class TestFrames:
+    def assertFrameMatchesPoints(self, frame, points):
+        expected = pd.DataFrame(points)
+        assert len(frame) == len(expected)
+        assert set(frame.columns) == set(expected.columns)
+        
+        for col in expected.columns:
+            exp, act = expected[col], frame[col]
+            assert (exp.isnull() == act.isnull()).all()
+            assert list(exp[exp.notnull()]) == list(act[act.notnull()])
+
+    def testToFrame(self):
+        space = make_space()
+        self.assertFrameMatchesPoints(space.to_frame(), list(space))
+
+    def testToFrameSlice(self):
+        space = make_space()
+        self.assertFrameMatchesPoints(space.to_frame(3, 25, 2),
+                                      list(space)[3:25:2])
+
+    def testToFrameColumnOrder(self):
+        p1 = ParameterSpace("b", range(2))
+        p2 = ParameterSpace("a", range(2))
+        assert list((p1 * p2).to_frame().columns) == ['b', 'a']
+
+    def testIterFrames(self):
+        space = make_space()
+        frames = list(space.iter_frames(chunksize=7))
+        assert [len(f) for f in frames] == [7, 7, 7, 5]
+        self.assertFrameMatchesPoints(pd.concat(frames, ignore_index=True),
+                                      list(space))
+
+    def testSampleFrame(self):
+        sample = make_space().sample(10, seed=3)
+        self.assertFrameMatchesPoints(sample.to_frame(), list(sample))
+
+    def testTupleValues(self):
+        space = ParameterSpace("layers", [(8, 8), (16, 16)])
+        assert list(space.to_frame()['layers']) == [(8, 8), (16, 16)]
+
+    def testToRecords(self):
+        space = ParameterSpace("a", range(3)) * ParameterSpace("b", [.5, 1.])
+        records = space.to_records()
+        assert records.dtype.names == ('a', 'b')
+        assert list(records['a']) == [0, 0, 1, 1, 2, 2]
+
+    def testConfCollectionFrames(self):
+        col = ConfCollection({'base': 1, 'a': 5}, make_space())
+        frames = list(col.iter_frames(chunksize=10))
+        assert all(list(f.columns[:2]) == ['base', 'a'] for f in frames)
+        
+        frame = pd.concat(frames, ignore_index=True)
+        assert (frame['base'] == 1).all()
+        assert list(frame['p1'].dropna()) == [c['p1'] for c in col
+                                              if 'p1' in c]
+
+# Tests for ConfCollection.
+class TestConfCollection:
+    def testIter(self):
+        base = Configuration({'base': 1}, unlogged_params={'u': 2})
+        confs = list(ConfCollection(base, make_space()))
+        assert len(confs) == len(make_space())
+        assert confs[0] == {'base': 1, 'p1': 0, 'p2': 2, 'p3': 'a'}
+
+    def testGetItem(self):
+        col = ConfCollection({'base': 1}, make_space())
+        assert len(col) == len(make_space())
+        assert col[-1] == {'base': 1, 'p4': 8}
+        assert list(col[1::5]) == list(col)[1::5]
+
+# Tests for ParameterSpace.sample.
+class TestSample:
+    def make_grid(self):
+        return ParameterSpace("a", range(1000)) * \
+               ParameterSpace("b", range(1000)) * \
+               ParameterSpace("c", range(1000))
+
+    def testUniform(self):
+        space = self.make_grid()
+        sample = space.sample(50, seed=5)
+        points = list(sample)
+        
+        assert len(sample) == 50
+        assert len(set(tuple(p.values()) for p in points)) == 50
+        assert points == list(space.sample(50, seed=5))
+        assert points != list(space.sample(50, seed=6))
+
+    def testUniformWhole(self):
+        space = make_space()
+        points = list(space.sample(len(space), seed=1))
+        assert sorted(points, key=str) == sorted(space, key=str)
+
+    def testStratified(self):
+        space = ParameterSpace("a", range(100))
+        points = list(space.sample(10, method='stratified', seed=1))
+        assert [p['a'] // 10 for p in points] == list(range(10))
+
+    def testLatinHypercube(self):
+        space = ParameterSpace("a", range(10)) * ParameterSpace("b", range(20))
+        points = list(space.sample(10, method='lhs', seed=1))
+        assert sorted(p['a'] for p in points) == list(range(10))
+        assert sorted(p['b'] // 2 for p in points) == list(range(10))
+
+    def testHalton(self):
+        space = self.make_grid()
+        points = list(space.sample(20, method='halton', seed=3))
+        assert len(points) == 20
+        assert points == list(space.sample(20, method='halton', seed=3))
+
+    def testSobol(self):
+        pytest.importorskip("scipy.stats.qmc")
+        space = self.make_grid()
+        points = list(space.sample(16, method='sobol', seed=3))
+        assert len(points) == 16
+        assert points == list(space.sample(16, method='sobol', seed=3))
+
+    def testTooLarge(self):
+        with pytest.raises(ValueError):
+            make_space().sample(len(make_space()) + 1)
+
+    def testUnknownMethod(self):
+        with pytest.raises(ValueError):
+            make_space().sample(2, method='unknown')
+
+    def testSliceOfSample(self):
+        sample = self.make_grid().sample(20, seed=2)
+        assert list(sample[5:10]) == list(sample)[5:10]
+
+    def testConfCollection(self):
+        col = ConfCollection({'base': 1}, self.make_grid())
+        confs = list(col.sample(5, seed=1))
+        assert len(confs) == 5
+        assert all(c['base'] == 1 for c in confs)
+
+# Tests for ConfPoint.
+class TestConfPoint:
+    def make_point(self):
+        base = Configuration({'a': 1, 'b': 2}, unlogged_params={'u': 3})
+        return ConfPoint(base, {'b': 5, 'c': 6}), base
+
+    def testMapping(self):
+        point, base = self.make_point()
+        assert point == {'a': 1, 'b': 5, 'c': 6}
+        assert list(point) == ['a', 'b', 'c']
+        assert len(point) == 3
+        assert point.unlogged_params == {'u': 3}
+
+    def testWrite(self):
+        point, base = self.make_point()
+        point['a'] = 7
+        del point['c']
+        del point['b']
+        
+        assert point == {'a': 7}
+        assert base == {'a': 1, 'b': 2}
+        
+        with pytest.raises(KeyError):
+            del point['b']
+
+    def testUnloggedWrite(self):
+        point, base = self.make_point()
+        point.unlogged_params['v'] = 4
+        assert point.unlogged_params == {'u': 3, 'v': 4}
+        assert base.unlogged_params == {'u': 3}
+
+    def testPickle(self):
+        point, base = self.make_point()
+        del point['a']
+        point2 = pickle.loads(pickle.dumps(point))
+        assert point2 == point
+        assert point2.unlogged_params == {'u': 3}
+        
+        points = pickle.loads(pickle.dumps([point, ConfPoint(base, {'c': 7})]))
+        assert points[0].base is points[1].base
+
+    def testToConfiguration(self):
+        point, base = self.make_point()
+        conf = point.to_configuration()
+        assert isinstance(conf, Configuration)
+        assert conf == point
+        assert conf.unlogged_params == {'u': 3}
+
+    def testSharedBase(self):
+        base = Configuration({'base': 1})
+        points = list(ConfCollection(base, make_space(), compact=True))
+        assert all(isinstance(p, ConfPoint) for p in points)
+        assert all(p.base is base for p in points)
+        
+        confs = list(ConfCollection(base, make_space()))
+        assert all(isinstance(c, Configuration) for c in confs)
+        assert confs == points
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import multiprocessing
+import pytest
+import pandas as pd
+from pyexplog.log import ExpLog
+from pyexplog.query import In, Range
+from pyexplog.confindex import SQLiteConfIndex
+from routines import make_results
+
+def make_confs(explog, *confs):
+    data = pd.DataFrame(list(confs))
+    data[explog.hash_key] = explog.conf_hashes(data)
+    return data
+
+# Tests for SQLiteConfIndex.
+class TestSQLiteConfIndex:
+    def testClaim(self, tmpdir):
+        explog = ExpLog()
+        index = SQLiteConfIndex(str(tmpdir.join("confs.sqlite")))
+        data = make_confs(explog, {'a': 1, 'b': "x"}, {'a': 2, 'b': "y"},
+                          {'a': 1, 'b': "x"})
+
+        assert index.claim("Exp", data) == ([0, 1, 0], [0, 1])
+        assert index.claim("/Exp/", data[1:]) == ([1, 0], [])
+        assert index.append("Exp", data[:1]) == [2]
+        assert index.num_rows("Exp") == 3
+        assert index.keys() == ["/Exp"]
+        assert index.coldtypes("Exp")['a'] == 'int64'
+        assert index.coldtypes("Exp")['b'] == object
+        assert index.select("Exp")['b'].tolist() == ["x", "y", "x"]
+
+        with pytest.raises(ValueError):
+            index.claim("Exp", make_confs(explog, {'a': 1}))
+
+    def testSelect(self, tmpdir):
+        explog = ExpLog()
+        index = SQLiteConfIndex(str(tmpdir.join("confs.sqlite")))
+        index.append("Exp", make_confs(explog, {'a': 1, 'b': 0.5},
+                                       {'a': 2, 'b': 1.5}, {'a': 3, 'b': 2.5}))
+        h = explog.conf_hash({'a': 2, 'b': 1.5})
+
+        sel = index.select("Exp", '_hash_ = {} and (a = 2)'.format(h))
+        assert list(sel.index) == [1]
+        assert list(sel['b']) == [1.5]
+        assert list(index.select("Exp", 'a >= 2', start=2).index) == [2]
+        assert list(index.select("Exp", columns=['a'], stop=2)['a']) == [1, 2]
+        assert list(index.select_as_coordinates("Exp", 'b > 1')) == [1, 2]
+
+        index.remove("Exp", 'a = 2')
+        assert list(index.select("Exp").index) == [0, 2]
+
+        with pytest.raises(KeyError):
+            index.select("Other")
+
+    def testResultKeys(self, tmpdir):
+        index = SQLiteConfIndex(str(tmpdir.join("confs.sqlite")))
+        index.add_result_keys("Exp", 0, ["b", "a"])
+        index.add_result_keys("Exp", 1, ["a"])
+
+        assert index.result_keys("Exp", 0) == ["a", "b"]
+        assert index.result_keys("Exp") == {0: ["a", "b"], 1: ["a"]}
+        index.remove_result_keys("Exp", 0, ["a"])
+        assert index.result_keys("Exp", 0) == ["b"]
+
+# Tests for ExpLog with its conf tables in a conf index.
+class TestIndexedLog:
+    def make_explog(self, tmpdir):
+        explog = ExpLog('indexed.h5', in_memory=True,
+                        conf_index=str(tmpdir.join("confs.sqlite")))
+        explog.add_results("Exp", {'p1': 11, 'p2': "a"}, make_results())
+        explog.add_results("Exp", {'p1': 22, 'p2': "b"}, make_results(2))
+        return explog
+
+    def testConfs(self, tmpdir):
+        explog = self.make_explog(tmpdir)
+
+        assert explog.conf_index.num_rows("Exp") == 2
+        assert not "table" in explog.get_keys("Exp")
+        assert explog.log_folders() == ["/Exp"]
+        assert explog.conf2idx("Exp", {'p1': 22.0, 'p2': "b"}) == [1]
+        assert explog.conf2idx("Exp", {'p1': In(11, 22)}) == [0, 1]
+        assert explog.conf2idx("Exp", {'p1': Range(20)}) == [1]
+        assert explog.conf2idx("Exp", {'p1': 33, 'p2': "c"},
+                               addNonExistent=True) == [2]
+        assert explog.exists("Exp", {'p2': "c"})
+
+        res = explog.select_results("Exp", {'p1': 22})[0]
+        assert (res['in_metrics'] == make_results(2)['in_metrics']).all().all()
+
+    def testResultCatalog(self, tmpdir):
+        explog = self.make_explog(tmpdir)
+        assert explog.conf_index.result_keys("Exp", 1) == ['in_metrics',
+                                                          'out_metrics']
+
+        explog.remove_results("Exp", 1, "in_metrics")
+        assert explog.conf_index.result_keys("Exp", 1) == ['out_metrics']
+        explog.remove_results("Exp", 0)
+        assert explog.conf_index.result_keys("Exp") == {1: ['out_metrics']}
+
+        # result_keys answers from the catalog
+        assert explog.result_keys("Exp", 1) == {'out_metrics': None}.keys()
+        assert explog.result_keys("Exp", {'p1': 11}) == [{}.keys()]
+        explog.remove("Exp/conf_1/out_metrics")
+        assert explog.result_keys("Exp", 1) == {}.keys()
+        assert explog.result_keys("Exp", 5) is None
+        explog.close()
+
+    def testLookupOnly(self, tmpdir, monkeypatch):
+        explog = self.make_explog(tmpdir)
+
+        def ensure_folder(path):
+            raise AssertionError("The backend has been written to.")
+
+        # looking up existing confs does not touch the backend
+        monkeypatch.setattr(explog, "_ensure_folder", ensure_folder)
+        assert explog.conf2idx("Exp", {'p1': 11, 'p2': "a"},
+                               addNonExistent=True) == [0]
+        explog.add_results("Exp", {'p1': 22, 'p2': "b"}, make_results())
+        assert explog.num_rows("Exp/conf_1/in_metrics") == 4
+        explog.close()
+
+    def testRemove(self, tmpdir):
+        explog = self.make_explog(tmpdir)
+        explog.remove("Exp", {'p1': 11})
+        assert explog.conf2idx("Exp", None) == [1]
+
+        explog.remove("Exp")
+        assert not explog.exists("Exp")
+        assert explog.log_folders() == []
+
+def claim_confs(args):
+    index_path, worker = args
+    explog = ExpLog('worker{}.h5'.format(worker), in_memory=True,
+                    conf_index=index_path)
+    return [explog.conf2idx("Exp", {'p': p}, addNonExistent=True,
+                            addMissingFolder=True)[0]
+            for p in range(worker % 2, 40, 1 + worker % 3)]
+
+# Tests for concurrent access to a conf index.
+class TestConcurrentClaims:
+    def testProcesses(self, tmpdir):
+        index_path = str(tmpdir.join("confs.sqlite"))
+        with multiprocessing.Pool(4) as pool:
+            claimed = pool.map(claim_confs, [(index_path, w)
+                                             for w in range(8)])
+
+        confs = SQLiteConfIndex(index_path).select("Exp")
+        assert sorted(confs['p']) == list(range(40))
+        assert sorted(confs.index) == list(range(40))
+
+        # every process got the same index for the same conf
+        index = dict(zip(confs['p'], confs.index))
+        for w, idx in enumerate(claimed):
+            ps = range(w % 2, 40, 1 + w % 3)
+            assert idx == [index[p] for p in ps]
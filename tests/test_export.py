@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import pytest
+import pandas as pd
+from pyexplog.log import ExpLog
+from pyexplog.export import export_parquet
+pq = pytest.importorskip("pyarrow.parquet")
+
+def make_log(log_file):
+    explog = ExpLog(log_file)
+    for lr in [0.1, 0.01]:
+        explog.add_results("Exp", {'lr': lr, 'name': "a"}, {
+            'metrics': pd.DataFrame({'loss': [1.0, 2.0, 3.0]}) * lr,
+            'info': {'time': 5}
+        })
+    return explog
+
+def read(path):
+    return pq.read_table(path).to_pandas()
+
+# Tests for export_parquet.
+class TestExportParquet:
+    def testLayout(self, tmpdir):
+        explog = make_log(str(tmpdir.join("log.h5")))
+        root = str(tmpdir.join("out"))
+        written = explog.export_parquet(root, chunksize=2)
+
+        assert written["/Exp"] == 2
+        assert written["/Exp/conf_0/metrics"] == 3
+        assert len(os.listdir(os.path.join(root, "Exp", "metrics",
+                                           "iconf=0"))) == 2
+
+        confs = read(os.path.join(root, "Exp", "_confs"))
+        assert list(confs['lr']) == [0.1, 0.01]
+        assert list(confs['iconf']) == [0, 1]
+
+        metrics = read(os.path.join(root, "Exp", "metrics"))
+        metrics = metrics.sort_values(['lr', 'loss'])
+        assert list(metrics['loss']) == [k * lr for lr in [0.01, 0.1]
+                                         for k in [1.0, 2.0, 3.0]]
+        assert list(metrics['name']) == ["a"] * 6
+        assert sorted(metrics['iconf'].astype(int).unique()) == [0, 1]
+        explog.close()
+
+    def testIncremental(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        root = str(tmpdir.join("out"))
+        explog = make_log(log_file)
+        explog.close()
+        export_parquet(log_file, root, keys="metrics")
+
+        explog = ExpLog(log_file)
+        explog.add_results("Exp", 1, {'metrics': pd.DataFrame({'loss': [0.9]})})
+        explog.add_results("Exp", {'lr': 1.0, 'name': "b"},
+                           {'metrics': pd.DataFrame({'loss': [0.7, 0.8]})})
+        written = explog.export_parquet(root, keys="metrics")
+
+        assert written == {"/Exp": 1, "/Exp/conf_1/metrics": 1,
+                           "/Exp/conf_2/metrics": 2}
+        assert not os.path.exists(os.path.join(root, "Exp", "info"))
+        assert explog.export_parquet(root) == {"/Exp/conf_0/info": 1,
+                                               "/Exp/conf_1/info": 1}
+
+        metrics = read(os.path.join(root, "Exp", "metrics"))
+        assert len(metrics) == 9
+        assert sorted(metrics[metrics['lr'] == 1.0]['loss']) == [0.7, 0.8]
+        explog.close()
+
+    def testReplaced(self, tmpdir):
+        explog = make_log(str(tmpdir.join("log.h5")))
+        root = str(tmpdir.join("out"))
+        explog.export_parquet(root, logFolders="Exp")
+
+        explog.add_results("Exp", 0, {'metrics': pd.DataFrame({'loss': [0.4]})},
+                           mode='replace')
+        assert explog.export_parquet(root) == {"/Exp/conf_0/metrics": 1}
+
+        metrics = read(os.path.join(root, "Exp", "metrics", "iconf=0"))
+        assert list(metrics['loss']) == [0.4]
+
+        # replaced by as many rows (and then some)
+        explog.add_results("Exp", 1, {'metrics': pd.DataFrame(
+                           {'loss': [4.0, 5.0, 6.0, 7.0]})}, mode='replace')
+        assert explog.export_parquet(root) == {"/Exp/conf_1/metrics": 4}
+
+        metrics = read(os.path.join(root, "Exp", "metrics", "iconf=1"))
+        assert list(metrics['loss']) == [4.0, 5.0, 6.0, 7.0]
+        explog.close()
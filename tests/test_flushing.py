@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import gc
+import threading
+import time
+import pytest
+import pandas as pd
+from pyexplog.log import ExpLog
+from pyexplog.flushing import FlushPolicy
+
+def metrics(*values):
+    return {'metrics': pd.DataFrame({'loss': list(values)})}
+
+def count_flushes(explog):
+    """
+    Records the fsync argument of every flush of the backend of explog.
+    """
+    flushes = []
+    flush = explog.backend.flush
+
+    def counted(fsync=False):
+        flushes.append(fsync)
+        flush(fsync=fsync)
+
+    explog.backend.flush = counted
+    return flushes
+
+def make_log(tmpdir, policy):
+    return ExpLog(str(tmpdir.join("log.h5")), flush_policy=policy)
+
+# Tests for the flush policies of ExpLog.
+class TestFlushPolicy:
+    def testCreate(self):
+        assert FlushPolicy.create('always').every_writes == 1
+        assert not FlushPolicy.create('never').on_commit
+        assert FlushPolicy.create(None).on_commit
+
+        policy = FlushPolicy(every_seconds=2)
+        assert FlushPolicy.create(policy) is policy
+
+        with pytest.raises(ValueError):
+            FlushPolicy.create('sometimes')
+        with pytest.raises(ValueError):
+            FlushPolicy(every_writes=0)
+
+    def testCommit(self, tmpdir):
+        explog = make_log(tmpdir, 'commit')
+        flushes = count_flushes(explog)
+
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+        assert flushes == []
+
+        with explog.batch():
+            for p in range(5):
+                explog.add_results("Exp", {'p': p}, metrics(1.0))
+        assert flushes == [False]
+        explog.close()
+
+    def testNever(self, tmpdir):
+        explog = make_log(tmpdir, 'never')
+        flushes = count_flushes(explog)
+
+        with explog.batch():
+            explog.add_results("Exp", {'p': 1}, metrics(1.0))
+        explog.remove_results("Exp", {'p': 1})
+
+        assert flushes == []
+        explog.close()
+
+    def testEveryWrites(self, tmpdir):
+        explog = make_log(tmpdir, FlushPolicy(every_writes=3, fsync=True))
+        flushes = count_flushes(explog)
+
+        # the conf and its results are two writes
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+        assert flushes == []
+        explog.add_results("Exp", {'p': 1}, metrics(2.0))
+        assert flushes == [True]
+
+        explog.remove("Exp", {'p': 1})
+        explog.flush(fsync=False)
+        assert flushes == [True, False]
+        assert explog._flusher.writes == 0
+        explog.close()
+
+    def testEverySeconds(self, tmpdir):
+        explog = make_log(tmpdir, FlushPolicy(every_seconds=0.1,
+                                              on_commit=False))
+        flushes = count_flushes(explog)
+
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+        assert flushes == []
+
+        # the background thread flushes the writes that are left behind
+        deadline = time.monotonic() + 5
+        while not flushes and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert len(flushes) == 1
+        assert explog._flusher.writes == 0
+        explog.close()
+
+    def testThreadStops(self, tmpdir):
+        explog = make_log(tmpdir, FlushPolicy(every_seconds=0.05))
+        explog.add_results("Exp", {'p': 1}, metrics(1.0))
+        thread_count = lambda: sum(t.name == "pyexplog-flusher"
+                                   for t in threading.enumerate())
+        assert thread_count() >= 1
+
+        del explog
+        gc.collect()
+
+        deadline = time.monotonic() + 5
+        while thread_count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert thread_count() == 0
+
+        # the log is closed and its writes are in the file
+        explog = ExpLog(str(tmpdir.join("log.h5")), mode='r')
+        assert explog.conf2idx("Exp", {'p': 1}) == [0]
+        explog.close()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pandas as pd
+from pyexplog.log import ExpLog
+from pyexplog.follow import LogFollower
+from routines import make_results
+
+def write(log_file, conf, coef=1):
+    explog = ExpLog(log_file)
+    explog.add_results("EvoExperiment", conf, make_results(coef))
+    explog.close()
+
+# Tests for LogFollower.
+class TestLogFollower:
+    def testPoll(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        write(log_file, {'param1': 11, 'param2': 22})
+        follower = LogFollower(log_file)
+
+        updates = {u.path: u for u in follower.poll()}
+        assert set(updates) == {"/EvoExperiment",
+                                "/EvoExperiment/conf_0/in_metrics",
+                                "/EvoExperiment/conf_0/out_metrics"}
+        update = updates["/EvoExperiment/conf_0/in_metrics"]
+        assert (update.logFolder, update.iconf, update.key) == \
+               ("/EvoExperiment", 0, "in_metrics")
+        assert len(update.data) == 2
+        assert list(updates["/EvoExperiment"].data.columns) == \
+               ['param1', 'param2']
+
+        # nothing new, the file is not even opened
+        assert not follower.changed()
+        assert list(follower.poll()) == []
+
+        write(log_file, {'param1': 11, 'param2': 22}, coef=2)
+        updates = {u.path: u for u in follower.poll()}
+        assert set(updates) == {"/EvoExperiment/conf_0/in_metrics",
+                                "/EvoExperiment/conf_0/out_metrics"}
+        data = updates["/EvoExperiment/conf_0/in_metrics"].data
+        assert list(data.index) == [2, 3]
+        assert (data.values == 2 * make_results()['in_metrics'].values).all()
+
+    def testFromEnd(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        write(log_file, {'param1': 11, 'param2': 22})
+        follower = LogFollower(log_file, logFolders=["EvoExperiment"],
+                               from_start=False, chunksize=1)
+
+        write(log_file, {'param1': 22, 'param2': 33})
+        updates = list(follower.poll())
+        assert [u.path for u in updates] == ["/EvoExperiment"] + \
+               ["/EvoExperiment/conf_1/in_metrics"] * 2 + \
+               ["/EvoExperiment/conf_1/out_metrics"] * 2
+        assert all(len(u.data) == 1 for u in updates)
+
+    def testLogFolders(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        write(log_file, {'param1': 11, 'param2': 22})
+        follower = LogFollower(log_file, logFolders=["Other"])
+        assert list(follower.poll()) == []
+
+    def testRun(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        write(log_file, {'param1': 11, 'param2': 22})
+        updates = []
+        LogFollower(log_file).run(updates.append, interval=0.01, timeout=0.05)
+        assert len(updates) == 3
@@ -2,8 +2,12 @@
 # -*- coding: utf-8 -*-
 import pytest
 from pyexplog.log import ExpLog, NoSuchNodeError
-from routines import make_results, class_explog, \
-                     function_explog, assertSelMatchesResults
+from pyexplog.query import In, Range, Not
+from pyexplog.aggregate import Aggregator
+from pyexplog.configuration import ParameterSpace, ConfCollection, \
+                                   ConfPoint
+from routines import make_results, make_explog, class_explog, \
+                     function_explog, assertSelMatchesResults, append_results
 import pandas as pd
 import numpy as np
 
@@ -80,18 +84,26 @@ class TestConf2Where:
         
     def testMultipleDicts(self):
         conf = [{'param1': 11, 'param2': 15}, {'param1': 22, 'param2': 35}]
-        whereconf = (" and ".join(('{} = "{}"'.format(k, v)
+        whereconf = (" and ".join(('{} = {}'.format(k, v)
                         for k,v in c.items())) for c in conf)
         whereconf = " or ".join(("(" + c + ")" for c in whereconf))
         assert ExpLog.conf2where(conf) == whereconf
         
     def testIntDictList(self):
         conf = [{'param1': 11, 'param2': 15}, 5]
-        dictconf = " and ".join('{} = "{}"'.format(k, v)
+        dictconf = " and ".join('{} = {}'.format(k, v)
                                     for k, v in conf[0].items())
         whereconf = "(" + dictconf + ")" + ' or (index = {})'.format(conf[1])
         assert ExpLog.conf2where(conf) == whereconf
 
+    def testTypedValues(self):
+        assert ExpLog.conf2where({'lr': 0.1}) == 'lr = 0.1'
+        assert ExpLog.conf2where({'lr': np.float32(0.1)}) == \
+               'lr = {!r}'.format(float(np.float32(0.1)))
+        assert ExpLog.conf2where({'flag': np.bool_(True)}) == 'flag = True'
+        assert ExpLog.conf2where({'n': np.int64(-3)}) == 'n = -3'
+        assert ExpLog.conf2where({'s': 'a"b'}) == 's = "a\\"b"'
+
     def testUnknown(self):
         class UnknownType:
             pass
@@ -119,6 +131,14 @@ class TestConf2Idx:
 
     def testStrWhere(self, class_explog):
         assert class_explog.conf2idx("EvoExperiment", "param1 = 11") == [0]
+
+    def testConfPoint(self, function_explog):
+        point = ConfPoint({'param1': 11}, {'param2': 22})
+        assert function_explog.conf2idx("EvoExperiment", point) == [0]
+        
+        point = ConfPoint({'param1': 11}, {'param2': 44})
+        function_explog.add_results("EvoExperiment", point, make_results())
+        assert function_explog.conf2idx("EvoExperiment", point) == [2]
     
     def testNonExistentConf(self, class_explog):
         idx = class_explog.conf2idx("EvoExperiment",
@@ -491,6 +511,26 @@ class TestAddData:
         sel = function_explog.select(path)
         assert sel.iloc[-1].to_dict() == {'cc1': 55, 'cc2': 66}
         
+    def testAppendToFloatTables(self, tmpdir):
+        # the tables written before the dtypes were kept store floats only
+        log_file = str(tmpdir.join("legacy.h5"))
+        with pd.HDFStore(log_file) as store:
+            for path, data in [("/Exp", {'lr': [0.1], 'n': [3.0]}),
+                    ("/Exp/conf_0/m", {'epoch': [1.0, 2.0], 'loss': [.3, .2]})]:
+                store.put(path, pd.DataFrame(data, columns=list(data)),
+                          format='table', data_columns=True)
+        
+        explog = ExpLog(log_file)
+        res = {'m': pd.DataFrame({'epoch': [3], 'loss': [.1]},
+                                 columns=['epoch', 'loss'])}
+        explog.add_results("Exp", {'lr': 0.1, 'n': 3}, res)
+        explog.add_results("Exp", {'lr': 0.2, 'n': 4}, res)
+        
+        assert list(explog.select("/Exp/conf_0/m")['epoch']) == [1., 2., 3.]
+        assert list(explog.select("/Exp")['n']) == [3., 4.]
+        assert list(explog.select("/Exp/conf_1/m")['epoch']) == [3]
+        explog.close()
+        
     def testUnknownMode(self, function_explog):
         path = self.make_path(function_explog)
         pre_data = function_explog.select(path)
@@ -980,3 +1020,458 @@ class TestAddResults:
         function_explog.add_results("EvoExperiment", conf, res2, mode='replace')
         
         assertSelMatchesResults(function_explog, "EvoExperiment", conf, res2)
+
+# Tests for ExpLog.add_confs.
+class TestAddConfs:
+    def testAddFrames(self, function_explog):
+        space = ParameterSpace("param1", range(100, 110)) * \
+                ParameterSpace("param2", [1, 2])
+        idx = function_explog.add_confs("EvoExperiment",
+                                        space.iter_frames(chunksize=8))
+        
+        assert idx == list(range(2, 22))
+        assert function_explog.conf2idx("EvoExperiment",
+                                        {'param1': 109, 'param2': 2}) == [21]
+
+    def testAddRecords(self, function_explog):
+        space = ParameterSpace("name", ["a", "b"]) * \
+                ParameterSpace("lr", [0.1, 0.2])
+        idx = function_explog.add_confs("NewExperiment", space.to_records())
+        
+        assert idx == [0, 1, 2, 3]
+        sel = function_explog.select("NewExperiment")
+        assert list(sel['name']) == ["a", "a", "b", "b"]
+        assert list(sel['lr']) == [0.1, 0.2, 0.1, 0.2]
+
+# Tests for the hash column of the conf tables.
+class TestConfHash:
+    def testStable(self):
+        h = ExpLog.conf_hash({'a': 1, 'b': "x"})
+        assert h == ExpLog.conf_hash({'b': "x", 'a': 1.0})
+        assert h == ExpLog.conf_hash({'b': "x", 'a': np.int64(1), 'c': None})
+        assert h != ExpLog.conf_hash({'a': "1", 'b': "x"})
+        assert h != ExpLog.conf_hash({'a': 1, 'b': "y"})
+        assert 0 <= h < 2**53
+
+    def testKinds(self):
+        assert ExpLog.conf_hash({'a': "1"}, {'a': 'n'}) == \
+               ExpLog.conf_hash({'a': 1})
+
+    def testIndexed(self, function_explog):
+        function_explog.conf2idx("EvoExperiment", {'param1': 1, 'param2': 2},
+                                 addNonExistent=True)
+        table = function_explog.hdfstore.get_node("EvoExperiment").table
+
+        assert table.colindexed[function_explog.hash_key]
+        index = table.colindexes[function_explog.hash_key]
+        assert index.kind == 'full' and index.optlevel == 9
+        assert len(table.read_where("{} == {}".format(
+            function_explog.hash_key,
+            ExpLog.conf_hash({'param1': 1, 'param2': 2})))) == 1
+
+    def testHidden(self, function_explog):
+        sel = function_explog.select("EvoExperiment")
+        assert sorted(sel.columns) == ['param1', 'param2']
+
+        sel = function_explog.select("EvoExperiment",
+                                     columns=[function_explog.hash_key])
+        assert list(sel[function_explog.hash_key]) == [
+            ExpLog.conf_hash({'param1': 11, 'param2': 22}),
+            ExpLog.conf_hash({'param1': 22, 'param2': 33})
+        ]
+
+    def testLookup(self, function_explog):
+        function_explog.add_data("EvoExperiment", {'param1': 5, 'param2': 6})
+
+        assert function_explog.conf2idx("EvoExperiment",
+                                        {'param1': 5, 'param2': 6}) == [2]
+        assert function_explog.conf2idx("EvoExperiment",
+                                        {'param1': 5.0, 'param2': "6"}) == [2]
+        assert function_explog.exists("EvoExperiment",
+                                      {'param2': 33, 'param1': 22})
+        assert not function_explog.exists("EvoExperiment",
+                                          {'param1': 22, 'param2': 22})
+
+    def testWithoutHash(self, function_explog):
+        # tables logged without the hash column still work
+        function_explog.add_data("OldExperiment", {'param1': 1, 'param2': 2})
+        assert function_explog.conf2idx("OldExperiment",
+            {'param1': 3, 'param2': 4}, addNonExistent=True) == [1]
+        assert function_explog.conf2idx("OldExperiment",
+                                        {'param1': 3, 'param2': 4}) == [1]
+        assert not function_explog.hash_key in \
+               function_explog.hdfstore.select("OldExperiment").columns
+
+# Tests for the automatic indexes of the conf tables.
+class TestIndexes:
+    counter = 0
+
+    def make_explog(self, **kwargs):
+        TestIndexes.counter += 1
+        return ExpLog('indexes{}.h5'.format(TestIndexes.counter),
+                      in_memory=True, **kwargs)
+
+    def make_confs(self, start, stop):
+        return pd.DataFrame({'param1': np.arange(start, stop),
+                             'param2': np.arange(start, stop) % 7})
+
+    def testThreshold(self):
+        explog = self.make_explog(index_threshold=20, index_optlevel=7,
+                                  index_kind='full')
+        explog.add_confs("Exp", self.make_confs(0, 10))
+        table = explog.hdfstore.get_node("Exp").table
+
+        assert not table.colindexed['param1']
+        assert table.colindexed[explog.hash_key]
+        assert not explog.update_indexes("Exp")
+
+        explog.add_confs("Exp", self.make_confs(10, 25))
+        for col in ['param1', 'param2']:
+            assert table.colindexes[col].kind == 'full'
+            assert table.colindexes[col].optlevel == 7
+        assert explog.update_indexes("Exp")
+
+    def testIncremental(self):
+        explog = self.make_explog(index_threshold=5)
+        explog.add_confs("Exp", self.make_confs(0, 10))
+        explog.add_confs("Exp", self.make_confs(10, 30))
+        explog.conf2idx("Exp", {'param1': 30, 'param2': 2},
+                        addNonExistent=True)
+        table = explog.hdfstore.get_node("Exp").table
+
+        assert table.colindexes['param1'].nelements == 31
+        assert explog.conf2idx("Exp", {'param2': 2}) == \
+               [i for i in range(31) if i % 7 == 2]
+        assert explog.conf2idx("Exp", {'param1': 30, 'param2': 2}) == [30]
+
+    def testForce(self):
+        explog = self.make_explog()
+        explog.add_confs("Exp", self.make_confs(0, 10))
+        assert explog.update_indexes("Exp", force=True)
+        assert explog.hdfstore.get_node("Exp").table.colindexed['param2']
+
+    def testResultTables(self, function_explog):
+        # tables other than the conf tables are indexed by pandas as before
+        assert not function_explog.update_indexes(
+            "EvoExperiment/conf_0/in_metrics")
+        table = function_explog.hdfstore.get_node(
+            "EvoExperiment/conf_0/in_metrics").table
+        assert table.colindexed['cc1']
+
+# Tests for conf specifications with conditions.
+class TestConditions:
+    @pytest.fixture(scope='class')
+    def explog(self):
+        explog = ExpLog('conditions.h5', in_memory=True)
+        explog.add_confs("Exp", pd.DataFrame({
+            'lr': np.tile([0.1, 0.01, 0.001], 100),
+            'batch': np.arange(300),
+            'name': np.repeat(['a', 'b', 'c'], 100)
+        }))
+        return explog
+
+    def testSelect(self, explog):
+        sel = explog.select("Exp", {'lr': In(0.1, 0.01),
+                                    'batch': Range(10, 100)})
+        assert len(sel) == 60
+        assert set(sel['lr']) == {0.1, 0.01}
+        assert sel['batch'].min() == 10 and sel['batch'].max() == 99
+
+    def testNegation(self, explog):
+        assert explog.conf2idx("Exp", {'name': Not(In('a', 'c'))}) == \
+               list(range(100, 200))
+        assert len(explog.select("Exp", {'batch': Not(Range(10, 290))})) == 20
+
+    def testRangeValue(self, explog):
+        assert explog.conf2idx("Exp", {'batch': range(5, 15)}) == \
+               list(range(5, 15))
+        assert explog.conf2idx("Exp", {'batch': range(5, 15, 5)}) == [5, 10]
+
+    def testCoordinates(self, explog):
+        # too many terms for a where clause: evaluated on the column
+        cond = In(range(0, 300, 2))
+        assert cond.num_terms() > explog.max_terms
+
+        assert len(explog.select("Exp", {'batch': cond})) == 150
+        assert explog.conf2idx("Exp", {'batch': cond, 'name': Not('b')}) == \
+               [i for i in range(0, 300, 2) if not 100 <= i < 200]
+        assert list(explog.select("Exp", {'batch': cond}, start=100,
+                                  stop=110).index) == list(range(100, 110, 2))
+        assert not explog.exists("Exp", {'batch': In(range(1000, 1100, 2))})
+
+    def testAddConditions(self, function_explog):
+        with pytest.raises(ValueError):
+            function_explog.conf2idx("EvoExperiment",
+                {'param1': In(1, 2), 'param2': 3}, addNonExistent=True)
+
+    def testRemoveCoordinates(self, function_explog):
+        function_explog.add_confs("EvoExperiment", pd.DataFrame({
+            'param1': np.arange(100), 'param2': np.arange(100)}))
+        function_explog.remove("EvoExperiment",
+                               {'param1': In(range(0, 100, 2))})
+        # the logged conf with param1 = 22 is removed as well
+        assert function_explog.num_rows("EvoExperiment") == 51
+
+# Tests for the typed lookups of configurations.
+class TestTypedConfs:
+    def make_explog(self, function_explog):
+        function_explog.add_confs("Typed", pd.DataFrame({
+            'lr': [0.1, 0.3, 1e-5], 'batch': [5, 6, 7],
+            'name': ["a", "5", "c"], 'flag': [True, False, True]
+        }))
+        return function_explog
+
+    def testNativeTypes(self, function_explog):
+        explog = self.make_explog(function_explog)
+        table = explog.hdfstore.get_node("Typed").table
+        assert table.coldtypes['lr'].kind == 'f'
+        assert table.coldtypes['batch'].kind == 'i'
+        assert table.coldtypes['flag'].kind == 'b'
+
+    def testFloats(self, function_explog):
+        explog = self.make_explog(function_explog)
+        assert explog.conf2idx("Typed", {'lr': 0.1 + 0.2}) == []
+        assert explog.conf2idx("Typed", {'lr': 0.3}) == [1]
+        assert explog.conf2idx("Typed", {'lr': 1e-5}) == [2]
+
+    def testConversions(self, function_explog):
+        explog = self.make_explog(function_explog)
+        assert explog.conf2idx("Typed", {'batch': 5.5}) == []
+        assert explog.conf2idx("Typed", {'batch': 6.0}) == [1]
+        assert explog.conf2idx("Typed", {'batch': "7"}) == [2]
+        assert explog.conf2idx("Typed", {'name': 5}) == [1]
+        assert explog.conf2idx("Typed", {'flag': False}) == [1]
+        assert explog.conf2idx("Typed", {'batch': Range(5.5, 7.5)}) == [1, 2]
+
+    def testNoDuplicates(self, function_explog):
+        explog = self.make_explog(function_explog)
+        conf = {'lr': 1, 'batch': 5.0, 'name': "x", 'flag': True}
+
+        idx = explog.conf2idx("Typed", conf, addNonExistent=True)
+        assert idx == [3]
+        assert explog.conf2idx("Typed", conf, addNonExistent=True) == [3]
+        assert explog.select("Typed")['lr'].dtype == np.float64
+
+# Tests for ExpLog.aggregate_results.
+class TestAggregateResults:
+    def make_explog(self, function_explog):
+        rng = np.random.RandomState(0)
+        frames = []
+
+        for lr in [0.1, 0.01]:
+            for batch in [5, 10]:
+                for rep in range(3):
+                    res = pd.DataFrame({'epoch': np.arange(4),
+                                        'loss': rng.rand(4)})
+                    function_explog.add_results(
+                        "Agg", {'lr': lr, 'batch': batch}, {'metrics': res})
+                    frames.append(res.assign(lr=lr, batch=batch))
+
+        return function_explog, pd.concat(frames)
+
+    def testByConf(self, function_explog):
+        explog, frame = self.make_explog(function_explog)
+        res = explog.aggregate_results("Agg", "metrics", by=['lr'],
+                                       columns=['loss'], chunksize=3)
+        expected = frame.groupby('lr')['loss'].agg(['mean', 'std'])
+
+        assert list(res.index) == [0.01, 0.1]
+        assert np.allclose(res[('loss', 'mean')], expected['mean'])
+        assert np.allclose(res[('loss', 'std')], expected['std'])
+
+    def testByResultColumn(self, function_explog):
+        explog, frame = self.make_explog(function_explog)
+        res = explog.aggregate_results("Agg", "metrics", by=['batch', 'epoch'],
+                                       agg=['count', 'max', 'median'])
+        expected = frame.groupby(['batch', 'epoch'])['loss'].agg(
+            ['count', 'max', 'median'])
+
+        assert list(res.columns) == [('loss', 'count'), ('loss', 'max'),
+                                     ('loss', 'median')]
+        assert res.index.names == ['batch', 'epoch']
+        assert np.allclose(res.values, expected.values)
+
+    def testConf(self, function_explog):
+        explog, frame = self.make_explog(function_explog)
+        res = explog.aggregate_results("Agg", "metrics", agg='mean',
+                                       conf={'batch': 10})
+        assert list(res.index) == [0]
+        assert np.isclose(res[('loss', 'mean')][0],
+                          frame[frame['batch'] == 10]['loss'].mean())
+        assert np.isclose(res[('epoch', 'mean')][0], 1.5)
+
+    def testAggregator(self, function_explog):
+        explog, frame = self.make_explog(function_explog)
+        aggregator = Aggregator(by=['lr'], columns=['loss'], agg=['sum'])
+        explog.aggregate_results("Agg", "metrics", conf={'batch': 5},
+                                 aggregator=aggregator)
+        explog.aggregate_results("Agg", "metrics", conf={'batch': 10},
+                                 aggregator=aggregator)
+
+        assert np.allclose(aggregator.result()[('loss', 'sum')],
+                           frame.groupby('lr')['loss'].sum())
+
+    def testMissing(self, function_explog):
+        explog, frame = self.make_explog(function_explog)
+        assert explog.aggregate_results("Agg", "nothing").empty
+
+        with pytest.raises(KeyError):
+            explog.aggregate_results("Nothing", "metrics")
+
+# Tests for ExpLog.missing_confs.
+class TestMissingConfs:
+    def make_confs(self):
+        return ConfCollection({'param2': 22},
+                              ParameterSpace("param1", [5, 11, 22, 7]))
+
+    def testMissing(self, class_explog):
+        missing = class_explog.missing_confs("EvoExperiment",
+                                             self.make_confs(), chunksize=3)
+        assert list(missing) == [{'param2': 22, 'param1': 5},
+                                 {'param2': 22, 'param1': 22},
+                                 {'param2': 22, 'param1': 7}]
+        
+    def testMatched(self, class_explog):
+        missing, matched = class_explog.missing_confs("EvoExperiment",
+                                self.make_confs(), returnMatched=True)
+        assert len(missing) == 3
+        assert list(matched) == [{'param2': 22, 'param1': 11}]
+
+    def testFloatValues(self, class_explog):
+        confs = ConfCollection({'param2': 22.0},
+                               ParameterSpace("param1", [11.0, 12.5]))
+        missing = class_explog.missing_confs("EvoExperiment", confs)
+        assert list(missing) == [{'param2': 22.0, 'param1': 12.5}]
+
+    def testChunkDtypes(self, class_explog):
+        # the chunks have different dtypes: int, then float
+        confs = ConfCollection({'param2': 22},
+                               ParameterSpace("param1", [11, 7]) +
+                               ParameterSpace("param1", [12.5, 11.0]))
+        missing, matched = class_explog.missing_confs("EvoExperiment", confs,
+                                chunksize=2, returnMatched=True)
+        assert [c['param1'] for c in missing] == [7, 12.5]
+        assert [c['param1'] for c in matched] == [11, 11.0]
+
+    def testNonExistentFolder(self, class_explog):
+        missing = class_explog.missing_confs("NonExistentExperiment",
+                                             self.make_confs())
+        assert len(missing) == 4
+
+    def testOtherParams(self, class_explog):
+        confs = ConfCollection({'param3': 22},
+                               ParameterSpace("param1", [11, 22]))
+        assert len(class_explog.missing_confs("EvoExperiment", confs)) == 2
+
+    def testNotCollection(self, class_explog):
+        with pytest.raises(TypeError):
+            class_explog.missing_confs("EvoExperiment",
+                                       [{'param1': 11, 'param2': 22}])
+
+# Tests for ExpLog.merge.
+class TestMerge:
+    def testMergeOverlapping(self, function_explog):
+        shard = make_explog()
+        shard.add_results("EvoExperiment", {'param1': 33, 'param2': 44},
+                          make_results(coef=3))
+        mappings = function_explog.merge(shard)
+        
+        assert mappings == [{'/EvoExperiment': {0: 0, 1: 1, 2: 2}}]
+        assert function_explog.num_rows("EvoExperiment") == 3
+        
+        res = append_results(make_results(), make_results(), reindex=True)
+        assertSelMatchesResults(function_explog, "EvoExperiment",
+                                {'param1': 11, 'param2': 22}, res)
+        assertSelMatchesResults(function_explog, "EvoExperiment",
+                                {'param1': 33, 'param2': 44},
+                                make_results(coef=3))
+        shard.close()
+        
+    def testMergeRemapsIndices(self, function_explog):
+        shard = ExpLog('shard_remap.h5', in_memory=True)
+        shard.add_results("EvoExperiment", {'param1': 55, 'param2': 66},
+                          make_results(coef=5))
+        shard.add_results("EvoExperiment", {'param1': 22, 'param2': 33},
+                          make_results(coef=2))
+        mappings = function_explog.merge([shard], "EvoExperiment")
+        
+        assert mappings == [{'EvoExperiment': {0: 2, 1: 1}}]
+        assertSelMatchesResults(function_explog, "EvoExperiment",
+                                {'param1': 55, 'param2': 66},
+                                make_results(coef=5))
+        shard.close()
+        
+    def testMergeIntoEmpty(self):
+        explog = ExpLog('merged_empty.h5', in_memory=True)
+        shards = [make_explog(), make_explog()]
+        explog.merge(shards)
+        
+        assert explog.num_rows("EvoExperiment") == 2
+        res = append_results(make_results(), make_results(), reindex=True)
+        assertSelMatchesResults(explog, "EvoExperiment",
+                                {'param1': 22, 'param2': 33}, res)
+        
+        for shard in shards:
+            shard.close()
+        explog.close()
+        
+    def testMergeWrongSchema(self, function_explog):
+        shard = ExpLog('shard_schema.h5', in_memory=True)
+        shard.add_results("EvoExperiment", {'param1': 55, 'param3': 66},
+                          make_results())
+        
+        with pytest.raises(ValueError):
+            function_explog.merge(shard)
+        shard.close()
+
+# Tests for the profiling counters of ExpLog.
+class TestProfiling:
+    def testNotEnabled(self, function_explog):
+        with pytest.raises(RuntimeError):
+            function_explog.stats()
+
+    def testCounters(self, function_explog):
+        function_explog.enable_profiling()
+        function_explog.select("EvoExperiment")
+        function_explog.conf2idx("EvoExperiment", {'param1': 11})
+        function_explog.add_data("EvoExperiment", {'param1': 5, 'param2': 6})
+        
+        stats = function_explog.stats()
+        assert stats.loc['select', 'calls'] == 3
+        assert stats.loc['select', 'rows'] == 4
+        assert stats.loc['conf2idx', 'calls'] == 1
+        assert stats.loc['add_data', 'rows'] == 1
+        assert stats.loc['hdfstore.append', 'rows'] == 1
+        assert stats.loc['hdfstore.append', 'bytes'] > 0
+        assert (stats['time'] >= 0).all()
+        
+    def testReset(self, function_explog):
+        function_explog.enable_profiling()
+        function_explog.select("EvoExperiment")
+        assert len(function_explog.stats(reset=True))
+        assert len(function_explog.stats()) == 0
+        
+    def testErrors(self, function_explog):
+        function_explog.enable_profiling()
+        
+        with pytest.raises(KeyError):
+            function_explog.select("NonExistentExperiment")
+            
+        assert function_explog.stats().loc['select', 'errors'] == 1
+        
+    def testHooks(self, function_explog):
+        calls = []
+        profiler = function_explog.enable_profiling()
+        profiler.add_hook(lambda name, *args: calls.append(name))
+        function_explog.exists("EvoExperiment", 0)
+        
+        assert calls[-1] == 'exists'
+        assert 'hdfstore.select' in calls
+        
+    def testDisable(self, function_explog):
+        function_explog.enable_profiling()
+        function_explog.disable_profiling()
+        assert isinstance(function_explog.hdfstore, pd.HDFStore)
+        
+        with pytest.raises(RuntimeError):
+            function_explog.stats()
@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 import pytest
 from pyexplog.log import ExpLog
-from pyexplog.manager import ExpManager, repeated_experiment
+from pyexplog.manager import ExpManager, repeated_experiment, \
+                             log_repeated_experiment, _streaming_return_as
 from routines import make_results, class_explog, \
                      function_explog, assertSelMatchesResults, append_results
 import pandas as pd
@@ -14,6 +15,16 @@ class DummyExperiment:
     def __call__(self, config):
         return make_results()
 
+class FailingExperiment:
+    def __init__(self, num_ok):
+        self.num_ok = num_ok
+        
+    def __call__(self, config):
+        if self.num_ok <= 0:
+            raise RuntimeError("Experiment failed.")
+        self.num_ok -= 1
+        return make_results()
+
 class TestExpManager:
     def tagWithIRun(self, res, irun, irun_key='_irun_'):
         for v in res.values():
@@ -36,6 +47,113 @@ class TestExpManager:
         
         res = append_results(res1, res2, reindex=True)        
         assertSelMatchesResults(function_explog, "DummyExp", conf, res)
+        
+    def testRunRepeatedExperiment(self, function_explog):
+        manager = ExpManager(function_explog, update_mode='replace')
+        conf = {'param1': 15}
+        
+        for i in range(2):
+            manager.runRepeatedExperiment(DummyExperiment(), conf,
+                                          "DummyExp", 2, n_jobs=1)
+
+        res1 = make_results()
+        self.tagWithIRun(res1, 0)
+        res2 = make_results()
+        self.tagWithIRun(res2, 1)
+        
+        res = append_results(res1, res2, reindex=True)        
+        assertSelMatchesResults(function_explog, "DummyExp", conf, res)
+        
+    def testRunRepeatedExperimentMmap(self, function_explog, tmpdir):
+        manager = ExpManager(function_explog, update_mode='replace')
+        conf = {'param1': 15}
+
+        res = repeated_experiment(DummyExperiment(), conf, 2, n_jobs=2,
+                                  transport='mmap',
+                                  transport_dir=str(tmpdir))
+        expected = repeated_experiment(DummyExperiment(), conf, 2, n_jobs=1)
+
+        for key, frame in expected.items():
+            assert (res[key].values == frame.values).all()
+        assert tmpdir.listdir() == []
+
+        manager.runRepeatedExperiment(DummyExperiment(), conf, "DummyExp",
+                                      2, n_jobs=2, transport='mmap',
+                                      transport_dir=str(tmpdir))
+        assertSelMatchesResults(function_explog, "DummyExp", conf,
+            {k: pd.DataFrame(v.values, columns=v.columns)
+             for k, v in expected.items()})
+        assert tmpdir.listdir() == []
+
+        with pytest.raises(ValueError):
+            repeated_experiment(DummyExperiment(), conf, 2, n_jobs=1,
+                                transport='pipe')
+
+    def testLogRepeatedExperimentMmapFailure(self, function_explog, tmpdir,
+                                             monkeypatch):
+        def add_results(*args, **kwargs):
+            raise RuntimeError("Logging failed.")
+        
+        monkeypatch.setattr(function_explog, "add_results", add_results)
+        
+        with pytest.raises(RuntimeError):
+            log_repeated_experiment(function_explog, "DummyExp",
+                                    DummyExperiment(), {'param1': 15}, 4,
+                                    n_jobs=2, transport='mmap',
+                                    transport_dir=str(tmpdir))
+        
+        # the results that have not been received are removed as well
+        assert tmpdir.listdir() == []
+        
+    def testRunExperimentRunInfo(self, function_explog):
+        manager = ExpManager(function_explog, runinfo_key='_runinfo')
+        conf = {'param1': 15}
+        manager.runExperiment(DummyExperiment(), conf, "DummyExp")
+        
+        sel = function_explog.select_results("DummyExp", conf)[0]
+        assert set(sel.keys()) == {'in_metrics', 'out_metrics', '_runinfo'}
+        
+        info = sel['_runinfo']
+        assert list(info['_irun_']) == [-1]
+        assert list(info['result_rows']) == [4]
+        assert (info['wall_time'] >= 0).all()
+        assert 'worker_maxrss' in info.columns
+        
+    def testRunRepeatedExperimentRunInfo(self, function_explog):
+        manager = ExpManager(function_explog, runinfo_key='_runinfo')
+        conf = {'param1': 15}
+        manager.runRepeatedExperiment(DummyExperiment(), conf,
+                                      "DummyExp", 2, n_jobs=1)
+        
+        info = function_explog.select_results("DummyExp", conf,
+                                              '_runinfo')[0]['_runinfo']
+        assert list(info['_irun_']) == [0, 1, -1]
+        assert list(info['result_rows']) == [4, 4, 0]
+        
+    def testRunRepeatedExperimentIRunKey(self, function_explog):
+        manager = ExpManager(function_explog, runinfo_key='_runinfo',
+                             irun_key='_repeat')
+        conf = {'param1': 15}
+        manager.runRepeatedExperiment(DummyExperiment(), conf,
+                                      "DummyExp", 2, n_jobs=1)
+        
+        info = function_explog.select_results("DummyExp", conf,
+                                              '_runinfo')[0]['_runinfo']
+        assert list(info['_repeat']) == [0, 1, -1]
+        assert not '_irun_' in info.columns
+        
+    @pytest.mark.skipif(_streaming_return_as(True) is None,
+                        reason="joblib < 1.3 returns all the repeats at once")
+    def testLogRepeatedExperimentPartial(self, function_explog):
+        conf = {'param1': 15}
+        
+        with pytest.raises(RuntimeError):
+            log_repeated_experiment(function_explog, "DummyExp",
+                                    FailingExperiment(1), conf, 3, n_jobs=1)
+        
+        res = make_results()
+        self.tagWithIRun(res, 0)
+        assertSelMatchesResults(function_explog, "DummyExp", conf, res)
     
 #class TestRepeatedExperiment:
 #    def test
\ No newline at end of file
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+import numpy as np
+from pyexplog.query import In, Range, Not, NoMatch, as_condition, \
+                           is_condition, typed_value
+
+# Tests for the where clauses of the conditions.
+class TestWhere:
+    def testIn(self):
+        assert In("a", "b").where("p") == 'p = "a" | p = "b"'
+        assert In(["a", "b"]).where("p", negate=True) == \
+               'p != "a" & p != "b"'
+
+    def testIntRuns(self):
+        cond = In(10, 1, 2, 3, 4, 7, 8)
+        assert cond.where("p") == '(p >= 1 & p <= 4) | p = 7 | p = 8 | p = 10'
+        assert cond.where("p", negate=True) == \
+               '(p < 1 | p > 4) & p != 7 & p != 8 & p != 10'
+        assert cond.num_terms() == 5
+        assert In(range(10**6)).num_terms() == 2
+
+    def testRange(self):
+        assert Range(10, 100).where("p") == '(p >= 10 & p < 100)'
+        assert Range(10, 100, inclusive=True).where("p", negate=True) == \
+               '(p < 10 | p > 100)'
+        assert Range(stop=0.5).where("p") == '(p < 0.5)'
+
+    def testNot(self):
+        assert Not(5).where("p") == 'p != 5'
+        assert Not(Not(Range(1))).where("p") == '(p >= 1)'
+
+    def testEmpty(self):
+        assert In().where("p") == 'index < 0'
+        assert Not(In()).where("p") == ''
+        assert Range().where("p") == ''
+
+    def testAsCondition(self):
+        assert is_condition(range(3)) and is_condition({1, 2})
+        assert not is_condition((8, 8))
+        assert isinstance(as_condition(range(3)), Range)
+        assert as_condition(range(0, 6, 2)).values == [0, 2, 4]
+        assert as_condition((8, 8)).values == [(8, 8)]
+
+# Tests for the conversion of the conditions to the types of the columns.
+class TestTyped:
+    def testTypedValue(self):
+        assert typed_value("5", np.int64) == 5
+        assert typed_value(5.0, np.int64) == 5
+        assert typed_value(5, np.dtype('S3')) == "5"
+        assert typed_value("a", np.float64) == "a"
+
+        with pytest.raises(NoMatch):
+            typed_value(5.5, np.int64)
+
+    def testIn(self):
+        assert In(1, 2.5, "3").typed(np.int64).values == [1, 3]
+        assert In(1, 2).typed(np.dtype('S2')).values == ["1", "2"]
+
+    def testRange(self):
+        cond = Range(1.5, 4.5).typed(np.int64)
+        assert (cond.start, cond.stop) == (2, 5)
+        cond = Range(1.5, 4.5, inclusive=True).typed(np.int64)
+        assert (cond.start, cond.stop) == (2, 4)
+        cond = Range(1.5, 4.5).typed(np.float64)
+        assert (cond.start, cond.stop) == (1.5, 4.5)
+
+# Tests for the evaluation of the conditions on column values.
+class TestMask:
+    def testNumbers(self):
+        values = np.arange(10)
+        assert list(np.flatnonzero(In(1, 5, 20).mask(values))) == [1, 5]
+        assert list(np.flatnonzero(Range(3, 6).mask(values))) == [3, 4, 5]
+        assert Not(Range(0, 8, inclusive=True)).mask(values).sum() == 1
+
+    def testBytes(self):
+        values = np.array([b"a", b"bc", b"a"])
+        assert list(In("a").mask(values)) == [True, False, True]
+        assert list(Not("bc").mask(values)) == [True, False, True]
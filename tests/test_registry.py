@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+import pandas as pd
+from pyexplog.log import ExpLog
+from pyexplog.profiling import Profiler
+from pyexplog.backend import HDFBackend, handle_registry
+from routines import make_results
+
+# Tests for the sharing of HDF5 handles between logs.
+class TestHandleRegistry:
+    def testShared(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        a = ExpLog(log_file)
+        b = ExpLog(log_file)
+
+        assert a.hdfstore is b.hdfstore
+        assert handle_registry.refs(log_file) == 2
+
+        a.add_results("Exp", {'p': 1}, make_results())
+        assert b.conf2idx("Exp", {'p': 1}) == [0]
+
+        a.close()
+        assert handle_registry.refs(log_file) == 1
+        assert not a.backend
+        assert b.backend.is_open
+        assert b.exists("Exp/conf_0/in_metrics")
+
+        b.close()
+        assert handle_registry.refs(log_file) == 0
+
+        c = ExpLog(log_file, mode='r')
+        assert c.conf2idx("Exp", {'p': 1}) == [0]
+        c.close()
+
+    def testUpgrade(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        ExpLog(log_file).close()
+
+        reader = ExpLog(log_file, mode='r')
+        writer = ExpLog(log_file)
+        assert writer.hdfstore is reader.hdfstore
+        assert writer.hdfstore._mode == 'a'
+
+        writer.add_results("Exp", {'p': 1}, make_results())
+        assert reader.conf2idx("Exp", {'p': 1}) == [0]
+
+        with pytest.raises(ValueError):
+            reader.add_results("Exp", {'p': 2}, make_results())
+
+        # none of the writes of the backend go through the reader
+        with pytest.raises(ValueError):
+            reader.update_indexes("Exp", force=True)
+        with pytest.raises(ValueError):
+            reader.backend.reindex_dirty("/Exp")
+        with pytest.raises(ValueError):
+            reader.backend.copy_from(writer.backend, "/Exp", "/Exp2")
+        assert not writer.exists("Exp2")
+
+        # the handle stays writable while the writer has it
+        writer.close()
+        reader.close()
+        assert handle_registry.refs(log_file) == 0
+
+    def testTruncate(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        explog = ExpLog(log_file)
+
+        with pytest.raises(ValueError):
+            HDFBackend(log_file, mode='w')
+
+        explog.close()
+        HDFBackend(log_file, mode='w').close()
+
+    def testNotShared(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        a = ExpLog(log_file)
+        b = ExpLog(backend=HDFBackend(log_file, share=False))
+
+        assert not a.hdfstore is b.hdfstore
+        assert handle_registry.refs(log_file) == 1
+
+        a.close()
+        b.close()
+
+    def testProfiling(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        ExpLog(log_file).close()
+
+        reader = ExpLog(log_file, mode='r', profile=True)
+        writer = ExpLog(log_file, profile=Profiler())
+        writer.add_results("Exp", {'p': 1}, make_results())
+        reader.select("Exp")
+
+        # every log counts its own calls, also after the handle is reopened
+        assert 'hdfstore.append' in writer.stats().index
+        assert not 'hdfstore.append' in reader.stats().index
+        assert 'hdfstore.select' in reader.stats().index
+        assert isinstance(reader.hdfstore.store, pd.HDFStore)
+
+        reader.close()
+        writer.close()
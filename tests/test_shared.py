@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import pickle
+import pytest
+from pyexplog.log import ExpLog
+from pyexplog.shared import SharedImage
+from routines import make_results
+
+def make_log(log_file):
+    explog = ExpLog(log_file)
+    for p in range(4):
+        explog.add_results("Exp", {'p': p}, make_results(p))
+    return explog
+
+def read_image(args):
+    image, p = args
+    explog = image.open()
+    try:
+        res = explog.select_results("Exp", {'p': p})[0]
+        return int(res['in_metrics']['cc1'].sum())
+    finally:
+        explog.close()
+
+# Tests for SharedImage.
+class TestSharedImage:
+    def testOpen(self, tmpdir):
+        explog = make_log(str(tmpdir.join("log.h5")))
+
+        with explog.share_image() as image:
+            # the image is a snapshot
+            explog.add_results("Exp", {'p': 9}, make_results())
+
+            shared = image.open()
+            assert shared.conf2idx("Exp", None) == [0, 1, 2, 3]
+            assert shared.exists("Exp/conf_2/out_metrics")
+
+            with pytest.raises(ValueError):
+                shared.add_results("Exp", {'p': 5}, make_results())
+
+            shared.close()
+
+        if not image.path is None:
+            assert not os.path.exists(image.path)
+        explog.close()
+
+    def testPickle(self, tmpdir):
+        explog = make_log(str(tmpdir.join("log.h5")))
+        image = SharedImage.publish(explog)
+
+        try:
+            copy = pickle.loads(pickle.dumps(image))
+            assert (copy.name, copy.size, copy.path) == \
+                   (image.name, image.size, image.path)
+
+            with pytest.raises(RuntimeError):
+                copy.unlink()
+        finally:
+            image.unlink()
+            explog.close()
+
+    def testWorkers(self, tmpdir):
+        log_file = str(tmpdir.join("log.h5"))
+        make_log(log_file).close()
+
+        with SharedImage.publish(log_file) as image:
+            with multiprocessing.Pool(3) as pool:
+                sums = pool.map(read_image, [(image, p) for p in range(4)])
+
+        assert sums == [(111 + 222) * p for p in range(4)]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pickle
+import numpy as np
+import pandas as pd
+from pyexplog.transport import SharedFrame, SharedResultsExperiment, \
+                               receive_results
+
+def owner(array):
+    """
+    Returns the object that owns the memory of array.
+    """
+    while isinstance(array, np.ndarray) and not array.base is None:
+        array = array.base
+    return array
+
+def transported(frame, tmpdir):
+    shared = pickle.loads(pickle.dumps(SharedFrame(frame, str(tmpdir))))
+    return shared, shared.load()
+
+# Tests for SharedFrame.
+class TestSharedFrame:
+    def testZeroCopy(self, tmpdir):
+        frame = pd.DataFrame(np.arange(30000.0).reshape(10000, 3),
+                             columns=['a', 'b', 'c'])
+        shared, loaded = transported(frame, tmpdir)
+
+        assert len(pickle.dumps(shared)) < 1000
+        assert (loaded == frame).all().all()
+        assert (loaded.index == frame.index).all()
+        assert not isinstance(owner(loaded.values), np.ndarray)
+
+        # the file is gone, the map stays valid and copy-on-write
+        assert tmpdir.listdir() == []
+        loaded['a'] = 0.0
+        loaded.loc[0, 'b'] = -1.0
+        assert loaded['b'].tolist()[:3] == [-1.0, 4.0, 7.0]
+
+    def testMixed(self, tmpdir):
+        frame = pd.DataFrame({'i': [1, 2, 3], 'f': [0.5, 1.5, 2.5],
+                              's': ["x", "y", "z"],
+                              'b': [True, False, True]},
+                             columns=['i', 'f', 's', 'b'],
+                             index=[10, 20, 30])
+        shared, loaded = transported(frame, tmpdir)
+
+        assert [b[0] for b in shared.blocks] == [np.dtype(t).str
+                                                 for t in ['i8', 'f8', '?']]
+        assert list(shared.inline) == ['s']
+        assert list(loaded.columns) == ['i', 'f', 's', 'b']
+        assert list(loaded.index) == [10, 20, 30]
+        assert (loaded.dtypes == frame.dtypes).all()
+        assert (loaded == frame).all().all()
+
+    def testPickled(self, tmpdir):
+        for frame in [pd.DataFrame({'s': ["a", "b"]}),
+                      pd.DataFrame({'x': np.zeros(0)}),
+                      pd.DataFrame([[1, 2]], columns=['a', 'a'])]:
+            shared, loaded = transported(frame, tmpdir)
+            assert shared.path is None
+            assert loaded.equals(frame)
+
+        assert tmpdir.listdir() == []
+
+    def testExperiment(self, tmpdir):
+        experiment = SharedResultsExperiment(
+            lambda conf: {'metrics': pd.DataFrame({'loss': [conf['lr']]}),
+                          'info': {'time': 5}}, str(tmpdir))
+
+        shared = experiment({'lr': 0.5})
+        assert isinstance(shared['metrics'], SharedFrame)
+        assert len(tmpdir.listdir()) == 1
+
+        res = receive_results(shared)
+        assert res['metrics']['loss'].tolist() == [0.5]
+        assert res['info'] == {'time': 5}
+        assert tmpdir.listdir() == []